@@ -0,0 +1,92 @@
+"""Context processors supplying the per-user data of the base layout.
+
+The sidebar of every authenticated page shows the user's profile image, the
+number of unread messages and the number of deal requests waiting for them.
+They are read from one cache entry per user, kept for LAYOUT_CACHE_TIMEOUT
+seconds and deleted by skills.signals when a message, a deal or the profile
+of the user is written, so a page costs at most one cache read for its
+layout and none if it does not use it."""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+from perf.cache import bump_versions
+from skills.models import Message, SkillDeal
+
+from .models import UserProfile
+from .thumbnails import thumbnail_url
+
+
+def layout_cache_key(user_id) -> str:
+    """Return the cache key of the layout data of a user."""
+    return f"layout:{user_id}"
+
+
+def layout_data(user) -> dict:
+    """Return the layout data of a user, from the cache if possible."""
+    data = cache.get(layout_cache_key(user.pk))
+    if data is None:
+        image, status = (
+            UserProfile.objects.filter(user=user)
+            .values_list("profile_image", "thumbnail_status")
+            .first()
+        ) or (None, None)
+        data = store_layout_data(
+            user,
+            profile_image=image,
+            thumbnail_status=status,
+            unread_messages=Message.objects.filter(
+                receiver=user, is_read=False
+            ).count(),
+            pending_deals=SkillDeal.objects.filter(
+                provider=user, status=SkillDeal.PENDING
+            ).count(),
+        )
+    return data
+
+
+def store_layout_data(
+    user, profile_image, thumbnail_status, unread_messages, pending_deals
+) -> dict:
+    """Cache the layout data of a user, e.g. from a view that computed it
+    anyway, and return it.
+
+    Args:
+        user: The user.
+        profile_image: The name of the user's profile image file, if any.
+        thumbnail_status: The thumbnail_status of the user's profile.
+        unread_messages: The number of unread messages of the user.
+        pending_deals: The number of pending deals provided by the user.
+    """
+    data = {
+        "profile_image_url": thumbnail_url(
+            user.pk, profile_image, thumbnail_status, "small"
+        ),
+        "unread_messages": unread_messages,
+        "pending_deals": pending_deals,
+    }
+    cache.set(layout_cache_key(user.pk), data, settings.LAYOUT_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_layout(*user_ids) -> None:
+    """Drop the layout data of the users, also once the current transaction
+    commits, and invalidate their cached pages, which include the layout."""
+    keys = [layout_cache_key(user_id) for user_id in user_ids if user_id]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys), robust=True)
+    bump_versions(*(f"user:{user_id}" for user_id in user_ids if user_id))
+
+
+def layout(request) -> dict:
+    """Add the layout data of the logged in user as `layout`, loaded on
+    first use."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {"layout": SimpleLazyObject(lambda: layout_data(user))}
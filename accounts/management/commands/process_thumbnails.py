@@ -0,0 +1,61 @@
+"""A worker that builds the thumbnails of new profile images."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.context_processors import invalidate_layout
+from accounts.thumbnails import process_pending_thumbnails
+
+
+class Command(BaseCommand):
+    """A class to build the thumbnail variants of pending profile images.
+
+    Runs as a long-lived local worker by default, sleeping between polls
+    once no thumbnails are pending. Use --once to build everything and exit.
+    The cached layouts of the processed users are dropped, so their sidebar
+    links to the new variants directly.
+    """
+
+    help = "Build the thumbnails of uploaded profile images"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the worker."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Maximum number of profiles to process per batch.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when no thumbnails are pending.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Build the pending thumbnails, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        """Build the pending thumbnails in batches until stopped."""
+        batch_size = options["batch_size"]
+        total = 0
+
+        try:
+            while True:
+                profiles = process_pending_thumbnails(batch_size=batch_size)
+                invalidate_layout(*(profile.user_id for profile in profiles))
+                total += len(profiles)
+                if len(profiles) < batch_size:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Built the thumbnails of {total} profile images")
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:56
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    """Queue the thumbnails of the profile images uploaded before."""
+    UserProfile = apps.get_model("accounts", "UserProfile")
+    UserProfile.objects.exclude(profile_image="").exclude(
+        profile_image__isnull=True
+    ).update(thumbnail_status="pending")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="thumbnail_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="ready",
+                max_length=10,
+            ),
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                fields=["thumbnail_status"], name="profile_thumbnail_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:03
+
+import mediastore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_userprofile_thumbnail_status"),
+        ("mediastore", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="userprofile",
+            name="profile_image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=mediastore.storage.media_storage,
+                upload_to="profile_images/",
+            ),
+        ),
+    ]
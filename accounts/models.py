@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from mediastore.storage import media_storage
+
 
 # Create your models here.
 class CustomUser(AbstractUser):
@@ -18,12 +20,25 @@ class CustomUser(AbstractUser):
 
 
 class UserProfile(models.Model):
+    THUMBNAILS_PENDING = "pending"
+    THUMBNAILS_READY = "ready"
+    THUMBNAILS_FAILED = "failed"
+
+    THUMBNAIL_STATUS_CHOICES = [
+        (THUMBNAILS_PENDING, "Pending"),
+        (THUMBNAILS_READY, "Ready"),
+        (THUMBNAILS_FAILED, "Failed"),
+    ]
+
     user = models.OneToOneField(
         CustomUser, on_delete=models.CASCADE, related_name="profile"
     )  # A one-to-one link to the user model
     profile_image = models.ImageField(
-        upload_to="profile_images/", null=True, blank=True
+        upload_to="profile_images/", storage=media_storage, null=True, blank=True
     )  # A field to upload a profile image
+    thumbnail_status = models.CharField(
+        max_length=10, choices=THUMBNAIL_STATUS_CHOICES, default=THUMBNAILS_READY
+    )  # Whether the thumbnails of the profile image are built (see accounts.thumbnails)
     location = models.CharField(
         max_length=255, blank=True
     )  # Information about where the user is located (could be a city, region, or specific address)
@@ -43,5 +58,16 @@ class UserProfile(models.Model):
         default=0
     )  # Field to store the number of credits a user has
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["thumbnail_status"], name="profile_thumbnail_idx"),
+        ]
+
     def __str__(self):
         return self.user.username
+
+    def save(self, *args, **kwargs):
+        """Save the profile, queueing the thumbnails of a new profile image."""
+        if self.profile_image and not self.profile_image._committed:
+            self.thumbnail_status = self.THUMBNAILS_PENDING
+        super().save(*args, **kwargs)
@@ -1,13 +1,22 @@
+import tempfile
+from io import BytesIO, StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
 from django.core.paginator import Paginator
+from PIL import Image
 
 
+from .context_processors import layout, layout_data
 from .models import UserProfile
-from skills.models import Skill, SkillDeal, Message
+from .thumbnails import storage, thumbnail_name
+from skills.models import Category, Skill, SkillDeal, Message
 from .forms import UserProfileForm
 
 
@@ -398,3 +407,214 @@ class DashboardViewTests(TestCase):
         """Test that the context contains the greeting."""
         response = self.client.get(self.url)
         self.assertIn("greeting", response.context)
+
+
+class LayoutContextProcessorTests(TestCase):
+    """Tests for the cached layout data of the sidebar."""
+
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.user = User.objects.create_user(username="testuser", password="pass")
+        self.other = User.objects.create_user(username="other", password="pass")
+        self.profile = UserProfile.objects.create(user=self.user)
+        skill = Skill.objects.create(
+            name="Guitar",
+            level="Expert",
+            description="Chords",
+            owner=self.user,
+            category=Category.objects.create(name="Music"),
+            skill_type="offered",
+        )
+        self.deal = SkillDeal.objects.create(
+            skill=skill, owner=self.other, provider=self.user
+        )
+        self.client.login(username="testuser", password="pass")
+
+    def send_message(self):
+        """Send a message from the other user to the user."""
+        return Message.objects.create(
+            sender=self.other,
+            receiver=self.user,
+            skill_deal=self.deal,
+            content="Hello",
+        )
+
+    def test_layout_data_cached(self):
+        """Test that the layout data is read from the cache once computed."""
+        data = layout_data(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(layout_data(self.user), data)
+        self.assertEqual(data["pending_deals"], 1)
+        self.assertEqual(data["unread_messages"], 0)
+        self.assertIn("default_pic.jpg", data["profile_image_url"])
+
+    def test_invalidated_by_message(self):
+        """Test that a new and a read message update the unread count."""
+        layout_data(self.user)
+
+        message = self.send_message()
+        self.assertEqual(layout_data(self.user)["unread_messages"], 1)
+
+        message.is_read = True
+        message.save()
+        self.assertEqual(layout_data(self.user)["unread_messages"], 0)
+
+    def test_invalidated_by_deal(self):
+        """Test that accepting a deal updates the pending deals count."""
+        layout_data(self.user)
+
+        self.deal.accept_deal()
+
+        self.assertEqual(layout_data(self.user)["pending_deals"], 0)
+
+    def test_invalidated_by_profile(self):
+        """Test that a new profile image updates the image URL."""
+        layout_data(self.user)
+
+        self.profile.profile_image = "profile_images/me.jpg"
+        self.profile.save()
+
+        self.assertIn(
+            "profile_images/me.jpg", layout_data(self.user)["profile_image_url"]
+        )
+
+    def test_sidebar_counts(self):
+        """Test that the sidebar shows the unread messages count."""
+        self.send_message()
+
+        response = self.client.get(reverse("message_list"))
+
+        self.assertContains(response, "Messages")
+        self.assertContains(response, 'bg-danger ms-2">1</span>', count=2)
+
+    def test_anonymous(self):
+        """Test that anonymous users get no layout data."""
+        request = RequestFactory().get("/")
+        request.user = AnonymousUser()
+
+        self.assertEqual(layout(request), {})
+
+    def test_dashboard_stores_layout(self):
+        """Test that the dashboard caches the counts it computes, counting
+        every unread message."""
+        for _ in range(4):
+            self.send_message()
+
+        self.client.get(reverse("dashboard", kwargs={"user_id": self.user.id}))
+
+        with self.assertNumQueries(0):
+            data = layout_data(self.user)
+        self.assertEqual(data["unread_messages"], 4)
+        self.assertEqual(data["pending_deals"], 1)
+
+
+class ProfileThumbnailTests(TestCase):
+    """Tests for the thumbnails of the profile images."""
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username="testuser", password="pass"
+        )
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.client.login(username="testuser", password="pass")
+
+    def upload(self, content):
+        """Upload a profile image through the profile update form."""
+        self.client.post(
+            reverse("profile_update", kwargs={"user_id": self.user.id}),
+            {"profile_image": SimpleUploadedFile("photo.jpg", content)},
+        )
+        self.profile.refresh_from_db()
+
+    def photo(self):
+        """Return a 200x100 JPEG rotated by its EXIF orientation tag."""
+        image = Image.new("RGB", (200, 100), "red")
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = "Camera"  # Make
+        output = BytesIO()
+        image.save(output, "JPEG", exif=exif)
+        return output.getvalue()
+
+    def open_variant(self, size):
+        """Open a variant of the profile image."""
+        return Image.open(
+            storage().open(thumbnail_name(self.profile.profile_image.name, size))
+        )
+
+    def test_upload_queued(self):
+        """Test that a new upload is pending and the profile page links to the
+        lazy thumbnail view."""
+        self.upload(self.photo())
+
+        self.assertEqual(self.profile.thumbnail_status, UserProfile.THUMBNAILS_PENDING)
+        response = self.client.get(reverse("profile", kwargs={"user_id": self.user.id}))
+        self.assertContains(
+            response, reverse("profile_thumbnail", args=[self.user.id, "large"])
+        )
+
+    def test_worker_builds_variants(self):
+        """Test that the worker writes upright variants without EXIF data and
+        the pages then link to them directly."""
+        self.upload(self.photo())
+
+        call_command("process_thumbnails", once=True, stdout=StringIO())
+
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.thumbnail_status, UserProfile.THUMBNAILS_READY)
+        with self.open_variant("large") as large:
+            self.assertEqual(large.size, (100, 200))
+            self.assertEqual(dict(large.getexif()), {})
+        with self.open_variant("small") as small:
+            self.assertEqual(small.size, (84, 84))
+        url = storage().url(thumbnail_name(self.profile.profile_image.name, "small"))
+        response = self.client.get(reverse("profile", kwargs={"user_id": self.user.id}))
+        self.assertContains(response, url)
+
+    def test_lazy_generation(self):
+        """Test that the thumbnail view builds a missing variant and redirects
+        to it."""
+        self.upload(self.photo())
+        url = reverse("profile_thumbnail", args=[self.user.id, "small"])
+
+        response = self.client.get(url)
+
+        name = thumbnail_name(self.profile.profile_image.name, "small")
+        self.assertRedirects(
+            response, storage().url(name), fetch_redirect_response=False
+        )
+        self.assertTrue(storage().exists(name))
+        self.assertFalse(
+            storage().exists(thumbnail_name(self.profile.profile_image.name, "large"))
+        )
+
+    def test_unknown_size(self):
+        """Test that the thumbnail view rejects unknown sizes."""
+        url = reverse("profile_thumbnail", args=[self.user.id, "huge"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_corrupt_image(self):
+        """Test that an image that cannot be decoded is marked as failed and
+        replaced by the default picture."""
+        # Bypasses the form validation, like images stored before it existed
+        self.profile.profile_image = SimpleUploadedFile("photo.jpg", b"not an image")
+        self.profile.save()
+        url = reverse("profile_thumbnail", args=[self.user.id, "small"])
+
+        with self.assertLogs("accounts.thumbnails", "WARNING"):
+            response = self.client.get(url)
+
+        self.assertRedirects(
+            response, "/static/img/default_pic.jpg", fetch_redirect_response=False
+        )
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.thumbnail_status, UserProfile.THUMBNAILS_FAILED)
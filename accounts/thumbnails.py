@@ -0,0 +1,181 @@
+"""Fixed-size thumbnails of the profile images.
+
+Uploaded photos are never served as they are. Each one is rotated upright
+from its EXIF orientation, re-encoded as a JPEG without its metadata and
+resized into the variants of THUMBNAIL_SIZES, stored in the default storage
+under names derived from the original (thumbnails/<original>.<size>.jpg).
+The originals are content-addressed, so the variants of identical uploads
+are only built once, and removed when gc_media removes the original.
+
+The process_thumbnails worker builds the variants of new uploads in the
+background and marks their profile as ready. Until then, templates point to
+the profile_thumbnail view, which builds a missing variant on the first
+request and redirects to it; a ready profile links to its variants in the
+media storage directly. An image that cannot be decoded is marked as failed
+and the default picture is shown instead."""
+
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.dispatch import receiver
+from django.templatetags.static import static
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from mediastore.storage import file_collected
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_IMAGE = "img/default_pic.jpg"
+THUMBNAIL_DIR = "thumbnails"
+
+# Size name: (width, height, crop). Cropped variants are filled squares, the
+# others are scaled down to fit. Twice the displayed size for HiDPI screens.
+THUMBNAIL_SIZES = {
+    "small": (84, 84, True),
+    "large": (600, 600, False),
+}
+JPEG_QUALITY = 85
+
+# Raised by Pillow for files that are not images, truncated or too large
+IMAGE_ERRORS = (UnidentifiedImageError, OSError, Image.DecompressionBombError)
+
+
+def thumbnail_name(image_name: str, size: str) -> str:
+    """Return the storage name of a variant of a profile image."""
+    return f"{THUMBNAIL_DIR}/{image_name}.{size}.jpg"
+
+
+def thumbnail_url(user_id, image_name, status, size: str) -> str:
+    """Return the URL of a variant of a profile image.
+
+    Args:
+        user_id: The id of the user owning the image.
+        image_name: The storage name of the image, if any.
+        status: The thumbnail_status of the user's profile.
+        size: A key of THUMBNAIL_SIZES.
+    """
+    if not image_name or status == UserProfile.THUMBNAILS_FAILED:
+        return static(DEFAULT_PROFILE_IMAGE)
+    if status == UserProfile.THUMBNAILS_READY:
+        return storage().url(thumbnail_name(image_name, size))
+    return reverse("profile_thumbnail", args=[user_id, size])
+
+
+def storage():
+    """Return the storage of the variants."""
+    return default_storage
+
+
+def normalize_image(file) -> Image.Image:
+    """Decode an image, rotate it upright and convert it to RGB.
+
+    Transparent areas are flattened onto white. The EXIF data is not kept.
+
+    Raises:
+        One of IMAGE_ERRORS if the file is not a supported image.
+    """
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+
+def render_variant(image: Image.Image, size: str) -> bytes:
+    """Resize a normalized image into a variant and encode it as a JPEG."""
+    width, height, crop = THUMBNAIL_SIZES[size]
+    if crop:
+        variant = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    else:
+        variant = image.copy()
+        variant.thumbnail((width, height), Image.Resampling.LANCZOS)
+    output = BytesIO()
+    variant.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def build_thumbnails(image_name: str, sizes=None) -> list[str]:
+    """Write the missing variants of a profile image.
+
+    Args:
+        image_name: The storage name of the image.
+        sizes: The sizes to build, all of THUMBNAIL_SIZES if None.
+
+    Returns:
+        The storage names of the variants.
+
+    Raises:
+        One of IMAGE_ERRORS if the image cannot be decoded.
+    """
+    files = storage()
+    names = {
+        size: thumbnail_name(image_name, size) for size in sizes or THUMBNAIL_SIZES
+    }
+    missing = [size for size, name in names.items() if not files.exists(name)]
+    if missing:
+        with UserProfile.profile_image.field.storage.open(image_name) as file:
+            image = normalize_image(file)
+        for size in missing:
+            saved = files.save(names[size], ContentFile(render_variant(image, size)))
+            if saved != names[size]:
+                # Another process wrote the same variant meanwhile
+                files.delete(saved)
+    return list(names.values())
+
+
+def process_profile(profile: UserProfile) -> str:
+    """Build the variants of a profile's image and record the outcome.
+
+    The status is only updated if the image has not been replaced meanwhile.
+
+    Returns:
+        The new thumbnail_status of the profile.
+    """
+    status = UserProfile.THUMBNAILS_READY
+    try:
+        if profile.profile_image:
+            build_thumbnails(profile.profile_image.name)
+    except IMAGE_ERRORS:
+        logger.warning(
+            "Cannot build the thumbnails of %s",
+            profile.profile_image.name,
+            exc_info=True,
+        )
+        status = UserProfile.THUMBNAILS_FAILED
+
+    UserProfile.objects.filter(
+        pk=profile.pk, profile_image=profile.profile_image.name
+    ).update(thumbnail_status=status)
+    profile.thumbnail_status = status
+    return status
+
+
+def process_pending_thumbnails(batch_size: int = 50) -> list[UserProfile]:
+    """Build the variants of one batch of profiles with pending thumbnails.
+
+    Returns:
+        The profiles processed.
+    """
+    profiles = list(
+        UserProfile.objects.filter(thumbnail_status=UserProfile.THUMBNAILS_PENDING)
+        .only("user_id", "profile_image")
+        .order_by("pk")[:batch_size]
+    )
+    for profile in profiles:
+        process_profile(profile)
+    return profiles
+
+
+@receiver(file_collected)
+def remove_thumbnails(sender, name, **kwargs) -> None:
+    """Remove the variants of a collected profile image."""
+    for size in THUMBNAIL_SIZES:
+        storage().delete(thumbnail_name(name, size))
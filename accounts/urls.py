@@ -5,6 +5,7 @@ from .views import (
     ProfileCreateView,
     ProfileUpdateView,
     ProfileView,
+    ProfileThumbnailView,
     CustomLoginView,
     CustomLogoutView,
     DashboardView,
@@ -22,5 +23,10 @@ urlpatterns = [
     path("profile-decision/", ProfileDecisionView.as_view(), name="profile_decision"),
     path("profile/create/", ProfileCreateView.as_view(), name="profile_create"),
     path("profile/<int:user_id>/", ProfileView.as_view(), name="profile"),
+    path(
+        "profile/<int:user_id>/thumbnail/<str:size>/",
+        ProfileThumbnailView.as_view(),
+        name="profile_thumbnail",
+    ),
     path("dashboard/<int:user_id>/", DashboardView.as_view(), name="dashboard"),
 ]
@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import redirect, render, get_object_or_404
 from django.views import View
 from django.contrib.auth import login, logout
@@ -7,12 +9,22 @@ from django.contrib.auth.views import LoginView
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.db.models import Count, Q
+from django.http import Http404
 
+from .context_processors import store_layout_data
 from .models import UserProfile, CustomUser
 from .forms import UserProfileForm, CustomUserCreationForm
+from .thumbnails import (
+    IMAGE_ERRORS,
+    THUMBNAIL_SIZES,
+    build_thumbnails,
+    process_profile,
+    thumbnail_url,
+)
 from skills.models import Skill, SkillDeal, Message, Notification
 
+logger = logging.getLogger(__name__)
+
 
 class CustomLoginView(LoginView):
     """A class-based view to handle user login.
@@ -202,11 +214,74 @@ class ProfileView(UserPassesTestMixin, DetailView):
             user = CustomUser.objects.get(id=self.kwargs["user_id"])
             return UserProfile.objects.create(user=user)
 
+    def get_context_data(self, **kwargs):
+        """Add the URL of the large variant of the profile image."""
+        context = super().get_context_data(**kwargs)
+        profile = self.object
+        context["profile_image_url"] = thumbnail_url(
+            profile.user_id,
+            profile.profile_image.name,
+            profile.thumbnail_status,
+            "large",
+        )
+        return context
+
     def test_func(self) -> bool:
         """Ensures registered users can only view their own profile."""
         return self.request.user.id == self.kwargs["user_id"]
 
 
+class ProfileThumbnailView(UserPassesTestMixin, View):
+    """A class-based view to build a missing variant of a profile image.
+
+    Templates link here until the process_thumbnails worker has built the
+    variants of a new upload. The requested variant is built and stored on
+    the first request, then every request is redirected to it.
+
+    Methods:
+        get: A method to handle GET requests to the view.
+    """
+
+    def get(self, request, user_id, size):
+        """Build the variant if needed and redirect to it.
+
+        Args:
+            request (HttpRequest): The request object.
+            user_id (int): The id of the user owning the image.
+            size (str): The name of the variant, a key of THUMBNAIL_SIZES.
+
+        Returns:
+            HttpResponseRedirect: A redirect to the variant, or to the default
+            picture if the image cannot be decoded.
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise Http404("Unknown thumbnail size")
+        profile = get_object_or_404(
+            UserProfile.objects.only("user_id", "profile_image", "thumbnail_status"),
+            user_id=user_id,
+        )
+        if (
+            profile.profile_image
+            and profile.thumbnail_status == UserProfile.THUMBNAILS_PENDING
+        ):
+            try:
+                build_thumbnails(profile.profile_image.name, [size])
+            except IMAGE_ERRORS:
+                # Record the failure so the default picture is shown
+                process_profile(profile)
+            else:
+                profile.thumbnail_status = UserProfile.THUMBNAILS_READY
+        return redirect(
+            thumbnail_url(
+                user_id, profile.profile_image.name, profile.thumbnail_status, size
+            )
+        )
+
+    def test_func(self) -> bool:
+        """Ensures only registered users can see profile images."""
+        return self.request.user.is_authenticated
+
+
 class ProfileUpdateView(UserPassesTestMixin, UpdateView):
     """A class-based view to update a user profile.
 
@@ -271,7 +346,9 @@ class DashboardView(UserPassesTestMixin, View):
         Returns:
             HttpResponse: The response object.
         """
-        user = get_object_or_404(CustomUser, id=user_id)
+        user = get_object_or_404(
+            CustomUser.objects.select_related("profile"), id=user_id
+        )
 
         # Date and greeting message
         now = timezone.now()
@@ -285,12 +362,11 @@ class DashboardView(UserPassesTestMixin, View):
             greeting = "Good evening"
 
         # Skill suggestions
-        wanted_skills = Skill.objects.filter(owner=user, skill_type="wanted")
-        wanted_skills_names = [skill.name for skill in wanted_skills]
         selected_skills = (
-            Skill.objects.filter(name__in=wanted_skills_names, skill_type="offered")
-            .exclude(owner=user)
-            .annotate(reviews_count=Count("review"))
+            Skill.objects.suggested_for(user)
+            .select_related("owner")
+            .only("name", "rating", "rating_count", "updated_at", "owner__username")
+            .order_by("-score", "-pk")
         )
 
         # Pagination for suggested skills
@@ -300,36 +376,51 @@ class DashboardView(UserPassesTestMixin, View):
 
         # Recent deals and unread messages
         # Query all deals related to the user as either provider or owner
-        recent_deals = SkillDeal.objects.filter(
-            Q(provider=user) | Q(owner=user)
-        ).order_by("-created_at")[:3]
-        print(recent_deals)
+        recent_deals = (
+            SkillDeal.objects.involving(user)
+            .select_related("skill", "owner", "provider")
+            .only(
+                "status",
+                "created_at",
+                "skill__name",
+                "owner__username",
+                "provider__username",
+            )
+            .order_by("-created_at")[:3]
+        )
+        # Only evaluated (an extra query) when debug logging is on
+        logger.debug("Dashboard of user %s, recent deals: %s", user.pk, recent_deals)
 
         # Unread messages
-        unread_messages = Message.objects.filter(receiver=user, is_read=False).order_by(
-            "-timestamp"
-        )[:3]
-
-        # Notification count
-        unread_messages_count = unread_messages.count()
-        pending_deals_count = SkillDeal.objects.filter(
-            provider=user, status=SkillDeal.PENDING
-        ).count()
+        unread_messages = (
+            Message.objects.filter(receiver=user, is_read=False)
+            .select_related("sender")
+            .only("content", "timestamp", "sender__username")
+            .order_by("-timestamp")[:3]
+        )
 
-        # Counting all deals related to the user
-        pending_deals = SkillDeal.objects.filter(
-            provider=user, status=SkillDeal.PENDING
-        ).count()
-        active_deals = SkillDeal.objects.filter(
-            provider=user, status=SkillDeal.ACTIVE
-        ).count()
-        completed_deals = SkillDeal.objects.filter(
-            provider=user, status=SkillDeal.COMPLETED
-        ).count()
-        cancelled_deals = SkillDeal.objects.filter(
-            provider=user, status=SkillDeal.CANCELLED
+        # Notification count (of all unread messages, not only the 3 shown)
+        unread_messages_count = Message.objects.filter(
+            receiver=user, is_read=False
         ).count()
 
+        # Counting all deals provided by the user, by status, in one query
+        deal_counts = SkillDeal.objects.filter(provider=user).status_counts()
+        pending_deals_count = pending_deals = deal_counts["pending"]
+        active_deals = deal_counts["active"]
+        completed_deals = deal_counts["completed"]
+        cancelled_deals = deal_counts["cancelled"]
+
+        # The sidebar shows the same counts; spare it from counting again
+        profile = getattr(user, "profile", None)
+        store_layout_data(
+            user,
+            profile_image=profile.profile_image.name if profile else None,
+            thumbnail_status=profile.thumbnail_status if profile else None,
+            unread_messages=unread_messages_count,
+            pending_deals=pending_deals_count,
+        )
+
         context = {
             "user": user,
             "suggested_skills": suggested_skills,
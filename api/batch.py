@@ -0,0 +1,116 @@
+"""The batch endpoint of the JSON API, running several API requests in one.
+
+A screen built from several resources, such as the dashboard of the mobile
+clients, would otherwise cost one round trip each. The batch view takes
+every query parameter as a sub-request, named by the parameter and given by
+the URL of an API resource:
+
+    GET /api/v1/batch/?profile=/api/v1/profile/&deals=/api/v1/deals/?limit%3D3
+
+The sub-requests are resolved and their views called in process, in order,
+sharing the request's user, session and database connection, so the
+session and the user are loaded once for all of them. They skip the
+middleware, which already ran for the batch. The response maps each name to
+the status and the JSON body of its sub-request:
+
+    {"profile": {"status": 200, "body": {...}}, "deals": {...}}
+
+The API is read-only, so the batch is a GET as well: it is read from the
+replicas like any other page, and needs no CSRF token."""
+
+import json
+import logging
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, JsonResponse, QueryDict
+from django.urls import Resolver404, get_script_prefix, resolve
+
+from .resources import ApiError
+from .views import ApiView
+
+logger = logging.getLogger(__name__)
+
+MAX_SUBREQUESTS = 10
+
+
+def build_subrequest(request, path: str, query: str) -> HttpRequest:
+    """Return a GET request for an API path, authenticated as the batch."""
+    subrequest = HttpRequest()
+    subrequest.method = "GET"
+    subrequest.path = path
+    subrequest.path_info = "/" + path.removeprefix(get_script_prefix())
+    subrequest.META = {
+        **request.META,
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": subrequest.path_info,
+        "QUERY_STRING": query,
+    }
+    subrequest.GET = QueryDict(query)
+    subrequest.COOKIES = request.COOKIES
+    subrequest.session = request.session
+    subrequest.user = request.user
+    return subrequest
+
+
+def run_subrequest(request, url: str) -> tuple[int, object]:
+    """Run a sub-request and return its status and decoded JSON body.
+
+    Raises:
+        ApiError: If the URL is not the URL of an API resource, or its view
+            does not answer with JSON.
+    """
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        raise ApiError(400, f"Not a path: {url}")
+    subrequest = build_subrequest(request, parts.path, parts.query)
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        raise ApiError(404, f"Not found: {parts.path}")
+    view_class = getattr(match.func, "view_class", None)
+    if (
+        view_class is None
+        or not issubclass(view_class, ApiView)
+        or issubclass(view_class, BatchView)
+    ):
+        raise ApiError(400, f"Not an API resource: {parts.path}")
+    response = match.func(subrequest, *match.args, **match.kwargs)
+    if response.streaming or response.get("Content-Type") != "application/json":
+        raise ApiError(500, f"Not a JSON response: {parts.path}")
+    return response.status_code, json.loads(response.content)
+
+
+class BatchView(ApiView):
+    """A class-based view running several API requests in one.
+
+    Methods:
+        get: A method to handle GET requests to the view.
+    """
+
+    def get(self, request):
+        """Run the sub-requests of the query string.
+
+        Args:
+            request (HttpRequest): The request object, whose parameters map
+                the name of each sub-request to its URL.
+
+        Returns:
+            JsonResponse: The status and body of every sub-request, by name.
+        """
+        if not request.GET:
+            raise ApiError(400, "No requests")
+        if len(request.GET) > MAX_SUBREQUESTS:
+            raise ApiError(400, f"At most {MAX_SUBREQUESTS} requests")
+
+        results = {}
+        for name, url in request.GET.items():
+            try:
+                status, body = run_subrequest(request, url)
+            except ApiError as error:
+                status, body = error.status, {"error": error.message}
+            except Exception:
+                # One failing sub-request must not fail the others
+                logger.exception("Batch sub-request %s failed: %s", name, url)
+                status, body = 500, {"error": "Internal server error"}
+            results[name] = {"status": status, "body": body}
+        return JsonResponse(results)
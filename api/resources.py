@@ -0,0 +1,179 @@
+"""The serializers and the cursor pagination of the JSON API.
+
+A serializer maps each API field to a dotted attribute path of the model,
+such as "owner.username". The fields a client asks for with ?fields= decide
+what is read from the database: only their columns are loaded, and only the
+relations they go through are joined with select_related(), so a list of
+skill names costs one narrow query.
+
+Lists are paginated with a keyset cursor instead of an offset: the cursor
+holds the ordering value and the primary key of the last item of a page, and
+the next page is read from the index from there on. Every page costs the same
+however deep it is, and rows written meanwhile never shift a page."""
+
+import base64
+import binascii
+import json
+
+from django.core.exceptions import (
+    FieldDoesNotExist,
+    ImproperlyConfigured,
+    ValidationError,
+)
+from django.db.models import Q
+
+
+class ApiError(Exception):
+    """Raised to answer an API request with a JSON error.
+
+    Attributes:
+        status: The HTTP status code of the response.
+        message: The error message returned to the client.
+    """
+
+    def __init__(self, status: int, message: str):
+        """Create an error with its status code and message."""
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Serializer:
+    """A class to turn model instances into dictionaries of JSON values.
+
+    Attributes:
+        model: The model serialized.
+        fields: A dict of the API field names to dotted attribute paths.
+            Foreign keys can be read without a join with their attname
+            (e.g. "owner_id").
+        default_fields: The fields returned without ?fields=, all if None.
+            "id" is always returned.
+    """
+
+    model = None
+    fields = {}
+    default_fields = None
+
+    def __init__(self, fields=None):
+        """Select the fields to serialize.
+
+        Args:
+            fields: The requested field names, the default fields if empty.
+
+        Raises:
+            ApiError: If a requested field does not exist.
+        """
+        requested = fields or self.default_fields or list(self.fields)
+        unknown = sorted(set(requested) - set(self.fields))
+        if unknown:
+            raise ApiError(400, f"Unknown fields: {', '.join(unknown)}")
+        self.selected = ["id", *(name for name in requested if name != "id")]
+
+    def prepare(self, queryset, *extra):
+        """Load only the columns and relations of the selected fields.
+
+        Args:
+            queryset: The queryset of the model.
+            *extra: Other columns to load, e.g. the ordering field.
+        """
+        related, columns = set(), set(extra)
+        for name in self.selected:
+            model, path = self.model, []
+            *relations, attribute = self.fields[name].split(".")
+            for relation in relations:
+                field = model._meta.get_field(relation)
+                path.append(field.name)
+                model = field.related_model
+            try:
+                field = model._meta.get_field(attribute)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__}.fields[{name!r}] is not a model field"
+                )
+            if path:
+                related.add("__".join(path))
+            columns.add("__".join([*path, field.name]))
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns)
+
+    def to_dict(self, instance) -> dict:
+        """Return the selected fields of an instance."""
+        data = {}
+        for name in self.selected:
+            value = instance
+            for attribute in self.fields[name].split("."):
+                value = getattr(value, attribute)
+                if value is None:
+                    break
+            data[name] = value
+        return data
+
+
+class CursorPaginator:
+    """A class to paginate a queryset by keyset.
+
+    The items are ordered by one field, then by primary key to break ties,
+    both in the direction of the field.
+
+    Attributes:
+        ordering: The ordering field, prefixed with "-" for descending order.
+        limit: The number of items per page.
+    """
+
+    def __init__(self, ordering: str, limit: int):
+        """Create a paginator for an ordering and a page size."""
+        self.ordering = ordering
+        self.descending = ordering.startswith("-")
+        self.field_name = ordering.lstrip("-")
+        self.limit = limit
+
+    def encode_cursor(self, instance) -> str:
+        """Return the cursor of the page following an instance.
+
+        The ordering value is kept as the field serializes it, without loss:
+        a datetime keeps its microseconds, so the next page starts exactly
+        after the instance, even among rows sharing its millisecond.
+        """
+        field = instance._meta.get_field(self.field_name)
+        position = [field.value_to_string(instance), instance.pk]
+        data = json.dumps(position).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+    def decode_cursor(self, queryset, cursor: str):
+        """Return the ordering value and primary key held by a cursor.
+
+        Raises:
+            ApiError: If the cursor is invalid.
+        """
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            value, pk = json.loads(data)
+            field = queryset.model._meta.get_field(self.field_name)
+            return field.to_python(value), int(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise ApiError(400, "Invalid cursor")
+
+    def paginate(self, queryset, cursor=None):
+        """Return a page of items and the cursor of the next page.
+
+        Args:
+            queryset: The queryset to paginate.
+            cursor: The cursor of the page, None for the first page.
+
+        Returns:
+            A (items, next_cursor) tuple; next_cursor is None on the last page.
+        """
+        direction = "-" if self.descending else ""
+        queryset = queryset.order_by(self.ordering, f"{direction}pk")
+        if cursor:
+            value, pk = self.decode_cursor(queryset, cursor)
+            lookup = "lt" if self.descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.field_name}__{lookup}": value})
+                | Q(**{self.field_name: value, f"pk__{lookup}": pk})
+            )
+        items = list(queryset[: self.limit + 1])
+        if len(items) > self.limit:
+            return items[: self.limit], self.encode_cursor(items[self.limit - 1])
+        return items, None
@@ -0,0 +1,111 @@
+"""The serializers of the resources of the JSON API, version 1."""
+
+from skills.models import Message, Notification, Review, Skill, SkillDeal
+
+from .resources import Serializer
+
+
+class SkillSerializer(Serializer):
+    """A class to serialize skills."""
+
+    model = Skill
+    fields = {
+        "id": "id",
+        "name": "name",
+        "level": "level",
+        "description": "description",
+        "skill_type": "skill_type",
+        "category": "category.name",
+        "category_id": "category_id",
+        "owner": "owner.username",
+        "owner_id": "owner_id",
+        "rating": "rating",
+        "rating_count": "rating_count",
+        "score": "score",
+        "date": "date",
+        "updated_at": "updated_at",
+    }
+    default_fields = [
+        "name",
+        "level",
+        "skill_type",
+        "category",
+        "owner",
+        "rating",
+        "rating_count",
+    ]
+
+
+class SkillDealSerializer(Serializer):
+    """A class to serialize skill deals."""
+
+    model = SkillDeal
+    fields = {
+        "id": "id",
+        "skill": "skill.name",
+        "skill_id": "skill_id",
+        "owner": "owner.username",
+        "owner_id": "owner_id",
+        "provider": "provider.username",
+        "provider_id": "provider_id",
+        "status": "status",
+        "created_at": "created_at",
+        "start_date": "start_date",
+        "end_date": "end_date",
+    }
+    default_fields = [
+        "skill",
+        "owner",
+        "provider",
+        "status",
+        "created_at",
+        "start_date",
+        "end_date",
+    ]
+
+
+class MessageSerializer(Serializer):
+    """A class to serialize the messages of the user's inbox."""
+
+    model = Message
+    fields = {
+        "id": "id",
+        "sender": "sender.username",
+        "sender_id": "sender_id",
+        "deal_id": "skill_deal_id",
+        "reply_to_id": "reply_to_id",
+        "content": "content",
+        "is_read": "is_read",
+        "timestamp": "timestamp",
+    }
+    default_fields = ["sender", "deal_id", "content", "is_read", "timestamp"]
+
+
+class ReviewSerializer(Serializer):
+    """A class to serialize reviews."""
+
+    model = Review
+    fields = {
+        "id": "id",
+        "skill": "skill.name",
+        "skill_id": "skill_id",
+        "owner": "owner.username",
+        "owner_id": "owner_id",
+        "deal_id": "deal_id",
+        "review": "review",
+        "rating": "rating",
+        "date": "date",
+    }
+    default_fields = ["skill_id", "owner", "review", "rating", "date"]
+
+
+class NotificationSerializer(Serializer):
+    """A class to serialize the user's notifications."""
+
+    model = Notification
+    fields = {
+        "id": "id",
+        "message": "message",
+        "is_read": "is_read",
+        "timestamp": "timestamp",
+    }
@@ -0,0 +1,294 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from skills.models import Category, Message, Notification, Skill, SkillDeal
+
+from .resources import ApiError, CursorPaginator
+from .serializers import SkillSerializer
+from .views import CounterView, ProfileView
+
+
+class ApiTests(TestCase):
+    """Tests for the versioned JSON API."""
+
+    def setUp(self):
+        """Set up two users, their skills, a deal between them and a deal
+        between other users."""
+        User = get_user_model()
+        self.alice = User.objects.create_user(username="alice", password="pass")
+        self.bob = User.objects.create_user(username="bob", password="pass")
+        carol = User.objects.create_user(username="carol")
+        dave = User.objects.create_user(username="dave")
+        category = Category.objects.create(name="Outdoors")
+        self.skills = [
+            Skill.objects.create(
+                name=f"Skill {i}",
+                level="Expert",
+                description="Help.",
+                owner=self.bob,
+                category=category,
+                skill_type="offered",
+                score=i / 10,
+            )
+            for i in range(5)
+        ]
+        self.deal = SkillDeal.objects.create(
+            skill=self.skills[0], owner=self.alice, provider=self.bob
+        )
+        self.other_deal = SkillDeal.objects.create(
+            skill=self.skills[1], owner=carol, provider=dave
+        )
+        self.message = Message.objects.create(
+            skill_deal=self.deal, sender=self.bob, receiver=self.alice, content="Hi"
+        )
+        self.other_message = Message.objects.create(
+            skill_deal=self.deal, sender=self.alice, receiver=self.bob, content="Hey"
+        )
+        Notification.objects.create(user=self.alice, message="For alice")
+        Notification.objects.create(user=self.bob, message="For bob")
+        self.client.login(username="alice", password="pass")
+
+    def test_anonymous_request_is_unauthorized(self):
+        """Test that the API answers anonymous requests with a JSON 401."""
+        self.client.logout()
+        response = self.client.get(reverse("api_skill_list"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {"error": "Authentication required"})
+
+    def test_sparse_fields_limit_loaded_columns(self):
+        """Test that ?fields= selects the fields returned, the columns loaded
+        and the tables joined."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("api_skill_list"), {"fields": "name", "limit": 2}
+            )
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"id": self.skills[4].pk, "name": "Skill 4"},
+                {"id": self.skills[3].pk, "name": "Skill 3"},
+            ],
+        )
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("description", sql)
+        self.assertNotIn("JOIN", sql)
+
+        response = self.client.get(
+            reverse("api_skill_list"), {"fields": "name,owner", "limit": 1}
+        )
+        self.assertEqual(response.json()["results"][0]["owner"], "bob")
+
+    def test_unknown_field_is_bad_request(self):
+        """Test that requesting an unknown field returns a JSON 400."""
+        response = self.client.get(reverse("api_skill_list"), {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Unknown fields: password"})
+        with self.assertRaises(ApiError):
+            SkillSerializer(["rating_sum"])
+
+    def test_cursor_pages_cover_list_once(self):
+        """Test that following the next URLs returns every item once, in
+        order, with a constant number of queries per page."""
+        url = reverse("api_skill_list") + "?fields=name&limit=2"
+        names = []
+        while url:
+            with self.assertNumQueries(3):
+                # The session, the user and the page
+                response = self.client.get(url)
+            names += [skill["name"] for skill in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(names, [f"Skill {i}" for i in reversed(range(5))])
+
+    def test_cursor_pages_keep_timestamp_ties_and_microseconds(self):
+        """Test that cursor pages neither skip nor repeat rows sharing a
+        timestamp, or differing from it by less than a millisecond."""
+        moment = timezone.now() - timedelta(days=1)
+        offsets = [0, 0, 0, 100, 400]
+        for offset in offsets:
+            notification = Notification.objects.create(user=self.alice, message="Tie")
+            Notification.objects.filter(pk=notification.pk).update(
+                timestamp=moment + timedelta(microseconds=offset)
+            )
+        notifications = Notification.objects.filter(user=self.alice)
+        expected = list(notifications.order_by("-timestamp", "-pk"))
+
+        url = reverse("api_notification_list") + "?limit=1"
+        ids = []
+        while url:
+            response = self.client.get(url)
+            ids += [item["id"] for item in response.json()["results"]]
+            url = response.json()["next"]
+        self.assertEqual(ids, [notification.pk for notification in expected])
+
+        paginator = CursorPaginator("timestamp", 1)
+        items, cursor = paginator.paginate(notifications)
+        pages = [items]
+        while cursor:
+            items, cursor = paginator.paginate(notifications, cursor)
+            pages.append(items)
+        self.assertEqual(
+            [item.pk for page in pages for item in page],
+            [item.pk for item in reversed(expected)],
+        )
+
+    def test_invalid_cursor_is_bad_request(self):
+        """Test that a malformed cursor returns a JSON 400."""
+        response = self.client.get(reverse("api_skill_list"), {"cursor": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_deals_are_scoped_to_user(self):
+        """Test that only the deals the user takes part in are returned."""
+        response = self.client.get(reverse("api_deal_list"))
+        self.assertEqual(
+            [deal["id"] for deal in response.json()["results"]], [self.deal.pk]
+        )
+        response = self.client.get(reverse("api_deal_detail", args=[self.deal.pk]))
+        self.assertEqual(response.json()["provider"], "bob")
+        response = self.client.get(
+            reverse("api_deal_detail", args=[self.other_deal.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_messages_are_scoped_to_receiver(self):
+        """Test that only the messages the user received are returned."""
+        response = self.client.get(reverse("api_message_list"), {"unread": "1"})
+        self.assertEqual(
+            [message["content"] for message in response.json()["results"]], ["Hi"]
+        )
+        response = self.client.get(
+            reverse("api_message_detail", args=[self.other_message.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_notifications_are_scoped_to_user(self):
+        """Test that only the user's notifications are returned."""
+        response = self.client.get(reverse("api_notification_list"))
+        self.assertEqual(
+            [item["message"] for item in response.json()["results"]], ["For alice"]
+        )
+
+    def test_write_methods_are_not_allowed(self):
+        """Test that the resources are read-only."""
+        response = self.client.post(reverse("api_skill_list"))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response.json(), {"error": "Method not allowed"})
+
+
+class BatchTests(TestCase):
+    """Tests for the batch endpoint of the API."""
+
+    def setUp(self):
+        """Set up a logged in user with a profile, a wanted skill offered by
+        another user, a deal and an unread message."""
+        User = get_user_model()
+        self.alice = User.objects.create_user(username="alice", password="pass")
+        self.bob = User.objects.create_user(username="bob")
+        UserProfile.objects.create(user=self.alice, location="Leeds")
+        category = Category.objects.create(name="Outdoors")
+        for owner, skill_type in ((self.alice, "wanted"), (self.bob, "offered")):
+            skill = Skill.objects.create(
+                name="Gardening",
+                level="Expert",
+                description="Help.",
+                owner=owner,
+                category=category,
+                skill_type=skill_type,
+            )
+        deal = SkillDeal.objects.create(
+            skill=skill, owner=self.bob, provider=self.alice
+        )
+        Message.objects.create(
+            skill_deal=deal, sender=self.bob, receiver=self.alice, content="Hi"
+        )
+        self.client.login(username="alice", password="pass")
+
+    def test_batch_returns_dashboard_in_one_request(self):
+        """Test that the sub-requests of the dashboard run in one request,
+        loading the session and the user once."""
+        urls = {
+            "profile": reverse("api_profile"),
+            "counters": reverse("api_counters"),
+            "deals": reverse("api_deal_list") + "?limit=3&fields=skill,status",
+            "messages": reverse("api_message_list") + "?unread=1&limit=3",
+            "suggestions": reverse("api_suggestion_list") + "?limit=4",
+        }
+        # The session and the user, then profile (1), counters (2), deals
+        # (1), messages (1) and suggestions (2)
+        with self.assertNumQueries(9):
+            response = self.client.get(reverse("api_batch"), urls)
+
+        data = response.json()
+        self.assertEqual(list(data), list(urls))
+        self.assertTrue(all(item["status"] == 200 for item in data.values()))
+        self.assertEqual(data["profile"]["body"]["profile"]["location"], "Leeds")
+        self.assertEqual(data["counters"]["body"]["unread_messages"], 1)
+        self.assertEqual(data["counters"]["body"]["provided_deals"]["pending"], 1)
+        self.assertEqual(
+            data["deals"]["body"]["results"][0]["status"], SkillDeal.PENDING
+        )
+        self.assertEqual(data["messages"]["body"]["results"][0]["content"], "Hi")
+        self.assertEqual(
+            [skill["owner"] for skill in data["suggestions"]["body"]["results"]],
+            ["bob"],
+        )
+
+    def test_sub_request_errors_are_reported_by_name(self):
+        """Test that a failing sub-request returns its own error without
+        failing the others."""
+        response = self.client.get(
+            reverse("api_batch"),
+            {
+                "skills": reverse("api_skill_list") + "?fields=password",
+                "missing": "/api/v1/nothing/",
+                "page": reverse("dashboard", args=[self.alice.pk]),
+                "batch": reverse("api_batch"),
+                "profile": reverse("api_profile"),
+            },
+        )
+        data = response.json()
+        self.assertEqual(data["skills"]["status"], 400)
+        self.assertEqual(data["missing"]["status"], 404)
+        self.assertEqual(data["page"]["status"], 400)
+        self.assertEqual(data["batch"]["status"], 400)
+        self.assertEqual(data["profile"]["status"], 200)
+
+    def test_failing_sub_request_does_not_fail_batch(self):
+        """Test that a sub-request raising an exception, or answering with
+        something else than JSON, gets a 500 entry of its own."""
+        with (
+            mock.patch.object(ProfileView, "get", side_effect=RuntimeError),
+            mock.patch.object(
+                CounterView, "get", return_value=HttpResponse("<html></html>")
+            ),
+            self.assertLogs("api.batch", "ERROR"),
+        ):
+            response = self.client.get(
+                reverse("api_batch"),
+                {
+                    "profile": reverse("api_profile"),
+                    "counters": reverse("api_counters"),
+                    "messages": reverse("api_message_list"),
+                },
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["profile"]["status"], 500)
+        self.assertEqual(data["counters"]["status"], 500)
+        self.assertEqual(data["messages"]["status"], 200)
+
+    def test_batch_requires_authentication(self):
+        """Test that anonymous batches are refused before any sub-request."""
+        self.client.logout()
+        response = self.client.get(
+            reverse("api_batch"), {"profile": reverse("api_profile")}
+        )
+        self.assertEqual(response.status_code, 401)
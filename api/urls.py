@@ -0,0 +1,48 @@
+from django.urls import path
+
+from .batch import BatchView
+from .views import (
+    CounterView,
+    MessageResourceView,
+    NotificationResourceView,
+    ProfileView,
+    ReviewResourceView,
+    SkillDealResourceView,
+    SkillResourceView,
+    SuggestionResourceView,
+)
+
+urlpatterns = [
+    path("v1/skills/", SkillResourceView.as_view(), name="api_skill_list"),
+    path("v1/skills/<int:pk>/", SkillResourceView.as_view(), name="api_skill_detail"),
+    path("v1/deals/", SkillDealResourceView.as_view(), name="api_deal_list"),
+    path("v1/deals/<int:pk>/", SkillDealResourceView.as_view(), name="api_deal_detail"),
+    path("v1/messages/", MessageResourceView.as_view(), name="api_message_list"),
+    path(
+        "v1/messages/<int:pk>/",
+        MessageResourceView.as_view(),
+        name="api_message_detail",
+    ),
+    path("v1/reviews/", ReviewResourceView.as_view(), name="api_review_list"),
+    path(
+        "v1/reviews/<int:pk>/", ReviewResourceView.as_view(), name="api_review_detail"
+    ),
+    path(
+        "v1/notifications/",
+        NotificationResourceView.as_view(),
+        name="api_notification_list",
+    ),
+    path(
+        "v1/notifications/<int:pk>/",
+        NotificationResourceView.as_view(),
+        name="api_notification_detail",
+    ),
+    path("v1/profile/", ProfileView.as_view(), name="api_profile"),
+    path("v1/counters/", CounterView.as_view(), name="api_counters"),
+    path(
+        "v1/suggestions/",
+        SuggestionResourceView.as_view(),
+        name="api_suggestion_list",
+    ),
+    path("v1/batch/", BatchView.as_view(), name="api_batch"),
+]
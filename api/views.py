@@ -0,0 +1,364 @@
+"""The views of the JSON API, version 1.
+
+Every resource is read with GET from a list URL and a detail URL:
+
+- ?fields=a,b selects the fields returned (see the serializers), and with
+  them the columns loaded and the tables joined.
+- ?limit= sets the page size (DEFAULT_LIMIT, at most MAX_LIMIT), and the
+  "next" URL of a page continues the list after it.
+- The other parameters filter the list; they are listed by each view.
+
+The API is only open to logged in users, authenticated by the session of the
+site, and every resource is scoped to what the user can see on the site:
+deals they take part in, messages they received and their notifications.
+Errors are returned as {"error": message} with their status code.
+
+The profile, counters and suggestions views serve the data of the dashboard
+that has no other resource."""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse
+from django.views import View
+
+from accounts.models import UserProfile
+from accounts.thumbnails import THUMBNAIL_SIZES, thumbnail_url
+from skills.models import Message, Notification, Skill, SkillDeal
+
+from .resources import ApiError, CursorPaginator
+from .serializers import (
+    MessageSerializer,
+    NotificationSerializer,
+    ReviewSerializer,
+    SkillDealSerializer,
+    SkillSerializer,
+)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def error_response(status: int, message: str) -> JsonResponse:
+    """Return a JSON error response."""
+    return JsonResponse({"error": message}, status=status)
+
+
+def int_param(request, name: str):
+    """Return an integer query parameter, None if it is not given.
+
+    Raises:
+        ApiError: If the parameter is not an integer.
+    """
+    value = request.GET.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(400, f"{name} must be an integer")
+
+
+def bool_param(request, name: str) -> bool:
+    """Return whether a query parameter is set to a true value."""
+    return request.GET.get(name, "").lower() in TRUE_VALUES
+
+
+class ApiView(View):
+    """A base class-based view for the API.
+
+    Methods:
+        dispatch: A method to authenticate the request and turn API errors
+            into JSON responses.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        """Answer anonymous requests with 401 and API errors with JSON."""
+        if not request.user.is_authenticated:
+            return error_response(401, "Authentication required")
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return error_response(error.status, error.message)
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        """Answer the methods not allowed with a JSON 405."""
+        allowed = super().http_method_not_allowed(request, *args, **kwargs)
+        response = error_response(405, "Method not allowed")
+        response.headers["Allow"] = allowed.headers["Allow"]
+        return response
+
+
+class ResourceView(ApiView):
+    """A base class-based view listing a resource or returning one item.
+
+    Attributes:
+        serializer_class: The Serializer of the resource.
+        ordering: The ordering field of the list, prefixed with "-" for
+            descending order. It should be indexed, with the filters used.
+
+    Methods:
+        get_queryset: A method returning the items the user can see.
+        filter_queryset: A method applying the filters of the query string.
+        get: A method returning the list, or one item if pk is given.
+    """
+
+    http_method_names = ["get", "head", "options"]
+    serializer_class = None
+    ordering = None
+
+    def get_queryset(self):
+        """Return the items of the resource the user can see."""
+        return self.serializer_class.model._default_manager.all()
+
+    def filter_queryset(self, queryset):
+        """Return the items matching the filters of the query string."""
+        return queryset
+
+    def get_serializer(self):
+        """Return a serializer of the fields requested with ?fields=."""
+        fields = [
+            name.strip()
+            for name in self.request.GET.get("fields", "").split(",")
+            if name.strip()
+        ]
+        return self.serializer_class(fields)
+
+    def get_limit(self) -> int:
+        """Return the page size requested with ?limit=."""
+        limit = int_param(self.request, "limit")
+        if limit is None:
+            return DEFAULT_LIMIT
+        if limit < 1:
+            raise ApiError(400, "limit must be positive")
+        return min(limit, MAX_LIMIT)
+
+    def get(self, request, pk=None):
+        """Return the list of the items of the resource, or one item.
+
+        Args:
+            request (HttpRequest): The request object.
+            pk (int): The id of the item, None for the list.
+
+        Returns:
+            JsonResponse: The item, or {"results": [...], "next": url}
+            where next is None on the last page.
+        """
+        serializer = self.get_serializer()
+        paginator = CursorPaginator(self.ordering, self.get_limit())
+        queryset = serializer.prepare(self.get_queryset(), paginator.field_name)
+
+        if pk is not None:
+            instance = queryset.filter(pk=pk).first()
+            if instance is None:
+                raise ApiError(404, "Not found")
+            return JsonResponse(serializer.to_dict(instance), encoder=DjangoJSONEncoder)
+
+        items, cursor = paginator.paginate(
+            self.filter_queryset(queryset), request.GET.get("cursor")
+        )
+        next_url = None
+        if cursor:
+            params = request.GET.copy()
+            params["cursor"] = cursor
+            next_url = f"{request.path}?{params.urlencode()}"
+        return JsonResponse(
+            {
+                "results": [serializer.to_dict(item) for item in items],
+                "next": next_url,
+            },
+            encoder=DjangoJSONEncoder,
+        )
+
+
+class SkillResourceView(ResourceView):
+    """The skills, best ranked first.
+
+    Filters: skill_type, category (id), owner (id or "me"), search (in the
+    name and description).
+    """
+
+    serializer_class = SkillSerializer
+    ordering = "-score"
+
+    def filter_queryset(self, queryset):
+        """Filter the skills by type, category, owner and search term."""
+        if skill_type := self.request.GET.get("skill_type"):
+            queryset = queryset.filter(skill_type=skill_type)
+        if (category := int_param(self.request, "category")) is not None:
+            queryset = queryset.filter(category_id=category)
+        if self.request.GET.get("owner") == "me":
+            queryset = queryset.filter(owner=self.request.user)
+        elif (owner := int_param(self.request, "owner")) is not None:
+            queryset = queryset.filter(owner_id=owner)
+        if search := self.request.GET.get("search"):
+            queryset = queryset.filter(
+                Q(name__icontains=search) | Q(description__icontains=search)
+            )
+        return queryset
+
+
+class SkillDealResourceView(ResourceView):
+    """The deals the user requested or provides, newest first.
+
+    Filters: status, role ("provided" or "requested").
+    """
+
+    serializer_class = SkillDealSerializer
+    ordering = "-created_at"
+
+    def get_queryset(self):
+        """Return the deals the user takes part in."""
+        return SkillDeal.objects.involving(self.request.user)
+
+    def filter_queryset(self, queryset):
+        """Filter the deals by status and by the user's role."""
+        if status := self.request.GET.get("status"):
+            queryset = queryset.filter(status=status)
+        role = self.request.GET.get("role")
+        if role == "provided":
+            queryset = queryset.filter(provider=self.request.user)
+        elif role == "requested":
+            queryset = queryset.filter(owner=self.request.user)
+        elif role:
+            raise ApiError(400, "role must be provided or requested")
+        return queryset
+
+
+class MessageResourceView(ResourceView):
+    """The messages the user received, newest first.
+
+    Filters: unread, deal (id).
+    """
+
+    serializer_class = MessageSerializer
+    ordering = "-timestamp"
+
+    def get_queryset(self):
+        """Return the messages of the user's inbox."""
+        return Message.objects.received_by(self.request.user)
+
+    def filter_queryset(self, queryset):
+        """Filter the messages by read status and deal."""
+        if bool_param(self.request, "unread"):
+            queryset = queryset.filter(is_read=False)
+        if (deal := int_param(self.request, "deal")) is not None:
+            queryset = queryset.filter(skill_deal_id=deal)
+        return queryset
+
+
+class ReviewResourceView(ResourceView):
+    """The reviews, newest first.
+
+    Filters: skill (id), owner (id).
+    """
+
+    serializer_class = ReviewSerializer
+    ordering = "-date"
+
+    def filter_queryset(self, queryset):
+        """Filter the reviews by skill and author."""
+        if (skill := int_param(self.request, "skill")) is not None:
+            queryset = queryset.filter(skill_id=skill)
+        if (owner := int_param(self.request, "owner")) is not None:
+            queryset = queryset.filter(owner_id=owner)
+        return queryset
+
+
+class NotificationResourceView(ResourceView):
+    """The user's notifications, newest first.
+
+    Filters: unread.
+    """
+
+    serializer_class = NotificationSerializer
+    ordering = "-timestamp"
+
+    def get_queryset(self):
+        """Return the user's notifications."""
+        return Notification.objects.filter(user=self.request.user)
+
+    def filter_queryset(self, queryset):
+        """Filter the notifications by read status."""
+        if bool_param(self.request, "unread"):
+            queryset = queryset.filter(is_read=False)
+        return queryset
+
+
+class SuggestionResourceView(ResourceView):
+    """The skills offered by others under the names of the skills the user
+    wants, best ranked first, as on the dashboard."""
+
+    serializer_class = SkillSerializer
+    ordering = "-score"
+
+    def get_queryset(self):
+        """Return the skills suggested to the user."""
+        return Skill.objects.suggested_for(self.request.user)
+
+
+class ProfileView(ApiView):
+    """A class-based view returning the profile of the logged in user.
+
+    Methods:
+        get: A method to handle GET requests to the view.
+    """
+
+    def get(self, request):
+        """Return the user's account and profile, with the URLs of the
+        variants of their profile image."""
+        user = request.user
+        profile = (
+            UserProfile.objects.filter(user=user)
+            .only(
+                "profile_image",
+                "thumbnail_status",
+                "location",
+                "bio",
+                "availability",
+                "credits",
+            )
+            .first()
+        )
+        data = {"id": user.pk, "username": user.username, "profile": None}
+        if profile:
+            data["profile"] = {
+                "location": profile.location,
+                "bio": profile.bio,
+                "availability": profile.availability,
+                "credits": profile.credits,
+                "image_urls": {
+                    size: thumbnail_url(
+                        user.pk,
+                        profile.profile_image.name,
+                        profile.thumbnail_status,
+                        size,
+                    )
+                    for size in THUMBNAIL_SIZES
+                },
+            }
+        return JsonResponse(data)
+
+
+class CounterView(ApiView):
+    """A class-based view returning the counters of the dashboard.
+
+    Methods:
+        get: A method to handle GET requests to the view.
+    """
+
+    def get(self, request):
+        """Return the number of unread messages of the user and of the deals
+        they provide, by status."""
+        user = request.user
+        return JsonResponse(
+            {
+                "unread_messages": Message.objects.received_by(user)
+                .filter(is_read=False)
+                .count(),
+                "provided_deals": SkillDeal.objects.filter(
+                    provider=user
+                ).status_counts(),
+            }
+        )
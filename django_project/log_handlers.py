@@ -0,0 +1,79 @@
+"""Logging handlers and formatters keeping log I/O off the request thread.
+
+QueueListenerHandler is a QueueHandler: logging a record only formats it and
+puts it on an in-memory queue. A QueueListener thread takes records off the
+queue and writes them to the real stream or file, so slow or synchronous
+writes never block a request."""
+
+import atexit
+import json
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+# Attributes every LogRecord has; anything else was passed with `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """A formatter writing each record as one JSON object per line.
+
+    The object has the time, level, logger name and message of the record,
+    the formatted traceback if any, and every field passed with `extra`.
+    """
+
+    def format(self, record):
+        """Return the record as a JSON line."""
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueListenerHandler(QueueHandler):
+    """A handler queueing records for a background thread to write.
+
+    The records are written to `filename` if given, otherwise to `stream`
+    (stderr by default). The handler's formatter is applied before the
+    record is queued; the listener writes the formatted text as is.
+
+    Attributes:
+        target: The handler doing the actual I/O.
+        listener: The QueueListener feeding the target from the queue.
+    """
+
+    def __init__(self, stream=None, filename=None):
+        """Create the target handler and start the listener thread."""
+        super().__init__(queue.SimpleQueue())
+        if filename:
+            self.target = WatchedFileHandler(filename, encoding="utf-8")
+        else:
+            self.target = logging.StreamHandler(stream)
+        self._start_listener()
+        atexit.register(self.close)
+        # A forked worker does not inherit the listener thread
+        os.register_at_fork(after_in_child=self._start_listener)
+
+    def _start_listener(self) -> None:
+        """Start a listener thread for the current process."""
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def close(self):
+        """Write out the queued records, then stop the listener."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
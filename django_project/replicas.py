@@ -0,0 +1,127 @@
+"""Read replica support for the database layer.
+
+Reads are routed to one of the aliases in settings.DATABASE_REPLICAS and
+writes always go to the primary ("default") database. Reads go to the
+primary as well inside a primary transaction, after the current request has
+written anything, and for REPLICA_STICKY_SECONDS after a request that wrote
+(via a cookie), so users always read their own writes.
+
+Locally a replica is a separate SQLite file kept in sync with the primary
+through the SQLite backup API (see the sync_replicas command)."""
+
+import random
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = "default"
+STICKY_COOKIE = "pin_primary"
+
+_pinned = ContextVar("pinned_to_primary", default=False)
+_wrote = ContextVar("wrote_to_primary", default=False)
+
+
+def is_pinned() -> bool:
+    """Return True if reads in the current context must use the primary."""
+    return _pinned.get() or _wrote.get()
+
+
+@contextmanager
+def pin_to_primary():
+    """A context manager sending every read inside it to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """A database router sending reads to replicas and writes to the primary.
+
+    Methods:
+        db_for_read: Pick a replica, or the primary when pinned.
+        db_for_write: Always the primary.
+        allow_relation: Allow relations between the primary and its replicas.
+        allow_migrate: Only migrate the primary; replicas are copies of it.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Return a random replica unless the context is pinned or a
+        transaction is open on the primary."""
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        if not replicas or is_pinned() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        """Send all writes to the primary and pin the following reads of
+        the current context to it."""
+        _wrote.set(True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Objects read from a replica may be related to primary objects."""
+        databases = {PRIMARY, *getattr(settings, "DATABASE_REPLICAS", [])}
+        return obj1._state.db in databases and obj2._state.db in databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only run migrations against the primary."""
+        return db == PRIMARY
+
+
+class ReplicaPinningMiddleware:
+    """A middleware scoping replica pinning to a single request.
+
+    A request is pinned up front when it uses an unsafe method or carries
+    the sticky cookie, and becomes pinned as soon as it writes. Any request
+    that wrote sets the sticky cookie, so the page shown after a write (e.g.
+    a redirect) is read from the primary while the replicas catch up.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler in the middleware chain."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request with its own pinning state."""
+        unsafe = request.method not in ("GET", "HEAD", "OPTIONS", "TRACE")
+        pinned = _pinned.set(unsafe or STICKY_COOKIE in request.COOKIES)
+        wrote = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            if unsafe or _wrote.get():
+                response.set_cookie(
+                    STICKY_COOKIE,
+                    "1",
+                    max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 5),
+                    httponly=True,
+                    samesite="Lax",
+                )
+        finally:
+            _wrote.reset(wrote)
+            _pinned.reset(pinned)
+        return response
+
+
+def sync_replica(primary_path, replica_path, pages: int = -1) -> None:
+    """Copy the primary SQLite database onto a replica file.
+
+    Uses the SQLite online backup API, so the primary stays available for
+    reads and writes while the copy is taken.
+
+    Args:
+        primary_path: The path of the primary database file.
+        replica_path: The path of the replica database file.
+        pages: The number of pages copied per step (-1 copies all at once).
+    """
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
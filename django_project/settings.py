@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,32 +45,49 @@ INSTALLED_APPS = [
     "accounts.apps.AccountsConfig",
     "skills.apps.SkillsConfig",
     "pages.apps.PagesConfig",
+    "perf.apps.PerfConfig",
+    "mediastore.apps.MediastoreConfig",
+    "api.apps.ApiConfig",
 ]
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 MIDDLEWARE = [
+    "perf.middleware.MetricsMiddleware",
+    "perf.middleware.QueryInspectionMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "django_project.staticfiles.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "perf.middleware.RequestProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "django_project.urls"
 
+# Production keeps compiled templates in memory with the cached loader;
+# development reads them from disk on every render so edits show at once.
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "perf.template_backend.InstrumentedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "accounts.context_processors.layout",
             ],
         },
     },
@@ -88,6 +106,58 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile, enabled with DJANGO_DATABASE_PROFILE=production.
+# WAL lets readers run alongside the single writer, IMMEDIATE transactions and
+# busy_timeout make concurrent writers queue instead of failing with
+# "database is locked", and connections are kept open between requests.
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 20000,
+    "mmap_size": 268435456,  # 256 MiB
+    "cache_size": -65536,  # 64 MiB
+    "temp_store": "MEMORY",
+    # Keep the query planner statistics fresh on long-lived connections
+    "optimize": "0x10002",
+}
+SQLITE_PRODUCTION_OPTIONS = {
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    # Run on every new connection
+    "init_command": ";".join(
+        f"PRAGMA {name} = {value}" for name, value in SQLITE_PRODUCTION_PRAGMAS.items()
+    ),
+}
+
+DATABASE_PROFILE = os.environ.get("DJANGO_DATABASE_PROFILE", "development")
+
+if DATABASE_PROFILE == "production":
+    DATABASES["default"].update(
+        {
+            "OPTIONS": SQLITE_PRODUCTION_OPTIONS,
+            "CONN_MAX_AGE": 600,
+            "CONN_HEALTH_CHECKS": True,
+        }
+    )
+
+# Read replicas, enabled with DJANGO_DATABASE_REPLICAS=<count>. Locally each
+# replica is a SQLite copy of the primary refreshed by `manage.py sync_replicas`.
+# Requests are pinned to the primary for REPLICA_STICKY_SECONDS after a write.
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get("DJANGO_DATABASE_REPLICAS", 0)) + 1):
+    DATABASES[f"replica{number}"] = {
+        **DATABASES["default"],
+        "NAME": BASE_DIR / f"db_replica{number}.sqlite3",
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{number}")
+
+DATABASE_ROUTERS = ["django_project.replicas.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = 5
+
+if DATABASE_REPLICAS:
+    MIDDLEWARE.insert(0, "django_project.replicas.ReplicaPinningMiddleware")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -125,10 +195,36 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+# In production `collectstatic` content-hashes the file names and writes
+# gzip (and, with the brotli package installed, brotli) variants, which
+# django_project.staticfiles.StaticFilesMiddleware serves with immutable
+# far-future caching.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # Uploads are stored once per content (see mediastore.storage)
+    "media": {"BACKEND": "mediastore.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+if not DEBUG:
+    STORAGES["staticfiles"] = {
+        "BACKEND": "django_project.staticfiles.CompressedManifestStaticFilesStorage"
+    }
 
 # Media files (user-uploaded files)
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# How mediastore.views.MediaView sends the media files once access is checked:
+# "python" (FileResponse, sent with os.sendfile() by WSGI servers supporting
+# wsgi.file_wrapper), "x-accel-redirect" (nginx) or "x-sendfile" (Apache,
+# lighttpd). nginx must map MEDIA_ACCEL_REDIRECT_PREFIX to MEDIA_ROOT in an
+# `internal` location.
+MEDIA_SERVE_MODE = os.environ.get("DJANGO_MEDIA_SERVE_MODE", "python")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+MEDIA_BLOCK_SIZE = 256 * 1024
+# Seconds an unreferenced upload is kept before gc_media removes it
+MEDIA_GC_GRACE_PERIOD = 24 * 3600
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -145,3 +241,138 @@ AUTH_USER_MODEL = "accounts.CustomUser"
 # Crispy forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Notification digests
+# Events of these types are held back for `window` seconds and coalesced into
+# one summary notification per user when at least `threshold` of them arrive.
+NOTIFICATION_DIGESTS = {
+    "deal_requested": {"window": 300, "threshold": 3},
+    "message_received": {"window": 120, "threshold": 5},
+}
+
+# Skill ratings
+# The displayed rating is a Bayesian average that treats SKILL_RATING_PRIOR
+# as if it had been given by SKILL_RATING_PRIOR_WEIGHT reviews.
+SKILL_RATING_PRIOR = 5.0
+SKILL_RATING_PRIOR_WEIGHT = 2
+
+# Skill lists are ordered by the lower bound of the Wilson confidence interval
+# of each skill's ratings; SKILL_RANKING_Z sets the confidence (1.96 = 95%).
+SKILL_RANKING_Z = 1.96
+
+# Query inspection
+# QueryInspectionMiddleware records the queries of every request when
+# QUERY_INSPECTION is on, adds an X-Query-Summary header and, in DEBUG, logs
+# query shapes repeated QUERY_REPEAT_THRESHOLD times (N+1) and views that go
+# over their QUERY_BUDGETS entry (or raises with QUERY_BUDGET_RAISE).
+# perf.tests.QueryPlanRegressionTests holds the hot views to these budgets.
+QUERY_INSPECTION = DEBUG
+# The deal lists run the same COUNT and page query once per status tab (3),
+# so shapes only count as N+1 from 4 repeats.
+QUERY_REPEAT_THRESHOLD = 4
+QUERY_BUDGET_RAISE = False
+# The budgets are for cold caches: they include the 2 queries counting the
+# sidebar's unread messages and pending deals when the layout is not cached
+# (the dashboard counts them anyway).
+QUERY_BUDGETS = {
+    "skill_search": 6,
+    "skill_by_category": 6,
+    "dashboard": 11,
+    "skill_deal_list": 14,
+    "provided_deals": 13,
+    "requested_deals": 14,
+    "message_list": 7,
+    "skill_detail": 11,
+}
+
+# Request profiling
+# Staff users can profile a request with the X-Profile header or ?profile.
+# Only PROFILING_SAMPLE_RATE of those requests are profiled; each writes a
+# cProfile dump and a collapsed-stack flamegraph file to PROFILING_DIR.
+PROFILING_ENABLED = True
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_SAMPLE_RATE = 1.0
+PROFILING_SAMPLE_INTERVAL = 0.001
+
+# Metrics
+# Request latency, query counts, template render times and domain counters
+# are exposed at /metrics/ in the Prometheus text format. Multi-process
+# servers must set DJANGO_METRICS_DIR to a directory shared by the workers
+# (emptied on deploy) so the endpoint can add up the values of every process.
+# The endpoint is readable by staff users, and by scrapers sending
+# "Authorization: Bearer <DJANGO_METRICS_TOKEN>". Client addresses are not
+# trusted: behind the reverse proxy every request comes from 127.0.0.1.
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get("DJANGO_METRICS_DIR")
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = os.environ.get("DJANGO_METRICS_TOKEN")
+
+# Caching
+# A per-process local-memory cache by default. Set DJANGO_CACHE_DIR to use a
+# file-based cache shared by all the processes of a server instead.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "skill-swap",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+if os.environ.get("DJANGO_CACHE_DIR"):
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ["DJANGO_CACHE_DIR"],
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+
+# Skill pages, category listings and the landing page are cached whole,
+# keyed on the versions of the data they show; skills.signals replaces the
+# versions on every write (see perf.cache).
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Seconds the sidebar data of a user (profile image, unread messages, pending
+# deals) is cached; writes to that data delete it before then.
+LAYOUT_CACHE_TIMEOUT = 60
+
+# Dataset snapshots
+# `manage.py build_snapshots` seeds the small, medium and large datasets once
+# into versioned SQLite files here; benchmarks and tests restore them instead
+# of seeding (see perf.snapshots).
+SNAPSHOT_DIR = BASE_DIR / "snapshots"
+
+# Logging
+# Records are formatted on the request thread and written to stderr by a
+# background QueueListener thread (see django_project.log_handlers). Set
+# DJANGO_LOG_LEVEL=DEBUG to see the debug events of the apps and
+# DJANGO_LOG_FORMAT=json for one JSON object per line. Django's own loggers
+# stay at WARNING; the test runner also silences the warning django.request
+# logs for every 4xx response the tests ask for.
+LOG_LEVEL = os.environ.get("DJANGO_LOG_LEVEL", "INFO")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "text": {
+            "format": "{asctime} {levelname} {name} {message}",
+            "style": "{",
+        },
+        "json": {"()": "django_project.log_handlers.StructuredFormatter"},
+    },
+    "handlers": {
+        "queue": {
+            "()": "django_project.log_handlers.QueueListenerHandler",
+            "stream": "ext://sys.stderr",
+            "formatter": os.environ.get("DJANGO_LOG_FORMAT", "text"),
+        },
+    },
+    "root": {"handlers": ["queue"], "level": "WARNING"},
+    "loggers": {
+        "django": {"handlers": ["queue"], "level": "WARNING", "propagate": False},
+        "accounts": {"level": LOG_LEVEL},
+        "skills": {"level": LOG_LEVEL},
+        "perf": {"level": LOG_LEVEL},
+    },
+}
+
+TEST_RUNNER = "django_project.test_runner.QuietRequestsRunner"
@@ -0,0 +1,189 @@
+"""Hashed, precompressed static files served with far-future caching.
+
+`collectstatic` is the build step: CompressedManifestStaticFilesStorage
+gives every file a content-hashed name (main.css -> main.3f2a1b9c8d7e.css)
+and writes gzip and, when the optional `brotli` package is installed,
+brotli variants of the text files next to it (main.3f2a1b9c8d7e.css.gz,
+.br). StaticFilesMiddleware serves STATIC_ROOT in production: it picks the
+smallest variant the client accepts and marks hashed files as immutable,
+since a changed file always gets a new name."""
+
+import gzip
+import logging
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only gzip variants are built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Formats worth compressing; images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".txt", ".json", ".map", ".xml"}
+# Smaller files gain less than the extra request headers cost
+MIN_COMPRESS_SIZE = 256
+
+# <name>.<12 hex digits>.<ext>, as produced by ManifestStaticFilesStorage
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=60"
+
+# Content-Encoding: file suffix, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def compress_file(path: Path) -> list[Path]:
+    """Write the gzip and brotli variants of a file that are smaller than
+    the file itself.
+
+    Returns:
+        The paths of the variants written.
+    """
+    data = path.read_bytes()
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data)
+
+    written = []
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            variant = path.with_name(path.name + suffix)
+            variant.write_bytes(compressed)
+            written.append(variant)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """A static files storage with hashed names and precompressed variants.
+
+    After the hashed files are written by collectstatic, each compressible
+    one of at least MIN_COMPRESS_SIZE bytes gets its compressed variants.
+    References to files that are not shipped (such as the webfonts of
+    all.min.css) are left as they are instead of failing the build.
+    """
+
+    def hashed_name(self, name, content=None, filename=None):
+        """Return the hashed name of a file, or the name itself if a file
+        referenced from a stylesheet does not exist."""
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None or self.exists(filename or name):
+                raise
+            logger.warning("Static file %s is referenced but missing", name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        """Hash the files, then write the compressed variants."""
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        for hashed_name in set(self.hashed_files.values()):
+            path = Path(self.path(hashed_name))
+            if (
+                path.suffix in COMPRESSIBLE_EXTENSIONS
+                and path.stat().st_size >= MIN_COMPRESS_SIZE
+            ):
+                compress_file(path)
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Return the content codings of an Accept-Encoding header that are not
+    refused with q=0."""
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            refused = params and float(quality) == 0
+        except ValueError:
+            refused = False
+        if coding and not refused:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """A middleware serving the files of STATIC_ROOT without a web server.
+
+    Requests under STATIC_URL for a collected file are answered directly
+    with the brotli or gzip variant when the client accepts it, along with
+    Vary: Accept-Encoding and Last-Modified headers. Hashed files are cached
+    for a year as immutable, other files for a minute. Unknown files fall
+    through to the rest of the stack. Not used with DEBUG, where runserver
+    serves the static files itself.
+    """
+
+    def __init__(self, get_response):
+        """Raise MiddlewareNotUsed in DEBUG or without a STATIC_ROOT."""
+        if settings.DEBUG or not settings.STATIC_ROOT:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = "/" + settings.STATIC_URL.lstrip("/")
+        self.root = Path(settings.STATIC_ROOT).resolve()
+
+    def __call__(self, request):
+        """Serve a static file, or pass the request on."""
+        if request.method in ("GET", "HEAD") and request.path.startswith(self.prefix):
+            response = self.serve(request, request.path[len(self.prefix) :])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name: str):
+        """Return the response for a static file, or None if not found."""
+        path = (self.root / name).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+
+        stat = path.stat()
+        if_modified_since = parse_http_date_safe(
+            request.headers.get("If-Modified-Since", "")
+        )
+        if if_modified_since and int(stat.st_mtime) <= if_modified_since:
+            response = HttpResponseNotModified()
+        else:
+            # The type of the asset itself, whichever variant is sent
+            content_type, _ = mimetypes.guess_type(path.name)
+            encoding, variant = None, path
+            accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+            for coding, suffix in ENCODINGS.items():
+                candidate = path.with_name(path.name + suffix)
+                if coding in accepted and candidate.is_file():
+                    encoding, variant = coding, candidate
+                    break
+
+            response = FileResponse(
+                open(variant, "rb"),
+                content_type=content_type or "application/octet-stream",
+            )
+            # FileResponse names the file it sends, e.g. main.css.gz, in a
+            # Content-Disposition header that assets must not carry
+            del response.headers["Content-Disposition"]
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Last-Modified"] = http_date(stat.st_mtime)
+
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL
+            if HASHED_NAME.search(name)
+            else DEFAULT_CACHE_CONTROL
+        )
+        if any(
+            path.with_name(path.name + suffix).is_file()
+            for suffix in ENCODINGS.values()
+        ):
+            patch_vary_headers(response, ["Accept-Encoding"])
+        return response
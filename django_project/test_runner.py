@@ -0,0 +1,26 @@
+"""The test runner of the project."""
+
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class QuietRequestsRunner(DiscoverRunner):
+    """A test runner silencing the 4xx warnings of django.request.
+
+    The tests request forbidden, missing and invalid pages on purpose, and
+    django.request logs a warning for each of those responses. Errors, such
+    as the 500 responses, are still logged.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        """Raise the level of django.request to ERROR for the test run."""
+        super().setup_test_environment(**kwargs)
+        logger = logging.getLogger("django.request")
+        self._request_log_level = logger.level
+        logger.setLevel(logging.ERROR)
+
+    def teardown_test_environment(self, **kwargs):
+        """Restore the level of django.request."""
+        logging.getLogger("django.request").setLevel(self._request_log_level)
+        super().teardown_test_environment(**kwargs)
@@ -17,7 +17,6 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
 from pages.views import LandingPageView
 
 urlpatterns = [
@@ -25,11 +24,9 @@ urlpatterns = [
     path("accounts/", include("accounts.urls")),
     path("accounts/", include("django.contrib.auth.urls")),
     path("skills/", include("skills.urls")),
+    path("api/", include("api.urls")),
+    path("", include("perf.urls")),
     path("", include("pages.urls")),
+    # Media files, after checking access (see MEDIA_SERVE_MODE)
+    path("", include("mediastore.urls")),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    from django.conf.urls.static import static
-
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
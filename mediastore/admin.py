@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import StoredFile
+
+
+@admin.register(StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refcount", "created_at", "orphaned_at")
+    readonly_fields = ("name", "size", "refcount", "created_at", "orphaned_at")
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class MediastoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "mediastore"
+
+    def ready(self):
+        """Import the signals releasing replaced and deleted files."""
+        import mediastore.signals
@@ -0,0 +1,49 @@
+"""A command that removes the media files no longer referenced."""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mediastore.storage import collect_orphans
+
+
+class Command(BaseCommand):
+    """A class to garbage-collect the orphaned files of the media storage.
+
+    Files whose last reference was released more than --grace-period seconds
+    ago are removed in batches of --batch-size, one transaction per batch,
+    until none is left.
+    """
+
+    help = "Remove the content-addressed media files without references"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the collection."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Maximum number of files to remove per transaction.",
+        )
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=None,
+            help="Seconds a file must have been without references "
+            "(default: MEDIA_GC_GRACE_PERIOD).",
+        )
+
+    def handle(self, *args, **options):
+        """Remove the orphaned files batch by batch."""
+        batch_size = options["batch_size"]
+        grace_period = options["grace_period"]
+        if grace_period is None:
+            grace_period = settings.MEDIA_GC_GRACE_PERIOD
+        total = 0
+
+        while True:
+            removed = collect_orphans(batch_size=batch_size, grace_period=grace_period)
+            total += len(removed)
+            if len(removed) < batch_size:
+                break
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {total} orphaned media files"))
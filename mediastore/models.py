@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class StoredFile(models.Model):
+    """A model to represent a file of the content-addressed media storage.
+
+    Attributes:
+        name: A CharField holding the storage name of the file, derived from
+            the SHA-256 hash of its content.
+        size: A PositiveBigIntegerField holding the size of the file in bytes.
+        refcount: An IntegerField counting the model fields referencing the file.
+        created_at: A DateTimeField to represent the date the file was stored.
+        orphaned_at: A DateTimeField set when the last reference is released,
+            cleared when the file is referenced again.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    orphaned_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["orphaned_at"], name="storedfile_orphaned_idx"),
+        ]
+
+    def __str__(self):
+        """Return a string representation of the stored file."""
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,79 @@
+"""This module contains the receivers releasing the references to the files
+of the content-addressed media storage.
+
+The file names of every model field stored in a ContentAddressedStorage are
+remembered when an instance is loaded. Once it is saved with another file,
+or deleted, the reference to the previous file is released, also when a new
+upload has the same content and so the same name. Fields that
+were deferred when the instance was loaded are not tracked: their file
+keeps its reference, which can only delay its collection."""
+
+from functools import cache
+
+from django.apps import apps
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from .storage import ContentAddressedStorage, release
+
+
+@cache
+def tracked_fields(model) -> list[str]:
+    """Return the attribute names of the file fields of a model stored in a
+    ContentAddressedStorage."""
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if isinstance(field, FileField)
+        and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def remember_files(sender, instance, **kwargs) -> None:
+    """Remember the names of the stored files an instance references."""
+    instance._stored_files = {}
+    for attname in tracked_fields(sender):
+        if attname in instance.__dict__:
+            file = getattr(instance, attname)
+            instance._stored_files[attname] = file.name if file._committed else None
+
+
+def note_uploads(sender, instance, **kwargs) -> None:
+    """Note the fields given a new file, which the save will store and add
+    a reference to."""
+    instance._uploaded_files = {
+        attname
+        for attname in tracked_fields(sender)
+        if attname in instance.__dict__ and not getattr(instance, attname)._committed
+    }
+
+
+def release_replaced_files(sender, instance, **kwargs) -> None:
+    """Release the files an instance no longer references once saved.
+
+    A field given a new upload releases its previous file even when the
+    upload has the same content, and so the same name: storing it added a
+    reference of its own."""
+    stored = getattr(instance, "_stored_files", {})
+    uploaded = getattr(instance, "_uploaded_files", set())
+    replaced = [
+        name
+        for attname, name in stored.items()
+        if name and (name != getattr(instance, attname).name or attname in uploaded)
+    ]
+    release(*replaced)
+    remember_files(sender, instance)
+
+
+def release_deleted_files(sender, instance, **kwargs) -> None:
+    """Release the files of a deleted instance."""
+    stored = getattr(instance, "_stored_files", {})
+    release(*stored.values())
+
+
+for model in apps.get_models():
+    if tracked_fields(model):
+        post_init.connect(remember_files, sender=model)
+        pre_save.connect(note_uploads, sender=model)
+        post_save.connect(release_replaced_files, sender=model)
+        post_delete.connect(release_deleted_files, sender=model)
@@ -0,0 +1,164 @@
+"""Content-addressed storage of the uploaded media files.
+
+A file saved through ContentAddressedStorage is named after the SHA-256 hash
+of its content, in directories sharded by the first two bytes of the hash
+(profile_images/3f/a2/3fa2...e1.jpg), so identical uploads are stored once
+whatever their original name.
+
+Every stored file has a StoredFile row counting the model fields that
+reference it. Saving a file adds a reference. The receivers of
+mediastore.signals release one when a field is given another file or its
+row is deleted, and so does delete(). A file without references is only
+removed by collect_orphans() once MEDIA_GC_GRACE_PERIOD has passed, since
+an upload of the same content may reference it again in the meantime.
+Files written or replaced with update() or bulk_create() are not counted,
+so they are never collected."""
+
+import hashlib
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import StoredFile
+
+# Sent with the name of every file removed by collect_orphans(), so the files
+# derived from it (e.g. thumbnails) can be removed as well
+file_collected = Signal()
+
+
+def media_storage():
+    """Return the storage of the uploaded media files, for the `storage`
+    argument of file fields."""
+    return storages["media"]
+
+
+def content_hash(content) -> str:
+    """Return the SHA-256 hex digest of a Django File."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """A file system storage naming files after their content.
+
+    The directory of the requested name is kept and the file name replaced
+    by the content hash, with the lowercased extension of the original name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        """Return the name unchanged; the stored name is only known once the
+        content is hashed."""
+        return name
+
+    def hashed_name(self, name: str, digest: str) -> str:
+        """Return the content-addressed name of a file."""
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f"{digest}{extension}"
+        ).replace("\\", "/")
+
+    def _save(self, name, content):
+        """Store the content once and add a reference to it.
+
+        Returns:
+            The content-addressed name of the file.
+        """
+        name = self.hashed_name(name, content_hash(content))
+        with transaction.atomic():
+            stored, created = StoredFile.objects.get_or_create(
+                name=name, defaults={"size": content.size, "refcount": 1}
+            )
+            if not created:
+                StoredFile.objects.filter(pk=stored.pk).update(
+                    refcount=F("refcount") + 1, orphaned_at=None
+                )
+            if created or not self.exists(name):
+                self._write(name, content)
+        return name
+
+    def _write(self, name, content) -> None:
+        """Write a file atomically, so it is never read half written."""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(tmp, self.file_permissions_mode or 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def delete(self, name):
+        """Release a reference to a file; the file itself is removed by
+        collect_orphans() once it has no references left."""
+        release(name)
+
+    def remove(self, name) -> None:
+        """Remove a file from the disk, whatever its references."""
+        super().delete(name)
+
+
+def release(*names) -> None:
+    """Release one reference to each of the given files.
+
+    Names of files stored before the content-addressed storage are ignored.
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+    StoredFile.objects.filter(name__in=names, refcount__gt=0).update(
+        refcount=F("refcount") - 1,
+        orphaned_at=Case(
+            When(refcount=1, then=Value(timezone.now())), default=F("orphaned_at")
+        ),
+    )
+
+
+def collect_orphans(batch_size: int = 500, grace_period=None) -> list[str]:
+    """Remove one batch of files without references.
+
+    The files are removed in the transaction deleting their rows, so an
+    upload of the same content waits for it and writes the file again.
+
+    Args:
+        batch_size: The maximum number of files to remove.
+        grace_period: Seconds a file must have been without references
+            (MEDIA_GC_GRACE_PERIOD if None).
+
+    Returns:
+        The names of the files removed.
+    """
+    if grace_period is None:
+        grace_period = settings.MEDIA_GC_GRACE_PERIOD
+    cutoff = timezone.now() - timedelta(seconds=grace_period)
+    storage = media_storage()
+
+    with transaction.atomic():
+        orphans = StoredFile.objects.filter(refcount__lte=0, orphaned_at__lte=cutoff)
+        names = list(
+            orphans.order_by("orphaned_at").values_list("name", flat=True)[:batch_size]
+        )
+        orphans.filter(name__in=names).delete()
+        # The rows left were referenced again since they were selected
+        kept = StoredFile.objects.filter(name__in=names).values_list("name", flat=True)
+        removed = sorted(set(names) - set(kept))
+        for name in removed:
+            storage.remove(name)
+
+    for name in removed:
+        file_collected.send(sender=StoredFile, name=name)
+    return removed
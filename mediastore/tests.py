@@ -0,0 +1,290 @@
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from PIL import Image
+
+from accounts.models import UserProfile
+from accounts.thumbnails import build_thumbnails, storage, thumbnail_name
+
+from .models import StoredFile
+from .storage import collect_orphans, media_storage
+from .views import IMMUTABLE_CACHE_CONTROL, MediaView, parse_range
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Tests for the content-addressed, reference-counted media storage."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        User = get_user_model()
+        self.alice = UserProfile.objects.create(
+            user=User.objects.create_user(username="alice", password="pass")
+        )
+        self.bob = UserProfile.objects.create(
+            user=User.objects.create_user(username="bob", password="pass")
+        )
+
+    def upload(self, profile, content, filename="photo.jpg"):
+        """Save a profile image and return its stored file."""
+        profile.profile_image = SimpleUploadedFile(filename, content)
+        profile.save()
+        return StoredFile.objects.get(name=profile.profile_image.name)
+
+    def test_sharded_name(self):
+        """Test that a file is named after its content hash, sharded by its
+        first two bytes."""
+        stored = self.upload(self.alice, b"alice", "Alice Photo.JPG")
+
+        digest = "2bd806c97f0e00af1a1fc3328fa763a9269723c8db8fac4f93af71db186d6e90"
+        self.assertEqual(stored.name, f"profile_images/2b/d8/{digest}.jpg")
+        self.assertEqual(stored.size, 5)
+        self.assertTrue(media_storage().exists(stored.name))
+
+    def test_identical_uploads_deduplicated(self):
+        """Test that identical uploads share one file and count references."""
+        first = self.upload(self.alice, b"same", "a.jpg")
+        second = self.upload(self.bob, b"same", "b.jpg")
+
+        self.assertEqual(first.name, second.name)
+        self.assertEqual(second.refcount, 2)
+        self.assertEqual(StoredFile.objects.count(), 1)
+
+    def test_replaced_file_released(self):
+        """Test that replacing an image releases the previous file, which is
+        collected after the grace period while the new one is kept."""
+        old = self.upload(self.alice, b"old")
+        new = self.upload(self.alice, b"new")
+        old.refresh_from_db()
+
+        self.assertEqual(old.refcount, 0)
+        self.assertIsNotNone(old.orphaned_at)
+        self.assertEqual(collect_orphans(), [])
+
+        self.assertEqual(collect_orphans(grace_period=0), [old.name])
+        self.assertFalse(media_storage().exists(old.name))
+        self.assertFalse(StoredFile.objects.filter(name=old.name).exists())
+        self.assertTrue(media_storage().exists(new.name))
+
+    def test_same_upload_twice_keeps_one_reference(self):
+        """Test that uploading the same content again to the same field
+        does not leak a reference, so the file is orphaned once the row is
+        deleted."""
+        self.upload(self.alice, b"same")
+        profile = UserProfile.objects.get(pk=self.alice.pk)
+        stored = self.upload(profile, b"same")
+        self.assertEqual(stored.refcount, 1)
+
+        profile.delete()
+
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 0)
+        self.assertIsNotNone(stored.orphaned_at)
+        self.assertEqual(collect_orphans(grace_period=0), [stored.name])
+
+    def test_reupload_revives_orphan(self):
+        """Test that uploading the content of an orphaned file references it
+        again, so it is not collected."""
+        old = self.upload(self.alice, b"old")
+        self.upload(self.alice, b"new")
+
+        revived = self.upload(self.bob, b"old")
+
+        self.assertEqual(revived.name, old.name)
+        self.assertEqual(revived.refcount, 1)
+        self.assertIsNone(revived.orphaned_at)
+        self.assertNotIn(old.name, collect_orphans(grace_period=0))
+
+    def test_shared_file_kept(self):
+        """Test that a file is kept while another profile references it."""
+        stored = self.upload(self.alice, b"same")
+        self.upload(self.bob, b"same")
+
+        self.alice.delete()
+
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 1)
+        self.assertEqual(collect_orphans(grace_period=0), [])
+
+    def test_deferred_field_not_released(self):
+        """Test that saving a profile loaded without its image field keeps
+        the image's reference."""
+        stored = self.upload(self.alice, b"alice")
+        profile = UserProfile.objects.only("credits").get(pk=self.alice.pk)
+
+        profile.credits = 10
+        profile.save()
+
+        stored.refresh_from_db()
+        self.assertEqual(stored.refcount, 1)
+
+    def test_thumbnails_collected(self):
+        """Test that collecting an image removes its thumbnails."""
+        photo = BytesIO()
+        Image.new("RGB", (20, 20), "blue").save(photo, "JPEG")
+        old = self.upload(self.alice, photo.getvalue())
+        variants = build_thumbnails(old.name)
+        self.alice.profile_image = None
+        self.alice.save()
+
+        call_command("gc_media", grace_period=0, batch_size=1, stdout=StringIO())
+
+        self.assertFalse(any(storage().exists(name) for name in variants))
+        self.assertFalse(storage().exists(thumbnail_name(old.name, "small")))
+
+
+class MediaViewTests(TestCase):
+    """Tests for the media view and its serving modes."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username="testuser", password="pass"
+        )
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.content = bytes(range(256)) * 4
+        self.profile.profile_image = SimpleUploadedFile("photo.png", self.content)
+        self.profile.save()
+        self.name = self.profile.profile_image.name
+        self.url = reverse("media", args=[self.name])
+        self.client.login(username="testuser", password="pass")
+
+    def test_url(self):
+        """Test that the storage URL of a file is served by the view."""
+        self.assertEqual(media_storage().url(self.name), self.url)
+
+    def test_login_required(self):
+        """Test that anonymous users cannot see media files."""
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_not_found(self):
+        """Test that missing files and names outside MEDIA_ROOT are not found."""
+        for name in ["profile_images/missing.png", "../db.sqlite3", "/etc/passwd"]:
+            with self.subTest(name=name):
+                response = self.client.get(f"/media/{name}")
+                self.assertEqual(response.status_code, 404)
+
+    def test_full_file(self):
+        """Test that the file is streamed with its validators and caching."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn("ETag", response)
+
+    def test_range(self):
+        """Test that a byte range is served as partial content from the
+        range's offset in the file, for os.sendfile()."""
+        request = RequestFactory().get(self.url, headers={"range": "bytes=10-19"})
+        request.user = self.user
+
+        response = MediaView.as_view()(request, name=self.name)
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "10")
+        # What a wsgi.file_wrapper passes to os.sendfile()
+        self.assertEqual(response.file_to_stream.tell(), 10)
+        self.assertIsInstance(response.file_to_stream.fileno(), int)
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+        response.close()
+
+    def test_unsatisfiable_range(self):
+        """Test that a range past the end of the file gets a 416."""
+        response = self.client.get(self.url, headers={"range": "bytes=5000-"})
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(self.content)}")
+
+    def test_if_range_mismatch(self):
+        """Test that a range is ignored when the file has changed."""
+        response = self.client.get(
+            self.url, headers={"range": "bytes=0-9", "if-range": '"stale"'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+
+    def test_conditional_get(self):
+        """Test that unchanged files get a 304, by ETag or date."""
+        response = self.client.get(self.url)
+
+        for headers in [
+            {"if-none-match": response["ETag"]},
+            {"if-modified-since": response["Last-Modified"]},
+        ]:
+            with self.subTest(headers=headers):
+                response = self.client.get(self.url, headers=headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+        modified = self.client.get(
+            self.url, headers={"if-modified-since": http_date(0)}
+        )
+        self.assertEqual(modified.status_code, 200)
+
+    @override_settings(MEDIA_SERVE_MODE="x-accel-redirect")
+    def test_x_accel_redirect(self):
+        """Test that nginx is told to send the file from its internal
+        location."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response["Content-Type"], "image/png")
+
+    @override_settings(MEDIA_SERVE_MODE="x-sendfile")
+    def test_x_sendfile(self):
+        """Test that the web server is told the absolute path of the file."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["X-Sendfile"], media_storage().path(self.name))
+
+    @override_settings(MEDIA_SERVE_MODE="x-sendfile")
+    def test_x_sendfile_login_required(self):
+        """Test that access is checked before handing off the transfer."""
+        self.client.logout()
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn("X-Sendfile", response)
+
+    def test_parse_range(self):
+        """Test the parsing of Range headers."""
+        cases = {
+            "bytes=0-0": (0, 1),
+            "bytes=90-": (90, 100),
+            "bytes=90-200": (90, 100),
+            "bytes=-10": (90, 100),
+            "bytes=-500": (0, 100),
+            "bytes=100-": False,
+            "bytes=-0": False,
+            "bytes=5-1": None,
+            "bytes=0-1,5-6": None,
+            "items=0-1": None,
+        }
+        for header, expected in cases.items():
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, 100), expected)
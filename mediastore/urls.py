@@ -0,0 +1,14 @@
+import re
+
+from django.conf import settings
+from django.urls import re_path
+
+from .views import MediaView
+
+urlpatterns = [
+    re_path(
+        r"^%s(?P<name>.+)$" % re.escape(settings.MEDIA_URL.lstrip("/")),
+        MediaView.as_view(),
+        name="media",
+    ),
+]
@@ -0,0 +1,204 @@
+"""Serving of the uploaded media files after checking access in Django.
+
+MediaView answers every request under MEDIA_URL. Once the user is allowed
+to see the file and the request is not answered by a conditional GET (304
+or 412), the transfer is done according to MEDIA_SERVE_MODE:
+
+- "x-accel-redirect": an empty response whose X-Accel-Redirect header makes
+  nginx send the file from its internal MEDIA_ACCEL_REDIRECT_PREFIX location.
+- "x-sendfile": an empty response whose X-Sendfile header makes Apache
+  (mod_xsendfile) or lighttpd send the file from its absolute path.
+- "python": a FileResponse, which WSGI servers providing wsgi.file_wrapper
+  (e.g. gunicorn) send with os.sendfile() rather than through Python. It
+  supports single byte range requests; with the other modes the web server
+  handles them."""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import (
+    ImproperlyConfigured,
+    PermissionDenied,
+    SuspiciousFileOperation,
+)
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views import View
+
+from .storage import media_storage
+
+SERVE_MODES = ("python", "x-accel-redirect", "x-sendfile")
+
+# Content-addressed names never change their content
+CONTENT_HASH = re.compile(r"[0-9a-f]{64}")
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "private, max-age=3600"
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int):
+    """Parse a Range header for a file of the given size.
+
+    Returns:
+        A (start, stop) tuple of the requested bytes, stop excluded, None if
+        the header should be ignored (invalid, or several ranges), or
+        False if the range cannot be satisfied.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # The last `last` bytes
+        length = int(last)
+        return (max(size - length, 0), size) if length and size else False
+    start = int(first)
+    stop = min(int(last) + 1, size) if last else size
+    if last and int(last) < start:
+        return None
+    return (start, stop) if start < size else False
+
+
+class FileRange:
+    """A file-like object reading the bytes start to stop - 1 of a file.
+
+    It keeps the fileno() and tell() of the file, so a wsgi.file_wrapper
+    sends the range with os.sendfile() from the current position.
+    """
+
+    def __init__(self, file, start: int, stop: int):
+        """Seek the file to the start of the range."""
+        self.file = file
+        self.file.seek(start)
+        self.remaining = stop - start
+
+    def read(self, size=-1) -> bytes:
+        """Read at most size bytes of the range."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        """Return the file descriptor of the file."""
+        return self.file.fileno()
+
+    def tell(self) -> int:
+        """Return the position in the file."""
+        return self.file.tell()
+
+    def seekable(self) -> bool:
+        """Return False; the range is read from its start only."""
+        return False
+
+    def close(self) -> None:
+        """Close the file."""
+        self.file.close()
+
+
+class MediaView(View):
+    """A class-based view to serve a media file to the users allowed to.
+
+    Methods:
+        get: A method to handle GET and HEAD requests to the view.
+        has_permission: A method to check access to a file.
+    """
+
+    def has_permission(self, request, name: str) -> bool:
+        """Return whether the user may see the file. Media files are only
+        shown on the pages of logged in users."""
+        return request.user.is_authenticated
+
+    def get(self, request, name):
+        """Serve a media file.
+
+        Args:
+            request (HttpRequest): The request object.
+            name (str): The storage name of the file.
+
+        Returns:
+            HttpResponse: The file, a hand-off to the web server, or a 304
+            Not Modified, 206 Partial Content or 416 Range Not Satisfiable
+            response.
+        """
+        mode = settings.MEDIA_SERVE_MODE
+        if mode not in SERVE_MODES:
+            raise ImproperlyConfigured(f"MEDIA_SERVE_MODE must be one of {SERVE_MODES}")
+        if not self.has_permission(request, name):
+            raise PermissionDenied
+
+        storage = media_storage()
+        try:
+            path = storage.path(name)
+            stat = os.stat(path)
+        except (OSError, SuspiciousFileOperation):
+            # Names outside MEDIA_ROOT are suspicious
+            raise Http404("Media file not found")
+        if not os.path.isfile(path):
+            raise Http404("Media file not found")
+
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            content_type, _ = mimetypes.guess_type(name)
+            content_type = content_type or "application/octet-stream"
+            if mode == "x-accel-redirect":
+                response = HttpResponse(content_type=content_type)
+                response.headers["X-Accel-Redirect"] = (
+                    settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+                )
+            elif mode == "x-sendfile":
+                response = HttpResponse(content_type=content_type)
+                response.headers["X-Sendfile"] = path
+            else:
+                response = self.file_response(
+                    request, path, stat.st_size, content_type, etag, last_modified
+                )
+
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
+        response.headers["Cache-Control"] = (
+            IMMUTABLE_CACHE_CONTROL
+            if CONTENT_HASH.search(name)
+            else DEFAULT_CACHE_CONTROL
+        )
+        return response
+
+    def file_response(self, request, path, size, content_type, etag, last_modified):
+        """Return the file, or the byte range requested, as a FileResponse."""
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if "Range" in request.headers and (
+            if_range is None
+            or if_range == etag
+            or parse_http_date_safe(if_range) == last_modified
+        ):
+            byte_range = parse_range(request.headers["Range"], size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+
+        file = open(path, "rb")
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, stop = byte_range
+            response = FileResponse(
+                FileRange(file, start, stop), status=206, content_type=content_type
+            )
+            response.headers["Content-Length"] = stop - start
+            response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        response.block_size = settings.MEDIA_BLOCK_SIZE
+        response.headers["Accept-Ranges"] = "bytes"
+        return response
@@ -1,8 +1,11 @@
 from django.views.generic import TemplateView
 
+from perf.cache import CachedResponseMixin
+
 
 # Create your views here.
-class LandingPageView(TemplateView):
-    """Landing page view."""
+class LandingPageView(CachedResponseMixin, TemplateView):
+    """Landing page view, cached for all users as it shows no user data."""
 
     template_name = "landing.html"
+    vary_on_user = False
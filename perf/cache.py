@@ -0,0 +1,125 @@
+"""Versioned caching of rendered responses.
+
+A cached response is keyed on the versions of the data it shows, such as
+"skill:12" or "category:cooking". A version is an opaque token kept in the
+default cache; writes replace the tokens of the data they change (see
+skills.signals), so every response built from the old token is never read
+again and simply expires. Nothing needs to know which keys were cached,
+which keeps invalidation precise with the local-memory and file-based cache
+backends alike.
+
+A version that is missing from the cache (never set, evicted or expired) gets
+a new token, so an eviction can only cause misses, never stale hits."""
+
+import hashlib
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from perf.metrics import RESPONSE_CACHE
+
+VERSION_PREFIX = "version:"
+RESPONSE_PREFIX = "response:"
+
+
+def version_key(name: str) -> str:
+    """Return the cache key of a version, safe for every cache backend."""
+    return VERSION_PREFIX + quote(name, safe=":")
+
+
+def get_versions(names) -> list[str]:
+    """Return the current tokens of the given versions, creating missing ones."""
+    keys = [version_key(name) for name in names]
+    tokens = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        tokens.update(missing)
+    return [tokens[key] for key in keys]
+
+
+def bump_versions(*names) -> None:
+    """Give the versions new tokens, invalidating every response using them.
+
+    Inside a transaction the tokens are replaced again once it commits, so a
+    response rendered from the uncommitted data in between is not kept.
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+
+    def bump():
+        cache.set_many(
+            {version_key(name): uuid.uuid4().hex for name in names}, timeout=None
+        )
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump, robust=True)
+
+
+def response_cache_key(request, names) -> str:
+    """Return the cache key of a response depending on the given versions."""
+    parts = [request.resolver_match.view_name, request.get_full_path()]
+    parts += get_versions(names)
+    digest = hashlib.md5("|".join(parts).encode()).hexdigest()
+    return f"{RESPONSE_PREFIX}{request.resolver_match.view_name}:{digest}"
+
+
+class CachedResponseMixin:
+    """A mixin caching the rendered GET responses of a view.
+
+    The response is cached under a key made of the view name, the full path
+    and the tokens of the versions returned by get_cache_versions(). With
+    vary_on_user, the "user:<pk>" version of the current user is added, so
+    every user gets their own copy, dropped when their account or the data
+    of their layout changes.
+    Only 200 responses that do not use the CSRF token are cached.
+
+    Attributes:
+        vary_on_user: Whether the response differs between users.
+        cache_timeout: Seconds a response is kept (RESPONSE_CACHE_TIMEOUT
+            if None).
+    """
+
+    vary_on_user = True
+    cache_timeout = None
+
+    def get_cache_versions(self) -> list[str] | None:
+        """Return the names of the versions of the data the response shows,
+        or None if the response must not be cached."""
+        return []
+
+    def get(self, request, *args, **kwargs):
+        """Return the cached response, or render and cache it."""
+        names = self.get_cache_versions() if settings.RESPONSE_CACHE_ENABLED else None
+        if names is None:
+            return super().get(request, *args, **kwargs)
+
+        if self.vary_on_user:
+            names = [*names, f"user:{request.user.pk}"]
+        key = response_cache_key(request, names)
+        view_name = request.resolver_match.view_name
+        response = cache.get(key)
+        if response is not None:
+            RESPONSE_CACHE.inc(url_name=view_name, result="hit")
+            return response
+
+        RESPONSE_CACHE.inc(url_name=view_name, result="miss")
+        response = super().get(request, *args, **kwargs)
+        timeout = self.cache_timeout or settings.RESPONSE_CACHE_TIMEOUT
+
+        def store(response):
+            if response.status_code == 200 and not request.META.get(
+                "CSRF_COOKIE_NEEDS_UPDATE"
+            ):
+                cache.set(key, response, timeout)
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
@@ -0,0 +1,257 @@
+"""Replay of the main user journeys for load benchmarks.
+
+A journey is one skill swap from start to finish between two seeded users:
+the requester searches for a skill, opens it and requests a deal; the
+provider checks their dashboard, opens the skill and accepts the deal; both
+exchange messages; the requester completes and reviews the deal and loads
+their dashboard. Every request is timed and its query count read from the
+X-Query-Summary header of QueryInspectionMiddleware.
+
+Journeys run through Django's test client (in-process) or over HTTP against
+a local server. Either way, users, skills and deals are looked up through
+the ORM, so an HTTP server must use the same database as the benchmark."""
+
+import http.cookiejar
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import resolve, reverse
+
+from perf.middleware import SUMMARY_HEADER
+from skills.models import Skill, SkillDeal
+from skills.seeding import DEFAULT_PASSWORD, USERNAME_PREFIX
+
+
+@dataclass
+class Sample:
+    """A timed request of a journey.
+
+    Attributes:
+        url_name: The name of the URL pattern of the request.
+        duration: The response time, in seconds.
+        status: The HTTP status code of the response.
+        queries: The number of queries the request ran, if reported.
+    """
+
+    url_name: str
+    duration: float
+    status: int
+    queries: int | None
+
+
+def parse_query_count(summary: str | None) -> int | None:
+    """Return the query count of an X-Query-Summary header value."""
+    if not summary:
+        return None
+    fields = dict(item.split("=", 1) for item in summary.split("; "))
+    return int(fields["queries"])
+
+
+class TestClientDriver:
+    """A class to send the requests of one user through the test client."""
+
+    def __init__(self, user):
+        """Create a test client logged in as the user."""
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method: str, path: str, data=None) -> tuple[int, str | None]:
+        """Send a request and return its status and query summary."""
+        response = getattr(self.client, method.lower())(path, data or {})
+        return response.status_code, response.headers.get(SUMMARY_HEADER)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """A handler making urllib return redirects instead of following them."""
+
+    def redirect_request(self, *args, **kwargs):
+        """Do not follow the redirect."""
+        return None
+
+
+class HttpDriver:
+    """A class to send the requests of one user to a running server."""
+
+    def __init__(self, user, base_url: str):
+        """Log the user in with the seeded password."""
+        self.base_url = base_url.rstrip("/")
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect
+        )
+        login = reverse("login")
+        self.request("GET", login)
+        status, _ = self.request(
+            "POST", login, {"username": user.username, "password": DEFAULT_PASSWORD}
+        )
+        if status != 302:
+            raise RuntimeError(f"Could not log in as {user.username}")
+
+    def request(self, method: str, path: str, data=None) -> tuple[int, str | None]:
+        """Send a request and return its status and query summary."""
+        url = self.base_url + path
+        headers = {}
+        body = None
+        if method == "GET" and data:
+            url += "?" + urllib.parse.urlencode(data)
+        elif method == "POST":
+            token = next((c.value for c in self.cookies if c.name == "csrftoken"), "")
+            body = urllib.parse.urlencode(
+                {**(data or {}), "csrfmiddlewaretoken": token}
+            ).encode()
+            headers = {"X-CSRFToken": token, "Referer": url}
+
+        request = urllib.request.Request(url, body, headers, method=method)
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status, response.headers.get(SUMMARY_HEADER)
+        except urllib.error.HTTPError as response:
+            response.read()
+            return response.code, response.headers.get(SUMMARY_HEADER)
+
+
+class JourneyRunner:
+    """A class to replay journeys between seeded users and time them.
+
+    Attributes:
+        samples: The list of Sample objects recorded so far.
+    """
+
+    def __init__(self, base_url: str | None = None, seed: int = 0):
+        """Prepare to run journeys through the test client or over HTTP.
+
+        Args:
+            base_url: The URL of a running server, or None for the test client.
+            seed: The seed choosing the users and skills of each journey.
+        """
+        self.base_url = base_url
+        self.rng = random.Random(seed)
+        self.samples = []
+        self._drivers = {}
+
+        # Only seeded users, whose password the HTTP driver knows
+        users = get_user_model().objects.filter(username__startswith=USERNAME_PREFIX)
+        self.users = list(users.order_by("pk"))
+        offered = Skill.objects.filter(skill_type="offered", owner__in=users)
+        self.skills = list(
+            offered.select_related("owner").only("name", "owner").order_by("pk")
+        )
+        if not self.skills or len(self.users) < 2:
+            raise ValueError("The dataset needs offered skills and two users")
+
+    def driver(self, user):
+        """Return the driver sending the requests of a user."""
+        if user.pk not in self._drivers:
+            self._drivers[user.pk] = (
+                HttpDriver(user, self.base_url)
+                if self.base_url
+                else TestClientDriver(user)
+            )
+        return self._drivers[user.pk]
+
+    def request(self, user, method: str, path: str, data=None) -> int:
+        """Send a request as the user and record its sample."""
+        driver = self.driver(user)
+        start = time.perf_counter()
+        status, summary = driver.request(method, path, data)
+        duration = time.perf_counter() - start
+        self.samples.append(
+            Sample(
+                resolve(path).view_name, duration, status, parse_query_count(summary)
+            )
+        )
+        return status
+
+    def run(self, journeys: int) -> None:
+        """Run the given number of journeys."""
+        for _ in range(journeys):
+            skill = self.rng.choice(self.skills)
+            requester = self.rng.choice(self.users)
+            while requester.pk == skill.owner_id:
+                requester = self.rng.choice(self.users)
+            self.journey(requester, skill.owner, skill)
+
+    def journey(self, requester, provider, skill) -> None:
+        """Replay one skill swap between a requester and a provider."""
+        search_term = skill.name.split()[0].lower()
+        self.request(
+            requester, "GET", reverse("skill_search"), {"search_term": search_term}
+        )
+        self.request(requester, "GET", reverse("skill_detail", args=[skill.pk]))
+        self.request(requester, "GET", reverse("skill_deal_new", args=[skill.pk]))
+        deal = SkillDeal.objects.filter(skill=skill, owner=requester).latest("pk")
+
+        self.request(provider, "GET", reverse("dashboard", args=[provider.pk]))
+        self.request(provider, "GET", reverse("skill_detail", args=[skill.pk]))
+        self.request(provider, "GET", reverse("skill_deal_accept", args=[deal.pk]))
+
+        send_message = reverse("send_message", args=[deal.pk])
+        self.request(provider, "POST", send_message, {"content": "When suits you?"})
+        self.request(requester, "GET", reverse("message_list"))
+        self.request(requester, "POST", send_message, {"content": "Saturday works."})
+        self.request(provider, "GET", reverse("message_list"))
+
+        self.request(requester, "GET", reverse("skill_deal_complete", args=[deal.pk]))
+        self.request(
+            requester,
+            "POST",
+            reverse("skill_review", args=[skill.pk, deal.pk]),
+            {"review": "Great session", "rating": self.rng.randint(1, 5)},
+        )
+        self.request(requester, "GET", reverse("dashboard", args=[requester.pk]))
+
+
+def percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of a non-empty list of values."""
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(samples: list[Sample], journeys: int, seconds: float) -> dict:
+    """Return the throughput and per-URL latency and query counts of a run.
+
+    Args:
+        samples: The samples recorded by the run.
+        journeys: The number of journeys run.
+        seconds: The wall-clock duration of the run.
+
+    Returns:
+        A JSON-serializable dictionary of the results.
+    """
+    by_url = defaultdict(list)
+    for sample in samples:
+        by_url[sample.url_name].append(sample)
+
+    urls = {}
+    for url_name, url_samples in sorted(by_url.items()):
+        durations = [sample.duration * 1000 for sample in url_samples]
+        queries = [s.queries for s in url_samples if s.queries is not None]
+        urls[url_name] = {
+            "requests": len(url_samples),
+            "errors": sum(1 for s in url_samples if s.status >= 400),
+            "p50_ms": round(percentile(durations, 50), 3),
+            "p95_ms": round(percentile(durations, 95), 3),
+            "p99_ms": round(percentile(durations, 99), 3),
+            "queries_mean": (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+            "queries_max": max(queries) if queries else None,
+        }
+
+    return {
+        "journeys": journeys,
+        "requests": len(samples),
+        "seconds": round(seconds, 3),
+        "journeys_per_second": round(journeys / seconds, 2),
+        "requests_per_second": round(len(samples) / seconds, 2),
+        "urls": urls,
+    }
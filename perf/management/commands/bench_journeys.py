@@ -0,0 +1,117 @@
+"""A load benchmark replaying the main user journeys."""
+
+import json
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from perf.journeys import JourneyRunner, summarize
+from perf.snapshots import SNAPSHOT_SIZES, SnapshotError, restore_snapshot
+from skills.seeding import DatasetSize, seed_dataset
+
+
+class Command(BaseCommand):
+    """A class to benchmark the search, deal, messaging, review and dashboard
+    journeys and report throughput, latency percentiles and query counts per
+    URL name as JSON.
+
+    By default the journeys run through the test client against a fresh test
+    database seeded with the given dataset size, or restored from a snapshot
+    built by build_snapshots with --snapshot. With --base-url they run
+    over HTTP against a local server instead, which must use the project
+    database seeded beforehand (create_test_data) with QUERY_INSPECTION on
+    for query counts to be reported.
+    """
+
+    help = "Replay the main user journeys and report latency and query counts"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the benchmark."""
+        defaults = DatasetSize()
+        parser.add_argument("--journeys", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument(
+            "--skills-per-user", type=int, default=defaults.skills_per_user
+        )
+        parser.add_argument("--deals", type=int, default=2000)
+        parser.add_argument("--messages", type=int, default=5000)
+        parser.add_argument("--reviews", type=int, default=500)
+        parser.add_argument(
+            "--snapshot",
+            choices=list(SNAPSHOT_SIZES),
+            help="Restore this snapshot instead of seeding the dataset.",
+        )
+        parser.add_argument(
+            "--base-url",
+            help="Run against a running server, e.g. http://127.0.0.1:8000.",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        """Run the benchmark and print or write its report."""
+        size = DatasetSize(
+            users=options["users"],
+            skills_per_user=options["skills_per_user"],
+            deals=options["deals"],
+            messages=options["messages"],
+            reviews=options["reviews"],
+        )
+
+        if options["base_url"]:
+            report = self.run(options, base_url=options["base_url"])
+        else:
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                if options["snapshot"]:
+                    try:
+                        manifest = restore_snapshot(options["snapshot"])
+                    except SnapshotError as error:
+                        raise CommandError(error) from error
+                    size = DatasetSize(**manifest["size"])
+                else:
+                    seed_dataset(size, seed=options["seed"])
+                with override_settings(
+                    QUERY_INSPECTION=True,
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                ):
+                    report = self.run(options)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+            report["dataset"] = vars(size)
+
+        report["mode"] = "http" if options["base_url"] else "test-client"
+        report["seed"] = options["seed"]
+        report["commit"] = self.current_commit()
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def run(self, options, base_url=None) -> dict:
+        """Run the journeys and summarize their samples."""
+        runner = JourneyRunner(base_url=base_url, seed=options["seed"])
+        start = time.perf_counter()
+        runner.run(options["journeys"])
+        return summarize(
+            runner.samples, options["journeys"], time.perf_counter() - start
+        )
+
+    def current_commit(self) -> str | None:
+        """Return the git commit of the working tree, if available."""
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,168 @@
+"""A benchmark of concurrent SQLite write throughput."""
+
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE bench_skill (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE bench_deal (
+    id INTEGER PRIMARY KEY,
+    skill_id INTEGER NOT NULL REFERENCES bench_skill (id),
+    status TEXT NOT NULL
+);
+CREATE TABLE bench_message (
+    id INTEGER PRIMARY KEY,
+    deal_id INTEGER NOT NULL REFERENCES bench_deal (id),
+    content TEXT NOT NULL
+);
+"""
+
+
+class Command(BaseCommand):
+    """A class to compare write throughput of the default SQLite setup with
+    the production profile (SQLITE_PRODUCTION_OPTIONS).
+
+    Every worker thread repeats the write pattern of a deal request: read the
+    skill, insert a deal and insert its first message, in one transaction.
+    The default profile opens a new connection per transaction (as with
+    CONN_MAX_AGE=0) and uses SQLite's default journal and locking; the
+    production profile keeps one connection per worker with the configured
+    pragmas and transaction mode.
+    """
+
+    help = "Benchmark concurrent SQLite writes with and without the production profile"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the benchmark."""
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--transactions",
+            type=int,
+            default=250,
+            help="Number of transactions per thread.",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON."
+        )
+
+    def handle(self, *args, **options):
+        """Run the benchmark for both profiles and report the results."""
+        production = settings.SQLITE_PRODUCTION_OPTIONS
+        profiles = {
+            "default": {"timeout": 5, "pragmas": {}, "mode": "", "persistent": False},
+            "production": {
+                "timeout": production["timeout"],
+                "pragmas": settings.SQLITE_PRODUCTION_PRAGMAS,
+                "mode": production.get("transaction_mode", ""),
+                "persistent": True,
+            },
+        }
+
+        results = {
+            name: self.run_profile(profile, options["threads"], options["transactions"])
+            for name, profile in profiles.items()
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<11} {result['transactions_per_second']:>9.1f} tx/s  "
+                f"committed={result['committed']}  locked_errors={result['locked_errors']}"
+            )
+
+    def run_profile(self, profile: dict, threads: int, transactions: int) -> dict:
+        """Run all worker threads against a fresh database file.
+
+        Args:
+            profile: The connection settings of the profile.
+            threads: The number of concurrent writers.
+            transactions: The number of transactions per writer.
+
+        Returns:
+            A dictionary with the throughput and error counts.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bench.sqlite3"
+            conn = self.connect(path, profile)
+            conn.executescript(SCHEMA)
+            conn.executemany(
+                "INSERT INTO bench_skill (name) VALUES (?)",
+                [(f"Skill {i}",) for i in range(100)],
+            )
+            conn.close()
+
+            counters = {"committed": 0, "locked_errors": 0}
+            lock = threading.Lock()
+            workers = [
+                threading.Thread(
+                    target=self.worker,
+                    args=(path, profile, transactions, counters, lock),
+                )
+                for _ in range(threads)
+            ]
+
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+
+        return {
+            "threads": threads,
+            "seconds": round(elapsed, 3),
+            "transactions_per_second": counters["committed"] / elapsed,
+            **counters,
+        }
+
+    def connect(self, path: Path, profile: dict) -> sqlite3.Connection:
+        """Open a connection the way the profile's Django backend would."""
+        conn = sqlite3.connect(path, timeout=profile["timeout"], isolation_level=None)
+        for name, value in profile["pragmas"].items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def worker(self, path, profile, transactions, counters, lock) -> None:
+        """Run the deal request transactions of one writer."""
+        conn = self.connect(path, profile) if profile["persistent"] else None
+
+        for i in range(transactions):
+            if not profile["persistent"]:
+                conn = self.connect(path, profile)
+            try:
+                conn.execute(f"BEGIN {profile['mode']}")
+                conn.execute(
+                    "SELECT name FROM bench_skill WHERE id = ?", (i % 100 + 1,)
+                )
+                deal_id = conn.execute(
+                    "INSERT INTO bench_deal (skill_id, status) VALUES (?, 'pending')",
+                    (i % 100 + 1,),
+                ).lastrowid
+                conn.execute(
+                    "INSERT INTO bench_message (deal_id, content) VALUES (?, ?)",
+                    (deal_id, "A deal has been requested"),
+                )
+                conn.execute("COMMIT")
+                with lock:
+                    counters["committed"] += 1
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                with lock:
+                    counters["locked_errors"] += 1
+            finally:
+                if not profile["persistent"]:
+                    conn.close()
+
+        if profile["persistent"]:
+            conn.close()
@@ -0,0 +1,163 @@
+"""A benchmark of the render time of the pages using cached fragments."""
+
+import copy
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings, setup_databases, teardown_databases
+from django.urls import reverse
+
+from perf.journeys import percentile
+from perf.metrics import TEMPLATE_RENDER_TIME
+from perf.snapshots import SNAPSHOT_SIZES, load_dataset
+from skills.models import Skill
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+DUMMY = "django.core.cache.backends.dummy.DummyCache"
+LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+# Name: (cached template loader, fragment cache backend)
+CONFIGURATIONS = {
+    "uncached": (False, DUMMY),
+    "cached_loader": (True, DUMMY),
+    "cached_loader_and_fragments": (True, LOCMEM),
+}
+
+
+class Command(BaseCommand):
+    """A class to render the category listing, skill detail and dashboard
+    pages with and without the cached template loader and the template
+    fragment cache, and report the median and p95 render and response times
+    of each page as JSON.
+
+    The pages are rendered through the test client against a fresh test
+    database holding a dataset snapshot (seeded if it was not built), with
+    the response cache off so every request renders its page.
+    """
+
+    help = "Report page render times with and without template caching"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the benchmark."""
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--snapshot", choices=list(SNAPSHOT_SIZES), default="medium"
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        """Run the benchmark and print or write its report."""
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            restored = load_dataset(options["snapshot"])
+            report = {
+                "snapshot": options["snapshot"],
+                "restored": restored,
+                "iterations": options["iterations"],
+                "pages": self.run(options["iterations"]),
+            }
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+    def pages(self) -> tuple:
+        """Return the user to log in as and the pages to render, by URL
+        name, as (url, template name) pairs."""
+        user = (
+            get_user_model()
+            .objects.annotate(deals=Count("owner") + Count("requester"))
+            .order_by("-deals", "pk")
+            .first()
+        )
+        skill = (
+            Skill.objects.filter(skill_type="offered")
+            .exclude(owner=user)
+            .select_related("category")
+            .order_by("-rating_count", "pk")
+            .first()
+        )
+        return user, {
+            "skill_by_category": (
+                reverse("skill_by_category", args=[skill.category.name]),
+                "skills/skill_list.html",
+            ),
+            "skill_detail": (
+                reverse("skill_detail", args=[skill.pk]),
+                "skills/skill_detail.html",
+            ),
+            "dashboard": (reverse("dashboard", args=[user.pk]), "dashboard.html"),
+        }
+
+    def run(self, iterations: int) -> dict:
+        """Render every page in every configuration and summarize the times."""
+        user, pages = self.pages()
+        results = {url_name: {} for url_name in pages}
+
+        for name, (cached_loader, fragment_backend) in CONFIGURATIONS.items():
+            templates = copy.deepcopy(settings.TEMPLATES)
+            templates[0]["OPTIONS"]["loaders"] = (
+                [("django.template.loaders.cached.Loader", LOADERS)]
+                if cached_loader
+                else LOADERS
+            )
+            caches = {
+                "default": {"BACKEND": LOCMEM, "LOCATION": "bench-templates"},
+                "template_fragments": {
+                    "BACKEND": fragment_backend,
+                    "LOCATION": "bench-fragments",
+                },
+            }
+            with override_settings(
+                TEMPLATES=templates,
+                CACHES=caches,
+                RESPONSE_CACHE_ENABLED=False,
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ):
+                client = Client()
+                client.force_login(user)
+                for url_name, (url, template_name) in pages.items():
+                    results[url_name][name] = self.measure(
+                        client, url, template_name, iterations
+                    )
+        return results
+
+    def measure(self, client, url: str, template_name: str, iterations: int) -> dict:
+        """Request a page repeatedly after a warm-up request.
+
+        Returns:
+            The p50 and p95 render time of the page template and response
+            time of the request, in milliseconds.
+        """
+        client.get(url)
+        render_times = []
+        response_times = []
+        for _ in range(iterations):
+            _, render_before = TEMPLATE_RENDER_TIME.get(template=template_name)
+            start = time.perf_counter()
+            response = client.get(url)
+            response_times.append((time.perf_counter() - start) * 1000)
+            _, render_after = TEMPLATE_RENDER_TIME.get(template=template_name)
+            render_times.append((render_after - render_before) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+
+        return {
+            "render_p50_ms": round(percentile(render_times, 50), 3),
+            "render_p95_ms": round(percentile(render_times, 95), 3),
+            "response_p50_ms": round(percentile(response_times, 50), 3),
+            "response_p95_ms": round(percentile(response_times, 95), 3),
+        }
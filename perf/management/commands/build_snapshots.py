@@ -0,0 +1,64 @@
+"""A command building the SQLite snapshots of the seeded datasets."""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.snapshots import (
+    SNAPSHOT_SIZES,
+    SnapshotError,
+    build_snapshot,
+    verify_snapshot,
+)
+
+
+class Command(BaseCommand):
+    """A class to seed each snapshot size (small, medium, large) once into
+    its own SQLite file in settings.SNAPSHOT_DIR.
+
+    Snapshots that are still current are skipped unless --force is given.
+    """
+
+    help = "Build versioned SQLite snapshots of the seeded datasets"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the build."""
+        parser.add_argument(
+            "names",
+            nargs="*",
+            help=f"The snapshots to build: {', '.join(SNAPSHOT_SIZES)} (default all).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes seeding each dataset.",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Rebuild current snapshots too."
+        )
+
+    def handle(self, *args, **options):
+        """Build every requested snapshot that is missing or stale."""
+        names = options["names"] or list(SNAPSHOT_SIZES)
+        unknown = set(names) - set(SNAPSHOT_SIZES)
+        if unknown:
+            raise CommandError(f"Unknown snapshots: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            if not options["force"]:
+                try:
+                    verify_snapshot(name)
+                except SnapshotError as error:
+                    self.stdout.write(str(error))
+                else:
+                    self.stdout.write(f"Snapshot {name} is current")
+                    continue
+
+            manifest = build_snapshot(
+                name, seed=options["seed"], workers=options["workers"]
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Built {manifest['file']} in {manifest['build_seconds']}s"
+                )
+            )
@@ -0,0 +1,44 @@
+"""A command restoring a SQLite snapshot onto a database file."""
+
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.snapshots import SNAPSHOT_SIZES, SnapshotError, restore_snapshot
+
+
+class Command(BaseCommand):
+    """A class to copy a snapshot built by build_snapshots onto a database
+    file, by default the file of the default database.
+
+    The snapshot is verified against its checksum and the current migration
+    state first. The target file is replaced, so --force is required when it
+    already exists.
+    """
+
+    help = "Replace a database file with a verified dataset snapshot"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the restore."""
+        parser.add_argument("name", choices=list(SNAPSHOT_SIZES))
+        parser.add_argument(
+            "--target", help="The database file to write (default database)."
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Overwrite an existing file."
+        )
+
+    def handle(self, *args, **options):
+        """Verify the snapshot and copy it onto the target file."""
+        target = options["target"] or settings.DATABASES["default"]["NAME"]
+        if os.path.exists(target) and not options["force"]:
+            raise CommandError(f"{target} exists; pass --force to replace it")
+
+        try:
+            manifest = restore_snapshot(options["name"], target=target)
+        except SnapshotError as error:
+            raise CommandError(error) from error
+        self.stdout.write(
+            self.style.SUCCESS(f"Restored {manifest['file']} onto {target}")
+        )
@@ -0,0 +1,50 @@
+"""A worker that keeps the local read replicas in sync with the primary."""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_project.replicas import PRIMARY, sync_replica
+
+
+class Command(BaseCommand):
+    """A class to copy the primary SQLite database onto every replica listed
+    in settings.DATABASE_REPLICAS with the SQLite backup API.
+
+    Runs as a long-lived worker by default. Use --once to sync a single time.
+    """
+
+    help = "Copy the primary database onto the local read replicas"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the worker."""
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between syncs.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Sync the replicas once and exit."
+        )
+
+    def handle(self, *args, **options):
+        """Sync every replica, repeatedly unless --once is given."""
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            self.stdout.write("No replicas configured (set DJANGO_DATABASE_REPLICAS)")
+            return
+
+        primary_path = settings.DATABASES[PRIMARY]["NAME"]
+        try:
+            while True:
+                for alias in replicas:
+                    sync_replica(primary_path, settings.DATABASES[alias]["NAME"])
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Synced {len(replicas)} replicas"))
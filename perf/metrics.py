@@ -0,0 +1,285 @@
+"""An in-process metrics registry with Prometheus text exposition.
+
+Metrics are counters and histograms with labels, kept in memory by each
+process. With settings.METRICS_DIR set, every process also writes its
+values to <METRICS_DIR>/<pid>.json (at most every METRICS_FLUSH_INTERVAL
+seconds) and the metrics endpoint adds up the files of all processes, so
+multi-process servers report their combined totals."""
+
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Counter:
+    """A class to represent a monotonically increasing counter.
+
+    Attributes:
+        name: The metric name.
+        help: The description shown in the exposition.
+        labelnames: The names of the metric's labels.
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames=(), lock=None):
+        """Create a counter with no samples."""
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = lock or threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        """Return the label values of a sample in labelnames order."""
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """Increase the counter of the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        """Return the current value of the counter of the given labels."""
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list:
+        """Return the samples as [label values, value] pairs."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(value, other):
+        """Add up the values of the same sample from two processes."""
+        return value + other
+
+    def exposition(self, key: tuple, value) -> list[str]:
+        """Return the exposition lines of one sample."""
+        return [f"{self.name}{format_labels(self.labelnames, key)} {value}"]
+
+
+class Histogram(Counter):
+    """A class to represent a histogram of observed values.
+
+    Each sample holds the cumulative count of every bucket, followed by the
+    sum and the count of all observations.
+
+    Attributes:
+        buckets: The upper bounds of the buckets (+Inf is implied).
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, lock=None):
+        """Create a histogram with the given buckets."""
+        super().__init__(name, help, labelnames, lock)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        """Record an observation for the given labels."""
+        key = self._key(labels)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def inc(self, amount=1, **labels):
+        """Histograms are only updated through observe()."""
+        raise TypeError("Use observe() to update a histogram")
+
+    def get(self, **labels) -> tuple:
+        """Return the count and the sum of the observations of the labels."""
+        sample = self._values.get(self._key(labels))
+        return (sample[-1], sample[-2]) if sample else (0, 0)
+
+    def samples(self) -> list:
+        """Return the samples as [label values, bucket counts + sum + count]."""
+        with self._lock:
+            return [[list(key), list(value)] for key, value in self._values.items()]
+
+    @staticmethod
+    def merge(value, other):
+        """Add up the buckets, sums and counts of two processes."""
+        return [a + b for a, b in zip(value, other)]
+
+    def exposition(self, key: tuple, value) -> list[str]:
+        """Return the bucket, sum and count lines of one sample."""
+        lines = []
+        for bound, count in zip((*self.buckets, math.inf), value[:-2] + value[-1:]):
+            le = "+Inf" if bound == math.inf else repr(float(bound))
+            labels = format_labels((*self.labelnames, "le"), (*key, le))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {value[-2]}")
+        lines.append(f"{self.name}_count{labels} {value[-1]}")
+        return lines
+
+
+def format_labels(names, values) -> str:
+    """Return the Prometheus label set of a sample."""
+    if not names:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in values
+    )
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, escaped))
+    return "{" + pairs + "}"
+
+
+class Registry:
+    """A class to hold the metrics of the process.
+
+    Attributes:
+        metrics: The registered metrics by name, in registration order.
+    """
+
+    def __init__(self):
+        """Create an empty registry."""
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, help, labelnames, self._lock))
+
+    def histogram(
+        self, name, help, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, help, labelnames, buckets, self._lock))
+
+    def _register(self, metric):
+        """Add a metric to the registry."""
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def snapshot(self) -> dict:
+        """Return the samples of every metric by metric name."""
+        return {name: metric.samples() for name, metric in self.metrics.items()}
+
+    def flush(self, force: bool = False) -> None:
+        """Write the samples of this process to its file in METRICS_DIR.
+
+        Args:
+            force: Write even if the last write is more recent than
+                METRICS_FLUSH_INTERVAL.
+        """
+        directory = getattr(settings, "METRICS_DIR", None)
+        now = time.monotonic()
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        if not directory or (not force and now - self._last_flush < interval):
+            return
+        self._last_flush = now
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        tmp = directory / f"{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(self.snapshot()))
+        # Readers never see a partially written file
+        os.replace(tmp, path)
+
+    def collect(self) -> dict:
+        """Return the samples of every metric, added up over all processes.
+
+        Returns:
+            A dictionary of metric name to {label values: value}.
+        """
+        directory = getattr(settings, "METRICS_DIR", None)
+        if directory:
+            self.flush(force=True)
+            snapshots = []
+            for path in Path(directory).glob("*.json"):
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots = [self.snapshot()]
+
+        collected = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = collected[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = (
+                        metric.merge(values[key], value) if key in values else value
+                    )
+        return collected
+
+    def exposition(self) -> str:
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key in sorted(values):
+                lines.extend(metric.exposition(key, values[key]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling requests, by URL name.",
+    ["url_name", "method"],
+)
+REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "Requests handled, by URL name and status code.",
+    ["url_name", "method", "status"],
+)
+DB_QUERIES = REGISTRY.histogram(
+    "db_queries_per_request",
+    "Database queries run per request, by URL name.",
+    ["url_name"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_TIME = REGISTRY.histogram(
+    "db_query_duration_seconds_per_request",
+    "Time spent in database queries per request, by URL name.",
+    ["url_name"],
+)
+TEMPLATE_RENDER_TIME = REGISTRY.histogram(
+    "template_render_duration_seconds",
+    "Time spent rendering templates, by template name.",
+    ["template"],
+)
+DEAL_TRANSITIONS = REGISTRY.counter(
+    "skill_deal_transitions_total",
+    "Skill deals created or moved to a new status, by status.",
+    ["status"],
+)
+MESSAGES_SENT = REGISTRY.counter(
+    "messages_sent_total",
+    "Messages sent between users.",
+)
+RESPONSE_CACHE = REGISTRY.counter(
+    "response_cache_requests_total",
+    "Cacheable responses served from the cache (hit) or rendered (miss).",
+    ["url_name", "result"],
+)
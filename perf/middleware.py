@@ -0,0 +1,191 @@
+"""Middleware inspecting the database queries, profiling requests and
+recording request metrics."""
+
+import cProfile
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from perf.metrics import DB_QUERIES, DB_QUERY_TIME, REGISTRY, REQUEST_LATENCY, REQUESTS
+from perf.profiling import StackSampler
+from perf.queries import QueryRecorder, repeated_queries
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_HEADER = "X-Query-Summary"
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAMETER = "profile"
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in DEBUG when a view runs more queries than its budget."""
+
+
+class QueryInspectionMiddleware:
+    """A middleware recording every query a request runs.
+
+    Enabled by settings.QUERY_INSPECTION (DEBUG by default). Each response
+    gets an X-Query-Summary header with the query count, the time spent in
+    queries, the number of repeated query shapes (see repeated_queries) and
+    the view's budget from settings.QUERY_BUDGETS. In DEBUG, repeated shapes
+    and requests over budget are logged, and with QUERY_BUDGET_RAISE set a
+    request over budget raises QueryBudgetExceeded instead.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler, unless query inspection is disabled."""
+        if not getattr(settings, "QUERY_INSPECTION", settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request while recording its queries."""
+        with ExitStack() as stack:
+            recorders = [
+                stack.enter_context(QueryRecorder(using=alias)) for alias in connections
+            ]
+            response = self.get_response(request)
+
+        queries = [query for recorder in recorders for query in recorder.queries]
+        view_name = getattr(request.resolver_match, "view_name", None)
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view_name)
+        repeated = repeated_queries(
+            queries, getattr(settings, "QUERY_REPEAT_THRESHOLD", 3)
+        )
+
+        response[SUMMARY_HEADER] = (
+            f"queries={len(queries)}; "
+            f"time_ms={sum(query.duration for query in queries) * 1000:.1f}; "
+            f"repeated={len(repeated)}; "
+            f"budget={budget if budget is not None else '-'}"
+        )
+
+        if settings.DEBUG:
+            self.report(request, view_name, queries, budget, repeated)
+        return response
+
+    def report(self, request, view_name, queries, budget, repeated) -> None:
+        """Log repeated query shapes and enforce the view's query budget."""
+        for sql, count in repeated.items():
+            logger.warning(
+                "%s ran the same query %d times (possible N+1): %s",
+                request.path,
+                count,
+                sql,
+            )
+
+        if budget is None or len(queries) <= budget:
+            return
+        message = (
+            f"{request.path} ({view_name}) ran {len(queries)} queries, "
+            f"over its budget of {budget}"
+        )
+        if getattr(settings, "QUERY_BUDGET_RAISE", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class RequestProfilingMiddleware:
+    """A middleware profiling single requests on demand.
+
+    Staff users switch profiling on for a request with the X-Profile header
+    or the ?profile query parameter. Only PROFILING_SAMPLE_RATE of those
+    requests are profiled, so the middleware is safe to leave deployed.
+    A profiled request writes two files to PROFILING_DIR: a cProfile dump
+    (.prof, for pstats or snakeviz) and the collapsed stacks of a sampler
+    taking a sample every PROFILING_SAMPLE_INTERVAL seconds (.folded, for
+    flamegraph tools). The response names them in the X-Profile header.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler, unless profiling is disabled."""
+        if not getattr(settings, "PROFILING_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request, profiling it when asked to."""
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        profiler = cProfile.Profile()
+        sampler = StackSampler(
+            threading.get_ident(),
+            getattr(settings, "PROFILING_SAMPLE_INTERVAL", 0.001),
+        )
+
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another request of this process is being profiled (Python 3.12+
+            # allows a single active profiler)
+            return self.get_response(request)
+
+        with sampler:
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+
+        view_name = getattr(request.resolver_match, "view_name", None) or "unknown"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{view_name}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(directory / f"{name}.prof")
+        sampler.write_collapsed(directory / f"{name}.folded")
+        response[PROFILE_HEADER] = name
+        return response
+
+    def should_profile(self, request) -> bool:
+        """Return True if a staff user asked to profile this request and it
+        falls within the sample rate."""
+        asked = PROFILE_HEADER in request.headers or PROFILE_PARAMETER in request.GET
+        return (
+            asked
+            and getattr(request, "user", None) is not None
+            and request.user.is_staff
+            and random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+        )
+
+
+class MetricsMiddleware:
+    """A middleware recording the latency, status and database queries of
+    every request in the metrics registry, labelled by URL name."""
+
+    def __init__(self, get_response):
+        """Store the next handler, unless metrics are disabled."""
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Handle the request and record its metrics."""
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            recorders = [
+                stack.enter_context(QueryRecorder(using=alias)) for alias in connections
+            ]
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        url_name = getattr(request.resolver_match, "view_name", None) or "unmatched"
+        REQUEST_LATENCY.observe(duration, url_name=url_name, method=request.method)
+        REQUESTS.inc(
+            url_name=url_name, method=request.method, status=response.status_code
+        )
+        DB_QUERIES.observe(
+            sum(len(recorder.queries) for recorder in recorders), url_name=url_name
+        )
+        DB_QUERY_TIME.observe(
+            sum(recorder.total_time for recorder in recorders), url_name=url_name
+        )
+        REGISTRY.flush()
+        return response
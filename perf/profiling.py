@@ -0,0 +1,75 @@
+"""A statistical stack sampler producing collapsed-stack flamegraph files.
+
+The sampler runs in a background thread and records the call stack of one
+thread at a fixed interval. Its output is the "collapsed" format read by
+flamegraph.pl, speedscope and similar tools: one line per distinct stack,
+frames from the outermost inwards separated by ";", followed by the number
+of samples."""
+
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+
+def frame_label(frame) -> str:
+    """Return the flamegraph label of a stack frame.
+
+    Args:
+        frame: A Python frame object.
+
+    Returns:
+        The function name with the last two parts of its file path.
+    """
+    code = frame.f_code
+    path = "/".join(Path(code.co_filename).parts[-2:])
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+
+
+class StackSampler:
+    """A class to sample the call stack of a thread.
+
+    Attributes:
+        thread_id: The identifier of the sampled thread.
+        interval: The time between two samples, in seconds.
+        stacks: A Counter of collapsed stacks to their number of samples.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        """Create a sampler for the given thread."""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        """Start sampling."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop sampling and wait for the sampler thread."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Take a sample every interval until stopped."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def write_collapsed(self, path) -> None:
+        """Write the samples in the collapsed-stack format.
+
+        Args:
+            path: The path of the file to write.
+        """
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
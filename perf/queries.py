@@ -0,0 +1,134 @@
+"""Helpers to record the SQL a piece of code runs and inspect its query plans.
+
+QueryRecorder hooks into a connection with execute_wrapper(), so it sees the
+raw SQL and parameters of every query (including its duration) without
+needing DEBUG. explain() and full_scans() turn a recorded query into its
+SQLite EXPLAIN QUERY PLAN and the tables it reads without an index.
+repeated_queries() finds N+1 patterns among recorded queries."""
+
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.db import connections
+
+# "SCAN t" is a full table scan; "SCAN t USING [COVERING] INDEX i" is not.
+# SQLite before 3.36 printed "SCAN TABLE t".
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+
+@dataclass
+class RecordedQuery:
+    """A query run while a QueryRecorder was active.
+
+    Attributes:
+        sql: The SQL with parameter placeholders.
+        params: The query parameters.
+        duration: The time the query took, in seconds.
+    """
+
+    sql: str
+    params: tuple
+    duration: float
+
+    @property
+    def is_select(self) -> bool:
+        """Return True if the query only reads data."""
+        return self.sql.lstrip().upper().startswith("SELECT")
+
+
+class QueryRecorder:
+    """A context manager recording every query run on a database connection.
+
+    Attributes:
+        using: The alias of the database connection to record.
+        queries: The list of RecordedQuery objects, in execution order.
+    """
+
+    def __init__(self, using: str = "default"):
+        """Create a recorder for the given database alias."""
+        self.using = using
+        self.queries = []
+        self._wrapper = None
+
+    def __enter__(self):
+        """Start recording queries."""
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop recording queries."""
+        self._wrapper.__exit__(*exc_info)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Run a query and record it (the execute_wrapper hook)."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                RecordedQuery(sql, tuple(params or ()), time.perf_counter() - start)
+            )
+
+    @property
+    def total_time(self) -> float:
+        """Return the time spent in all recorded queries, in seconds."""
+        return sum(query.duration for query in self.queries)
+
+
+def explain(query: RecordedQuery, using: str = "default") -> list[str]:
+    """Return the SQLite query plan of a recorded query.
+
+    Args:
+        query: The query to explain.
+        using: The alias of the database connection to explain it on.
+
+    Returns:
+        The detail column of each EXPLAIN QUERY PLAN row.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {query.sql}", query.params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list[str], using: str = "default") -> set[str]:
+    """Return the tables a query plan reads with a full table scan.
+
+    Args:
+        plan: The plan details returned by explain().
+        using: The alias of the database connection the plan came from.
+
+    Returns:
+        The names of the scanned tables (subqueries and CTEs are ignored).
+    """
+    tables = set(connections[using].introspection.table_names())
+    scanned = {match[1] for detail in plan if (match := FULL_SCAN.match(detail))}
+    return scanned & tables
+
+
+def repeated_queries(queries: list[RecordedQuery], threshold: int = 3) -> dict:
+    """Return the query shapes run repeatedly with differing parameters.
+
+    The SQL of a recorded query still has its parameter placeholders, so it
+    is the query's shape. A shape run at least `threshold` times with more
+    than one set of parameters is the typical N+1 pattern of a template
+    dereferencing a relation per row.
+
+    Args:
+        queries: The recorded queries.
+        threshold: The number of runs from which a shape counts as repeated.
+
+    Returns:
+        A dictionary mapping each repeated SQL shape to its number of runs.
+    """
+    params_by_shape = defaultdict(list)
+    for query in queries:
+        params_by_shape[query.sql].append(query.params)
+
+    return {
+        sql: len(params)
+        for sql, params in params_by_shape.items()
+        if len(params) >= threshold and len(set(map(repr, params))) > 1
+    }
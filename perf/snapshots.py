@@ -0,0 +1,222 @@
+"""Prebuilt SQLite snapshots of the seeded datasets.
+
+Seeding a large dataset takes minutes, so benchmarks and tests restore a
+snapshot instead: a SQLite file migrated and seeded once by the
+build_snapshots command, copied with a file copy or the SQLite backup API.
+
+Every snapshot is stored in settings.SNAPSHOT_DIR as <name>-<version>.sqlite3
+next to a <name>.json manifest holding its version and SHA-256 checksum. The
+version is a hash of the migration state, the seeding version, the dataset
+size and the seed; a snapshot whose version differs from the current one, or
+whose file does not match its checksum, is stale and is never restored."""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test.utils import setup_databases, teardown_databases
+
+from skills.seeding import SEEDING_VERSION, DatasetSize, seed_dataset
+
+SNAPSHOT_SIZES = {
+    "small": DatasetSize(),
+    "medium": DatasetSize(
+        users=200, skills_per_user=6, deals=3000, messages=5000, reviews=600
+    ),
+    "large": DatasetSize(
+        users=20000, skills_per_user=6, deals=200000, messages=500000, reviews=50000
+    ),
+}
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, stale or corrupt."""
+
+
+def snapshot_version(size: DatasetSize, seed: int = 0) -> str:
+    """Return the version of a snapshot built now with the given parameters."""
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    state = {
+        "migrations": sorted(loader.graph.leaf_nodes()),
+        "seeding": SEEDING_VERSION,
+        "size": vars(size),
+        "seed": seed,
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def file_checksum(path) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path(name: str) -> Path:
+    """Return the path of the manifest of a snapshot."""
+    return Path(settings.SNAPSHOT_DIR) / f"{name}.json"
+
+
+def build_snapshot(name: str, seed: int = 0, workers: int = 1) -> dict:
+    """Build a snapshot and write its manifest.
+
+    The dataset is seeded into a new database file, migrated like a test
+    database, then analyzed and vacuumed. The snapshot of an older version is
+    deleted once the new one is written.
+
+    Args:
+        name: The name of the snapshot, a key of SNAPSHOT_SIZES.
+        seed: The seed of the dataset.
+        workers: The number of worker processes seeding the dataset.
+
+    Returns:
+        The manifest of the snapshot.
+    """
+    size = SNAPSHOT_SIZES[name]
+    version = snapshot_version(size, seed)
+    directory = Path(settings.SNAPSHOT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}-{version}.sqlite3"
+    building = path.with_suffix(".building")
+
+    start = time.perf_counter()
+    test_settings = connections["default"].settings_dict["TEST"]
+    old_test_name = test_settings["NAME"]
+    test_settings["NAME"] = str(building)
+    try:
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default"}, serialized_aliases=()
+        )
+        try:
+            counts = seed_dataset(size, seed=seed, workers=workers)
+            connection = connections["default"]
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                cursor.execute("VACUUM")
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=True)
+    finally:
+        test_settings["NAME"] = old_test_name
+    os.replace(building, path)
+
+    manifest = {
+        "name": name,
+        "version": version,
+        "file": path.name,
+        "sha256": file_checksum(path),
+        "size": vars(size),
+        "seed": seed,
+        "rows": counts,
+        "build_seconds": round(time.perf_counter() - start, 1),
+    }
+    previous = read_manifest(name)
+    write_manifest(name, manifest)
+    if previous and previous["file"] != path.name:
+        (directory / previous["file"]).unlink(missing_ok=True)
+    return manifest
+
+
+def read_manifest(name: str) -> dict | None:
+    """Return the manifest of a snapshot, or None if it was never built."""
+    try:
+        return json.loads(manifest_path(name).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(name: str, manifest: dict) -> None:
+    """Write the manifest of a snapshot."""
+    path = manifest_path(name)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2) + "\n")
+    os.replace(tmp, path)
+
+
+def verify_snapshot(name: str, checksum: bool = True) -> Path:
+    """Check that a snapshot is current and intact and return its path.
+
+    Args:
+        name: The name of the snapshot.
+        checksum: Whether to also compare the file with its SHA-256 checksum.
+
+    Raises:
+        SnapshotError: If the snapshot is missing, stale or corrupt.
+    """
+    manifest = read_manifest(name)
+    if manifest is None:
+        raise SnapshotError(f"Snapshot {name} was never built")
+    size = DatasetSize(**manifest["size"])
+    if manifest["version"] != snapshot_version(size, manifest["seed"]):
+        raise SnapshotError(
+            f"Snapshot {name} is stale (version {manifest['version']}); rebuild it"
+        )
+    path = Path(settings.SNAPSHOT_DIR) / manifest["file"]
+    if not path.exists():
+        raise SnapshotError(f"Snapshot file {path} is missing")
+    if checksum and file_checksum(path) != manifest["sha256"]:
+        raise SnapshotError(f"Snapshot file {path} does not match its checksum")
+    return path
+
+
+def restore_snapshot(name: str, target=None, using: str = "default") -> dict:
+    """Restore a snapshot after verifying it.
+
+    Args:
+        name: The name of the snapshot.
+        target: A database file path to copy the snapshot to. If None, the
+            snapshot is copied into the open connection of `using` with the
+            SQLite backup API, e.g. into an in-memory test database.
+        using: The database alias restored when no target is given.
+
+    Returns:
+        The manifest of the restored snapshot.
+
+    Raises:
+        SnapshotError: If the snapshot cannot be restored.
+    """
+    path = verify_snapshot(name)
+
+    if target is not None:
+        target = Path(target)
+        # A leftover WAL would be replayed onto the copied file
+        for suffix in ("-wal", "-shm"):
+            Path(f"{target}{suffix}").unlink(missing_ok=True)
+        tmp = target.with_name(target.name + ".restoring")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    else:
+        connection = connections[using]
+        if connection.in_atomic_block:
+            raise SnapshotError("Cannot restore a snapshot inside a transaction")
+        connection.ensure_connection()
+        source = sqlite3.connect(path)
+        try:
+            source.backup(connection.connection)
+        finally:
+            source.close()
+
+    return read_manifest(name)
+
+
+def load_dataset(name: str, seed: int = 0) -> bool:
+    """Restore a snapshot into the default database, or seed its dataset
+    there if no current snapshot has been built.
+
+    Returns:
+        True if the snapshot was restored, False if the dataset was seeded.
+    """
+    try:
+        restore_snapshot(name)
+    except SnapshotError:
+        seed_dataset(SNAPSHOT_SIZES[name], seed=seed)
+        return False
+    return True
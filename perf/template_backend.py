@@ -0,0 +1,34 @@
+"""A Django template backend timing every template render."""
+
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+from perf.metrics import TEMPLATE_RENDER_TIME
+
+
+class InstrumentedTemplate(Template):
+    """A template recording its render time in the metrics registry."""
+
+    def render(self, context=None, request=None):
+        """Render the template and observe how long it took."""
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            TEMPLATE_RENDER_TIME.observe(
+                time.perf_counter() - start,
+                template=self.origin.template_name or "<string>",
+            )
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, returning InstrumentedTemplate objects."""
+
+    def from_string(self, template_code):
+        """Compile a template from a string."""
+        return InstrumentedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        """Load a template by name."""
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
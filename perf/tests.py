@@ -0,0 +1,1271 @@
+import io
+import json
+import logging
+import sqlite3
+import tempfile
+import threading
+import time
+from contextvars import Context
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import path, reverse
+
+from django_project.replicas import (
+    STICKY_COOKIE,
+    PrimaryReplicaRouter,
+    ReplicaPinningMiddleware,
+    pin_to_primary,
+    sync_replica,
+)
+from django_project.staticfiles import (
+    IMMUTABLE_CACHE_CONTROL,
+    StaticFilesMiddleware,
+    accepted_encodings,
+)
+from django_project.log_handlers import QueueListenerHandler, StructuredFormatter
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from perf.middleware import (
+    PROFILE_HEADER,
+    SUMMARY_HEADER,
+    QueryBudgetExceeded,
+)
+from perf.cache import bump_versions, get_versions
+from perf.management.commands.bench_templates import Command as BenchTemplatesCommand
+from perf.journeys import JourneyRunner, percentile, summarize
+from perf.metrics import (
+    DEAL_TRANSITIONS,
+    MESSAGES_SENT,
+    REQUEST_LATENCY,
+    RESPONSE_CACHE,
+    TEMPLATE_RENDER_TIME,
+    Registry,
+)
+from perf.profiling import StackSampler
+from perf.snapshots import (
+    SNAPSHOT_SIZES,
+    SnapshotError,
+    file_checksum,
+    read_manifest,
+    restore_snapshot,
+    snapshot_version,
+    verify_snapshot,
+    write_manifest,
+)
+from perf.queries import (
+    QueryRecorder,
+    RecordedQuery,
+    explain,
+    full_scans,
+    repeated_queries,
+)
+from skills.models import Category, Message, Review, Skill, SkillDeal
+from skills.seeding import DatasetSize, seed_dataset
+
+
+class SQLiteProductionProfileTests(SimpleTestCase):
+    """Tests for the tuned SQLite options of the production profile."""
+
+    def setUp(self):
+        """Open a production-profile connection to a temporary database."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.wrapper = DatabaseWrapper(
+            {
+                "ENGINE": "django.db.backends.sqlite3",
+                "NAME": str(Path(tmp.name) / "test.sqlite3"),
+                "OPTIONS": settings.SQLITE_PRODUCTION_OPTIONS,
+                "CONN_MAX_AGE": 0,
+                "CONN_HEALTH_CHECKS": False,
+                "AUTOCOMMIT": True,
+                "ATOMIC_REQUESTS": False,
+                "TIME_ZONE": None,
+                "TEST": {},
+            },
+            alias="production_profile",
+        )
+        self.addCleanup(self.wrapper.close)
+
+    def pragma(self, name):
+        """Return the current value of a pragma on the connection."""
+        with self.wrapper.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        """Test that every new connection gets the configured pragmas."""
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), 20000)
+        self.assertEqual(self.pragma("cache_size"), -65536)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        """Test that transactions begin IMMEDIATE, and that the Django-only
+        options never reach sqlite3.connect()."""
+        params = self.wrapper.get_connection_params()
+        self.assertNotIn("init_command", params)
+        self.assertNotIn("transaction_mode", params)
+        self.assertEqual(params["timeout"], 20)
+        self.assertEqual(self.wrapper.transaction_mode, "IMMEDIATE")
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Tests for routing reads to replicas with read-your-writes pinning."""
+
+    def setUp(self):
+        """Set up the router and a middleware recording where reads go."""
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.middleware = ReplicaPinningMiddleware(self.view)
+
+    def view(self, request):
+        """A view that records the read database and optionally writes."""
+        if "write" in request.GET:
+            self.router.db_for_write(None)
+        request.read_db = self.router.db_for_read(None)
+        return HttpResponse()
+
+    def run_isolated(self, func, *args):
+        """Run a function in a fresh context, like a new request thread."""
+        return Context().run(func, *args)
+
+    def test_reads_use_replica_and_writes_use_primary(self):
+        """Test the default routing outside any pinning."""
+        self.assertEqual(self.run_isolated(self.router.db_for_read, None), "replica1")
+        self.assertEqual(self.router.db_for_write(None), "default")
+
+    def test_reads_after_write_use_primary(self):
+        """Test that a context reads its own writes from the primary."""
+
+        def write_then_read():
+            self.router.db_for_write(None)
+            return self.router.db_for_read(None)
+
+        self.assertEqual(self.run_isolated(write_then_read), "default")
+
+    def test_pin_to_primary(self):
+        """Test explicit pinning of a block of code."""
+
+        def pinned_read():
+            with pin_to_primary():
+                return self.router.db_for_read(None)
+
+        self.assertEqual(self.run_isolated(pinned_read), "default")
+
+    def test_post_is_pinned_and_sets_sticky_cookie(self):
+        """Test that unsafe requests read from the primary and make the
+        following requests sticky."""
+        request = self.factory.post("/")
+        response = self.run_isolated(self.middleware, request)
+
+        self.assertEqual(request.read_db, "default")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_get_that_writes_sets_sticky_cookie(self):
+        """Test that a GET request performing a write also becomes sticky."""
+        request = self.factory.get("/", {"write": "1"})
+        response = self.run_isolated(self.middleware, request)
+
+        self.assertEqual(request.read_db, "default")
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_sticky_cookie_pins_request(self):
+        """Test that a request carrying the sticky cookie uses the primary,
+        while a plain GET uses the replica without setting the cookie."""
+        sticky = self.factory.get("/")
+        sticky.COOKIES[STICKY_COOKIE] = "1"
+        self.run_isolated(self.middleware, sticky)
+        self.assertEqual(sticky.read_db, "default")
+
+        plain = self.factory.get("/")
+        response = self.run_isolated(self.middleware, plain)
+        self.assertEqual(plain.read_db, "replica1")
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_sync_replica_copies_primary(self):
+        """Test that the replica stand-in is refreshed with the backup API."""
+        with tempfile.TemporaryDirectory() as tmp:
+            primary, replica = Path(tmp) / "primary.db", Path(tmp) / "replica.db"
+            with sqlite3.connect(primary) as conn:
+                conn.execute("CREATE TABLE skill (name TEXT)")
+                conn.execute("INSERT INTO skill VALUES ('Gardening')")
+            conn.close()
+
+            sync_replica(primary, replica)
+
+            conn = sqlite3.connect(replica)
+            self.assertEqual(
+                conn.execute("SELECT name FROM skill").fetchall(), [("Gardening",)]
+            )
+            conn.close()
+
+
+class SnapshotDatasetMixin:
+    """A mixin restoring a dataset snapshot into the test database.
+
+    The snapshot is restored before the class transaction starts, and the
+    empty database is put back once the class is done. Classes must seed the
+    dataset themselves in setUpTestData when snapshot_restored is False, i.e.
+    when no current snapshot has been built.
+
+    Attributes:
+        snapshot: The name of the snapshot to restore.
+    """
+
+    snapshot = None
+
+    @classmethod
+    def setUpClass(cls):
+        """Restore the snapshot if it is current."""
+        connection.ensure_connection()
+        empty = sqlite3.connect(":memory:")
+        connection.connection.backup(empty)
+        try:
+            restore_snapshot(cls.snapshot)
+        except SnapshotError:
+            cls.snapshot_restored = False
+            empty.close()
+        else:
+            cls.snapshot_restored = True
+            cls.addClassCleanup(cls._restore_empty_database, empty)
+        super().setUpClass()
+
+    @classmethod
+    def _restore_empty_database(cls, empty):
+        """Put back the database saved before the snapshot was restored."""
+        empty.backup(connection.connection)
+        empty.close()
+
+
+class QueryPlanRegressionTests(SnapshotDatasetMixin, TestCase):
+    """Tests guarding the query count and query plans of the hot views.
+
+    Every view is rendered for the busiest user of the medium dataset, restored
+    from its snapshot when one has been built. A test
+    fails when the view runs more queries than its budget, or when one of
+    its SELECTs reads a table with a full scan that is not allowed for that
+    view. The budgets are settings.QUERY_BUDGETS; lower them as views get
+    faster.
+    """
+
+    snapshot = "medium"
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed the dataset and collect planner statistics for it."""
+        if not cls.snapshot_restored:
+            seed_dataset(SNAPSHOT_SIZES["medium"])
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        cls.user = (
+            get_user_model()
+            .objects.annotate(
+                deals=Count("owner", distinct=True) + Count("requester", distinct=True)
+            )
+            .order_by("-deals", "pk")
+            .first()
+        )
+        cls.skill = (
+            Skill.objects.filter(owner=cls.user, skill_type="offered")
+            .order_by("-rating_count", "pk")
+            .first()
+        )
+        cls.category = Category.objects.order_by("pk").first()
+
+    def setUp(self):
+        """Log in as the busiest user, with every cache cold: the budgets
+        include the sidebar queries a cached layout saves."""
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def assertQueryPlans(self, url, allowed_scans=()):
+        """Render a page and check its query count and query plans.
+
+        Args:
+            url: The URL of the page.
+            allowed_scans: Tables the page's queries may scan in full.
+        """
+        with QueryRecorder() as recorder:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        budget = settings.QUERY_BUDGETS[response.resolver_match.view_name]
+
+        self.assertLessEqual(
+            len(recorder.queries),
+            budget,
+            f"{url} ran {len(recorder.queries)} queries (budget {budget})",
+        )
+        for query in recorder.queries:
+            if not query.is_select:
+                continue
+            plan = explain(query)
+            scans = full_scans(plan) - set(allowed_scans)
+            self.assertFalse(
+                scans,
+                f"{url} scans {', '.join(sorted(scans))}:\n{query.sql}\n"
+                + "\n".join(plan),
+            )
+
+    def test_skill_search(self):
+        """Test the query count and plans of the skill search."""
+        self.assertQueryPlans(reverse("skill_search") + "?search_term=cook")
+
+    def test_skill_by_category(self):
+        """Test the query count and plans of a category listing."""
+        self.assertQueryPlans(reverse("skill_by_category", args=[self.category.name]))
+
+    def test_dashboard(self):
+        """Test the query count and plans of the dashboard."""
+        self.assertQueryPlans(reverse("dashboard", args=[self.user.pk]))
+
+    def test_skill_deal_list(self):
+        """Test the query count and plans of the deal list."""
+        self.assertQueryPlans(reverse("skill_deal_list"))
+
+    def test_provided_deals(self):
+        """Test the query count and plans of the provided deals."""
+        self.assertQueryPlans(reverse("provided_deals"))
+
+    def test_requested_deals(self):
+        """Test the query count and plans of the requested deals."""
+        self.assertQueryPlans(reverse("requested_deals"))
+
+    def test_message_list(self):
+        """Test the query count and plans of the inbox."""
+        self.assertQueryPlans(reverse("message_list"))
+
+    def test_skill_detail(self):
+        """Test the query count and plans of a skill page."""
+        self.assertQueryPlans(reverse("skill_detail", args=[self.skill.pk]))
+
+
+def n_plus_one_view(request):
+    """A view loading the category of every skill one query at a time."""
+    names = [skill.category.name for skill in Skill.objects.all()]
+    return HttpResponse(", ".join(names))
+
+
+urlpatterns = [path("n-plus-one/", n_plus_one_view, name="n_plus_one")]
+
+
+@override_settings(
+    ROOT_URLCONF="perf.tests",
+    QUERY_INSPECTION=True,
+    QUERY_BUDGETS={"n_plus_one": 100},
+)
+class QueryInspectionMiddlewareTests(TestCase):
+    """Tests for the per-request query recording middleware."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a dataset with a few dozen skills."""
+        seed_dataset(DatasetSize(users=5, skills_per_user=6))
+        cls.user = get_user_model().objects.get(username="user0")
+
+    def setUp(self):
+        """Log in as one of the seeded users."""
+        self.client.force_login(self.user)
+        self.url = reverse("n_plus_one")
+
+    def test_summary_header(self):
+        """Test that responses carry the query summary header."""
+        response = self.client.get(self.url)
+        summary = dict(item.split("=") for item in response[SUMMARY_HEADER].split("; "))
+        self.assertGreater(int(summary["queries"]), 1)
+        self.assertGreater(int(summary["repeated"]), 0)
+        self.assertEqual(summary["budget"], "100")
+
+    @override_settings(QUERY_INSPECTION=False)
+    def test_disabled(self):
+        """Test that no header is added when query inspection is off."""
+        response = self.client.get(self.url)
+        self.assertNotIn(SUMMARY_HEADER, response)
+
+    @override_settings(DEBUG=True)
+    def test_repeated_queries_are_logged(self):
+        """Test that N+1 query shapes are logged in DEBUG."""
+        with self.assertLogs("perf.middleware", "WARNING") as logs:
+            self.client.get(self.url)
+        self.assertIn("possible N+1", logs.output[0])
+
+    @override_settings(DEBUG=True, QUERY_BUDGETS={"n_plus_one": 1})
+    def test_over_budget_is_logged(self):
+        """Test that a view over its budget is logged in DEBUG."""
+        with self.assertLogs("perf.middleware", "WARNING") as logs:
+            self.client.get(self.url)
+        self.assertIn("over its budget of 1", logs.output[-1])
+
+    @override_settings(
+        DEBUG=True, QUERY_BUDGETS={"n_plus_one": 1}, QUERY_BUDGET_RAISE=True
+    )
+    def test_over_budget_raises(self):
+        """Test that a view over its budget raises with QUERY_BUDGET_RAISE."""
+        with self.assertLogs("perf.middleware", "WARNING"):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(self.url)
+
+    def test_repeated_queries(self):
+        """Test that only shapes repeated with differing parameters count."""
+        per_row = "SELECT * FROM skills_category WHERE id = %s"
+        same = "SELECT * FROM django_session WHERE session_key = %s"
+        queries = [RecordedQuery(per_row, (i,), 0.0) for i in range(3)]
+        queries += [RecordedQuery(same, ("key",), 0.0) for _ in range(3)]
+        self.assertEqual(repeated_queries(queries), {per_row: 3})
+        self.assertEqual(repeated_queries(queries, threshold=4), {})
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class ListViewQueryCountTests(TestCase):
+    """Tests that the list views run the same number of queries whatever the
+    number of rows they show. The rows are bulk created without signals, so
+    the response cache is turned off and every page is measured with a cold
+    cache."""
+
+    SIZES = [10, 100, 1000]
+
+    def setUp(self):
+        """Create the viewing user, another user and a category."""
+        User = get_user_model()
+        self.user = User.objects.create_user(username="viewer", password="pass")
+        self.other = User.objects.create_user(username="other", password="pass")
+        self.category = Category.objects.create(name="Category 1")
+        Skill.objects.create(
+            name="Cooking",
+            level="Beginner",
+            description="Wanted skill",
+            owner=self.user,
+            category=self.category,
+            skill_type="wanted",
+        )
+        self.rows = 0
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def grow_to(self, rows):
+        """Add offered skills, deals both ways, reviews and messages until
+        there are `rows` of each."""
+        count = rows - self.rows
+        skills = Skill.objects.bulk_create(
+            Skill(
+                name="Cooking",
+                level="Expert",
+                description=f"Skill {self.rows + i}",
+                owner=self.other,
+                category=self.category,
+                skill_type="offered",
+            )
+            for i in range(count)
+        )
+        statuses = [status for status, _ in SkillDeal.STATUS_CHOICES]
+        deals = SkillDeal.objects.bulk_create(
+            SkillDeal(
+                skill=skill,
+                owner=self.user if i % 2 else self.other,
+                provider=self.other if i % 2 else self.user,
+                status=statuses[i % len(statuses)],
+            )
+            for i, skill in enumerate(skills)
+        )
+        Review.objects.bulk_create(
+            Review(skill=deal.skill, owner=deal.owner, deal=deal, rating=4.0)
+            for deal in deals
+            if deal.status == SkillDeal.COMPLETED
+        )
+        Message.objects.bulk_create(
+            Message(
+                sender=self.other,
+                receiver=self.user,
+                skill_deal=deal,
+                content="Hello",
+                is_read=bool(i % 2),
+            )
+            for i, deal in enumerate(deals)
+        )
+        self.rows = rows
+
+    def assertConstantQueries(self, url):
+        """Test that a page runs the same number of queries at every size,
+        within its budget (pages are full from the first size, so a
+        per-row query shows up as going over budget)."""
+        counts = []
+        for rows in self.SIZES:
+            self.grow_to(rows)
+            # Bulk created rows fire no invalidation; measure a cold layout
+            cache.clear()
+            with QueryRecorder() as recorder:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(recorder.queries))
+        self.assertEqual(len(set(counts)), 1, f"{url} ran {counts} queries")
+        budget = settings.QUERY_BUDGETS[response.resolver_match.view_name]
+        self.assertLessEqual(counts[0], budget)
+
+    def test_skill_list(self):
+        """Test the query count of a category listing."""
+        self.assertConstantQueries(reverse("skill_by_category", args=["Category 1"]))
+
+    def test_skill_deal_list(self):
+        """Test the query count of the deal list."""
+        self.assertConstantQueries(reverse("skill_deal_list"))
+
+    def test_provided_deals(self):
+        """Test the query count of the provided deals."""
+        self.assertConstantQueries(reverse("provided_deals"))
+
+    def test_requested_deals(self):
+        """Test the query count of the requested deals."""
+        self.assertConstantQueries(reverse("requested_deals"))
+
+    def test_message_list(self):
+        """Test the query count of the inbox."""
+        self.assertConstantQueries(reverse("message_list"))
+
+    def test_dashboard(self):
+        """Test the query count of the dashboard."""
+        self.assertConstantQueries(reverse("dashboard", args=[self.user.pk]))
+
+
+class RequestProfilingTests(TestCase):
+    """Tests for the on-demand request profiling middleware."""
+
+    def setUp(self):
+        """Log in as a staff user and send profiles to a temporary directory."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = Path(tmp.name)
+        settings_override = override_settings(PROFILING_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username="staff", password="pass", is_staff=True
+        )
+        self.client.force_login(self.user)
+        self.url = reverse("message_list")
+
+    def test_header_profiles_request(self):
+        """Test that a staff request with the header writes both profiles."""
+        response = self.client.get(self.url, headers={PROFILE_HEADER: "1"})
+        name = response[PROFILE_HEADER]
+        self.assertIn("message_list", name)
+        self.assertTrue((self.directory / f"{name}.prof").exists())
+        self.assertTrue((self.directory / f"{name}.folded").exists())
+
+    def test_query_parameter_profiles_request(self):
+        """Test that the ?profile parameter profiles the request."""
+        response = self.client.get(self.url, {"profile": ""})
+        self.assertIn(PROFILE_HEADER, response)
+
+    def test_unflagged_request_is_not_profiled(self):
+        """Test that requests without the flag are not profiled."""
+        response = self.client.get(self.url)
+        self.assertNotIn(PROFILE_HEADER, response)
+        self.assertEqual(list(self.directory.iterdir()), [])
+
+    def test_non_staff_request_is_not_profiled(self):
+        """Test that only staff users can profile requests."""
+        self.user.is_staff = False
+        self.user.save()
+        response = self.client.get(self.url, headers={PROFILE_HEADER: "1"})
+        self.assertNotIn(PROFILE_HEADER, response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_sample_rate(self):
+        """Test that requests outside the sample rate are not profiled."""
+        response = self.client.get(self.url, headers={PROFILE_HEADER: "1"})
+        self.assertNotIn(PROFILE_HEADER, response)
+
+    def test_stack_sampler(self):
+        """Test that the sampler writes collapsed stacks of the thread."""
+
+        def busy():
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                pass
+
+        with StackSampler(threading.get_ident(), interval=0.001) as sampler:
+            busy()
+        path = self.directory / "busy.folded"
+        sampler.write_collapsed(path)
+
+        lines = path.read_text().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("busy (perf/tests.py", stack.split(";")[-1])
+        self.assertGreater(int(count), 0)
+
+
+class MetricsRegistryTests(SimpleTestCase):
+    """Tests for the metrics registry and its exposition format."""
+
+    def setUp(self):
+        """Create a registry with a counter and a histogram."""
+        self.registry = Registry()
+        self.counter = self.registry.counter("events_total", "Events.", ["kind"])
+        self.histogram = self.registry.histogram(
+            "latency_seconds", "Latency.", ["view"], buckets=(0.1, 1.0)
+        )
+
+    def test_exposition(self):
+        """Test the Prometheus text of a counter and a histogram."""
+        self.counter.inc(kind="a")
+        self.counter.inc(2, kind="a")
+        self.histogram.observe(0.05, view="home")
+        self.histogram.observe(0.5, view="home")
+
+        text = self.registry.exposition()
+        self.assertIn("# TYPE events_total counter", text)
+        self.assertIn('events_total{kind="a"} 3', text)
+        self.assertIn("# TYPE latency_seconds histogram", text)
+        self.assertIn('latency_seconds_bucket{view="home",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{view="home",le="1.0"} 2', text)
+        self.assertIn('latency_seconds_bucket{view="home",le="+Inf"} 2', text)
+        self.assertIn('latency_seconds_sum{view="home"} 0.55', text)
+        self.assertIn('latency_seconds_count{view="home"} 2', text)
+
+    def test_processes_are_added_up(self):
+        """Test that the files written by other processes are aggregated."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        directory = Path(tmp.name)
+        (directory / "1.json").write_text(
+            json.dumps(
+                {
+                    "events_total": [[["a"], 5]],
+                    "latency_seconds": [[["home"], [1, 1, 0.05, 1]]],
+                }
+            )
+        )
+
+        self.counter.inc(kind="a")
+        self.histogram.observe(2.0, view="home")
+        with override_settings(METRICS_DIR=directory):
+            text = self.registry.exposition()
+
+        self.assertIn('events_total{kind="a"} 6', text)
+        self.assertIn('latency_seconds_bucket{view="home",le="1.0"} 1', text)
+        self.assertIn('latency_seconds_count{view="home"} 2', text)
+
+
+class MetricsTests(TestCase):
+    """Tests for the request metrics and the metrics endpoint."""
+
+    def setUp(self):
+        """Create a deal between two users."""
+        User = get_user_model()
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        self.provider = User.objects.create_user(username="provider", password="pass")
+        self.skill = Skill.objects.create(
+            name="Cooking",
+            level="Expert",
+            description="Cooking lessons",
+            owner=self.provider,
+            category=Category.objects.create(name="Category 1"),
+            skill_type="offered",
+        )
+
+    def test_request_metrics(self):
+        """Test that request latency and template render time are recorded."""
+        self.client.force_login(self.owner)
+        requests, _ = REQUEST_LATENCY.get(url_name="message_list", method="GET")
+        renders, _ = TEMPLATE_RENDER_TIME.get(template="skills/messages_list.html")
+
+        self.client.get(reverse("message_list"))
+
+        self.assertEqual(
+            REQUEST_LATENCY.get(url_name="message_list", method="GET")[0],
+            requests + 1,
+        )
+        self.assertEqual(
+            TEMPLATE_RENDER_TIME.get(template="skills/messages_list.html")[0],
+            renders + 1,
+        )
+
+    def test_deal_and_message_counters(self):
+        """Test that deal transitions and messages are counted."""
+        requested = DEAL_TRANSITIONS.get(status=SkillDeal.PENDING)
+        accepted = DEAL_TRANSITIONS.get(status=SkillDeal.ACTIVE)
+        messages = MESSAGES_SENT.get()
+
+        self.client.force_login(self.owner)
+        self.client.get(reverse("skill_deal_new", args=[self.skill.pk]))
+        deal = SkillDeal.objects.get(skill=self.skill)
+        self.client.force_login(self.provider)
+        self.client.get(reverse("skill_deal_accept", args=[deal.pk]))
+
+        self.assertEqual(DEAL_TRANSITIONS.get(status=SkillDeal.PENDING), requested + 1)
+        self.assertEqual(DEAL_TRANSITIONS.get(status=SkillDeal.ACTIVE), accepted + 1)
+        self.assertEqual(MESSAGES_SENT.get(), messages + 2)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint(self):
+        """Test that the endpoint serves the metrics in the text format to
+        clients sending the token."""
+        self.client.get(reverse("home"))
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertContains(response, 'http_requests_total{url_name="home"')
+        self.assertContains(response, "# TYPE skill_deal_transitions_total counter")
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_endpoint_is_restricted(self):
+        """Test that other clients cannot read the metrics, even from the
+        address of the reverse proxy."""
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            response = self.client.get(
+                reverse("metrics"), REMOTE_ADDR="127.0.0.1", **headers
+            )
+            self.assertEqual(response.status_code, 403)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+    def test_metrics_endpoint_allows_staff(self):
+        """Test that staff users can read the metrics without a token."""
+        self.owner.is_staff = True
+        self.owner.save()
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+
+class LoggingPipelineTests(TestCase):
+    """Tests for the queued logging handlers and the debug events."""
+
+    def test_queue_listener_handler_writes_in_background(self):
+        """Test that queued records reach the stream by the listener."""
+        stream = io.StringIO()
+        handler = QueueListenerHandler(stream=stream)
+        handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        logger = logging.getLogger("perf.tests.queue")
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.warning("deal %s accepted", 7)
+        handler.close()
+
+        self.assertEqual(stream.getvalue(), "WARNING deal 7 accepted\n")
+
+    def test_structured_formatter(self):
+        """Test that records are formatted as JSON with their extra fields."""
+        record = logging.makeLogRecord(
+            {
+                "name": "skills",
+                "levelno": logging.INFO,
+                "levelname": "INFO",
+                "msg": "deal %s",
+                "args": (3,),
+                "deal_id": 3,
+            }
+        )
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(entry["message"], "deal 3")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["deal_id"], 3)
+
+    def test_deal_checks_log_debug_events(self):
+        """Test that the SkillDeal checks log at debug level instead of
+        printing."""
+        User = get_user_model()
+        owner = User.objects.create_user(username="owner", password="pass")
+        provider = User.objects.create_user(username="provider", password="pass")
+        skill = Skill.objects.create(
+            name="Cooking",
+            level="Expert",
+            description="Cooking lessons",
+            owner=provider,
+            category=Category.objects.create(name="Category 1"),
+            skill_type="offered",
+        )
+        deal = SkillDeal.objects.create(skill=skill, owner=owner, provider=provider)
+
+        with self.assertLogs("skills.models", "DEBUG") as logs:
+            self.assertTrue(deal.is_owner(owner))
+            self.assertTrue(deal.is_provider(provider))
+            self.assertFalse(deal.is_completed())
+        self.assertEqual(len(logs.records), 3)
+        self.assertTrue(all(r.levelno == logging.DEBUG for r in logs.records))
+
+
+@override_settings(QUERY_INSPECTION=True)
+class JourneyBenchmarkTests(TestCase):
+    """Tests for the user journey load benchmark."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Seed a small dataset."""
+        seed_dataset(DatasetSize())
+
+    def test_journeys(self):
+        """Test that journeys run without errors and are summarized per URL."""
+        reviews = Review.objects.count()
+        runner = JourneyRunner(seed=1)
+        runner.run(2)
+        report = summarize(runner.samples, 2, 1.0)
+
+        self.assertEqual(report["requests"], 26)
+        self.assertEqual(report["journeys_per_second"], 2.0)
+        self.assertEqual(report["urls"]["dashboard"]["requests"], 4)
+        for url_name, result in report["urls"].items():
+            self.assertEqual(result["errors"], 0, url_name)
+            self.assertGreater(result["queries_max"], 0, url_name)
+        self.assertEqual(Review.objects.count(), reviews + 2)
+
+    def test_percentile(self):
+        """Test the nearest-rank percentiles."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+
+class SnapshotTests(TransactionTestCase):
+    """Tests for the verification and restoring of dataset snapshots."""
+
+    def setUp(self):
+        """Save the current database as a snapshot in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(SNAPSHOT_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        seed_dataset(SNAPSHOT_SIZES["small"])
+        self.deals = SkillDeal.objects.count()
+        self.version = snapshot_version(SNAPSHOT_SIZES["small"])
+        self.path = self.directory / f"small-{self.version}.sqlite3"
+        snapshot = sqlite3.connect(self.path)
+        connection.connection.backup(snapshot)
+        snapshot.close()
+        self.manifest = {
+            "name": "small",
+            "version": self.version,
+            "file": self.path.name,
+            "sha256": file_checksum(self.path),
+            "size": vars(SNAPSHOT_SIZES["small"]),
+            "seed": 0,
+        }
+        write_manifest("small", self.manifest)
+
+    def test_restore_into_connection(self):
+        """Test that a snapshot is restored into the open database."""
+        SkillDeal.objects.all().delete()
+
+        manifest = restore_snapshot("small")
+
+        self.assertEqual(manifest, self.manifest)
+        self.assertEqual(SkillDeal.objects.count(), self.deals)
+
+    def test_restore_to_file(self):
+        """Test that a snapshot is copied onto a database file."""
+        target = self.directory / "restored.sqlite3"
+        Path(f"{target}-wal").write_bytes(b"stale")
+
+        restore_snapshot("small", target=target)
+
+        self.assertFalse(Path(f"{target}-wal").exists())
+        conn = sqlite3.connect(target)
+        count = conn.execute("SELECT COUNT(*) FROM skills_skilldeal").fetchone()[0]
+        conn.close()
+        self.assertEqual(count, self.deals)
+
+    def test_missing_snapshot(self):
+        """Test that a snapshot that was never built is not restored."""
+        with self.assertRaisesMessage(SnapshotError, "never built"):
+            restore_snapshot("large")
+
+    def test_stale_snapshot(self):
+        """Test that a snapshot of another version is not restored."""
+        write_manifest("small", {**self.manifest, "version": "0" * 12})
+
+        with self.assertRaisesMessage(SnapshotError, "stale"):
+            verify_snapshot("small")
+
+    def test_corrupt_snapshot(self):
+        """Test that a snapshot not matching its checksum is not restored."""
+        with open(self.path, "ab") as file:
+            file.write(b"\0")
+
+        with self.assertRaisesMessage(SnapshotError, "checksum"):
+            restore_snapshot("small", target=self.directory / "restored.sqlite3")
+        self.assertFalse((self.directory / "restored.sqlite3").exists())
+
+    def test_version(self):
+        """Test that the version depends on the dataset and its seed."""
+        self.assertEqual(snapshot_version(SNAPSHOT_SIZES["small"]), self.version)
+        self.assertNotEqual(snapshot_version(SNAPSHOT_SIZES["small"], 1), self.version)
+        self.assertNotEqual(snapshot_version(SNAPSHOT_SIZES["medium"]), self.version)
+        self.assertEqual(read_manifest("small")["version"], self.version)
+
+
+class ResponseCacheTests(TestCase):
+    """Tests for the versioned response cache and its invalidation."""
+
+    def setUp(self):
+        """Create a skill of another user and log in as the viewer."""
+        cache.clear()
+        User = get_user_model()
+        self.viewer = User.objects.create_user(username="viewer", password="pass")
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        self.category = Category.objects.create(name="Cooking")
+        self.skill = Skill.objects.create(
+            name="Italian Cooking",
+            level="Expert",
+            description="Pasta",
+            owner=self.owner,
+            category=self.category,
+            skill_type="offered",
+        )
+        self.detail = reverse("skill_detail", args=[self.skill.pk])
+        self.listing = reverse("skill_by_category", args=["Cooking"])
+        self.client.force_login(self.viewer)
+
+    def get(self, url):
+        """Return the response to a GET and the number of queries it ran."""
+        with QueryRecorder() as recorder:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(recorder.queries)
+
+    def test_detail_cached(self):
+        """Test that a skill page is served from the cache the second time."""
+        hits = RESPONSE_CACHE.get(url_name="skill_detail", result="hit")
+        first, rendered = self.get(self.detail)
+        second, cached = self.get(self.detail)
+
+        self.assertEqual(second.content, first.content)
+        self.assertLess(cached, rendered)
+        self.assertEqual(
+            RESPONSE_CACHE.get(url_name="skill_detail", result="hit"), hits + 1
+        )
+
+    def test_detail_varies_on_user(self):
+        """Test that every user gets their own copy of a skill page."""
+        self.get(self.detail)
+        self.client.force_login(self.owner)
+
+        response, _ = self.get(self.detail)
+
+        self.assertContains(response, "Pending Deals")
+
+    def test_detail_invalidated(self):
+        """Test that writes to the skill, its deals, its reviews and the
+        categories invalidate its page."""
+        self.get(self.detail)
+
+        deal = SkillDeal.objects.create(
+            skill=self.skill, owner=self.viewer, provider=self.owner
+        )
+        self.assertContains(self.get(self.detail)[0], "pending deal request")
+
+        deal.status = SkillDeal.COMPLETED
+        deal.save()
+        Review.objects.create(
+            skill=self.skill, owner=self.viewer, deal=deal, review="Tasty", rating=4
+        )
+        self.assertContains(self.get(self.detail)[0], "Tasty")
+
+        self.skill.description = "Risotto"
+        self.skill.save()
+        self.assertContains(self.get(self.detail)[0], "Risotto")
+
+        self.category.name = "Italian"
+        self.category.save()
+        self.assertContains(self.get(self.detail)[0], "Italian</td>")
+
+    def test_category_listing_invalidated(self):
+        """Test that a category listing is cached until a skill of the
+        category changes, and is not invalidated by other categories."""
+        self.get(self.listing)
+        other = Category.objects.create(name="Music")
+        version = get_versions(["category:cooking"])
+
+        self.skill.category = other
+        self.skill.save()
+        self.assertNotEqual(get_versions(["category:cooking"]), version)
+        self.assertNotContains(self.get(self.listing)[0], "Italian Cooking")
+
+        Skill.objects.create(
+            name="Guitar Playing",
+            level="Novice",
+            description="Chords",
+            owner=self.owner,
+            category=other,
+            skill_type="offered",
+        )
+        self.assertEqual(self.get(self.listing)[1], 2)
+
+    def test_user_change_invalidates(self):
+        """Test that a change to the user's profile invalidates their pages."""
+        self.get(self.detail)
+
+        self.viewer.username = "renamed"
+        self.viewer.save()
+
+        self.assertContains(self.get(self.detail)[0], "renamed")
+
+    def test_landing_shared(self):
+        """Test that the landing page is cached once for all users."""
+        self.get(reverse("home"))
+        self.client.logout()
+
+        self.assertEqual(self.get(reverse("home"))[1], 0)
+
+    def test_bump_on_commit(self):
+        """Test that versions bumped in a transaction are bumped again when
+        it commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_versions("skill:1")
+            version = get_versions(["skill:1"])
+
+        self.assertNotEqual(get_versions(["skill:1"]), version)
+
+    def test_file_based_cache(self):
+        """Test that the response cache works with the file-based backend."""
+        with tempfile.TemporaryDirectory() as directory:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            with self.settings(
+                CACHES={"default": {"BACKEND": backend, "LOCATION": directory}}
+            ):
+                first, rendered = self.get(self.detail)
+                second, cached = self.get(self.detail)
+                self.skill.description = "Risotto"
+                self.skill.save()
+                third, _ = self.get(self.detail)
+
+        self.assertEqual(second.content, first.content)
+        self.assertLess(cached, rendered)
+        self.assertContains(third, "Risotto")
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class FragmentCacheTests(TestCase):
+    """Tests for the cached template fragments of skill cards and reviews."""
+
+    def setUp(self):
+        """Create a reviewed skill of another user and log in as the viewer."""
+        cache.clear()
+        User = get_user_model()
+        self.viewer = User.objects.create_user(username="viewer", password="pass")
+        self.owner = User.objects.create_user(username="owner", password="pass")
+        self.category = Category.objects.create(name="Cooking")
+        self.skill = Skill.objects.create(
+            name="Italian Cooking",
+            level="Expert",
+            description="Pasta",
+            owner=self.owner,
+            category=self.category,
+            skill_type="offered",
+        )
+        self.client.force_login(self.viewer)
+
+    def review(self, rating, text):
+        """Review the skill as the viewer through a completed deal."""
+        deal = SkillDeal.objects.create(
+            skill=self.skill,
+            owner=self.viewer,
+            provider=self.owner,
+            status=SkillDeal.COMPLETED,
+        )
+        Review.objects.create(
+            skill=self.skill, owner=self.viewer, deal=deal, review=text, rating=rating
+        )
+
+    def test_rating_updates_marker(self):
+        """Test that a new rating moves the skill's updated marker."""
+        updated_at = self.skill.updated_at
+
+        self.review(1, "Burnt")
+
+        self.skill.refresh_from_db()
+        self.assertGreater(self.skill.updated_at, updated_at)
+
+    def test_skill_card_refreshed(self):
+        """Test that a cached skill card is re-rendered when the rating of
+        the skill changes."""
+        listing = reverse("skill_by_category", args=["Cooking"])
+        self.assertContains(self.client.get(listing), "5.0/5")
+
+        self.review(1, "Burnt")
+
+        response = self.client.get(listing)
+        self.skill.refresh_from_db()
+        self.assertContains(response, f"{self.skill.rating:.1f}/5")
+        self.assertNotContains(response, "5.0/5")
+
+    def test_owner_card_cached_separately(self):
+        """Test that the owner's card, without the owner line, does not
+        share its cached fragment with the other users' card."""
+        self.client.get(reverse("skill_by_category", args=["Cooking"]))
+        self.client.force_login(self.owner)
+
+        response = self.client.get(reverse("skills", args=["offered"]))
+
+        self.assertContains(response, "Italian Cooking")
+        self.assertNotContains(response, "<strong>Owner:</strong>")
+
+    def test_reviews_refreshed(self):
+        """Test that the cached review list shows a new review."""
+        detail = reverse("skill_detail", args=[self.skill.pk])
+        self.assertContains(self.client.get(detail), "No reviews yet.")
+
+        self.review(4, "Tasty")
+
+        self.assertContains(self.client.get(detail), "Tasty")
+
+    def test_edited_review_refreshed(self):
+        """Test that the cached review list shows an edited comment with the
+        same rating, and the new name of a renamed reviewer."""
+        self.review(4, "Tasty")
+        detail = reverse("skill_detail", args=[self.skill.pk])
+        self.assertContains(self.client.get(detail), "Tasty")
+
+        review = Review.objects.get()
+        review.review = "Delicious"
+        review.save()
+        response = self.client.get(detail)
+        self.assertContains(response, "Delicious")
+        self.assertNotContains(response, "Tasty")
+
+        self.viewer.username = "gourmet"
+        self.viewer.save()
+        self.client.force_login(self.owner)
+        self.assertContains(self.client.get(detail), "gourmet")
+
+    def test_bench_measure(self):
+        """Test that the template benchmark reports render and response times."""
+        url = reverse("skill_detail", args=[self.skill.pk])
+
+        result = BenchTemplatesCommand().measure(
+            self.client, url, "skills/skill_detail.html", 3
+        )
+
+        self.assertGreater(result["render_p50_ms"], 0)
+        self.assertGreaterEqual(result["response_p50_ms"], result["render_p50_ms"])
+
+
+class StaticPipelineTests(SimpleTestCase):
+    """A class to test the hashed, precompressed static files pipeline."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Collect the static files into a temporary STATIC_ROOT."""
+        super().setUpClass()
+        root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(root.cleanup)
+        cls.root = Path(root.name)
+        overrides = override_settings(
+            DEBUG=False,
+            STATIC_ROOT=cls.root,
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {
+                    "BACKEND": "django_project.staticfiles."
+                    "CompressedManifestStaticFilesStorage"
+                },
+            },
+        )
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+
+        # The vendored stylesheets reference fonts that are not shipped
+        logger = logging.getLogger("django_project.staticfiles")
+        logger.disabled = True
+        try:
+            call_command("collectstatic", interactive=False, verbosity=0)
+        finally:
+            logger.disabled = False
+        cls.manifest = json.loads((cls.root / "staticfiles.json").read_text())["paths"]
+
+    def setUp(self):
+        """Create a middleware serving the collected files."""
+        self.middleware = StaticFilesMiddleware(lambda request: HttpResponse("app"))
+        self.factory = RequestFactory()
+
+    def get(self, name, **headers):
+        """Return the middleware's response for a static file."""
+        request = self.factory.get(self.middleware.prefix + name, headers=headers)
+        return self.middleware(request)
+
+    def test_hashed_and_compressed(self):
+        """Test that stylesheets get a hashed name and a smaller gzip variant,
+        while images are not compressed."""
+        css = self.manifest["css/main.css"]
+        self.assertRegex(css, r"^css/main\.[0-9a-f]{12}\.css$")
+        gz = self.root / f"{css}.gz"
+        self.assertLess(gz.stat().st_size, (self.root / css).stat().st_size)
+        png = self.manifest["img/skills.png"]
+        self.assertFalse((self.root / f"{png}.gz").exists())
+
+    def test_missing_reference_kept(self):
+        """Test that a reference to a file that is not shipped is kept."""
+        css = (self.root / self.manifest["css/all.min.css"]).read_text()
+        self.assertIn("../webfonts/fa-brands-400.eot", css)
+
+    def test_serves_gzip_immutable(self):
+        """Test that a hashed file is served gzipped with immutable caching."""
+        name = self.manifest["css/main.css"]
+
+        response = self.get(name, accept_encoding="gzip, deflate")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertNotIn("Content-Disposition", response)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = b"".join(response.streaming_content)
+        self.assertEqual(body, (self.root / f"{name}.gz").read_bytes())
+
+    def test_serves_identity(self):
+        """Test that a client not accepting gzip gets the original file, and
+        that unhashed names are only cached briefly."""
+        response = self.get("css/main.css", accept_encoding="gzip;q=0")
+
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertNotIn("Content-Disposition", response)
+        self.assertNotEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        body = b"".join(response.streaming_content)
+        self.assertEqual(body, (self.root / "css/main.css").read_bytes())
+
+    def test_not_modified(self):
+        """Test that a conditional request for an unchanged file gets a 304."""
+        name = self.manifest["css/main.css"]
+        last_modified = self.get(name)["Last-Modified"]
+
+        response = self.get(name, if_modified_since=last_modified)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+
+    def test_falls_through(self):
+        """Test that unknown files and paths outside STATIC_ROOT are passed
+        on to the application."""
+        for name in ["css/missing.css", "../settings.py", "%2e%2e/settings.py"]:
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).content, b"app")
+
+    def test_accepted_encodings(self):
+        """Test that codings refused with q=0 are not accepted."""
+        self.assertEqual(
+            accepted_encodings("br;q=0, GZIP;q=0.5, identity"), {"gzip", "identity"}
+        )
@@ -0,0 +1,38 @@
+"""Views of the performance tooling."""
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views import View
+
+from perf.metrics import REGISTRY
+
+
+class MetricsView(View):
+    """A view exposing the metrics registry in the Prometheus text format.
+
+    Only staff users and clients sending settings.METRICS_TOKEN as a bearer
+    token can read the metrics. The client address is not checked, since
+    behind a reverse proxy every request comes from the proxy.
+    """
+
+    def has_permission(self, request) -> bool:
+        """Return whether the client may read the metrics."""
+        if request.user.is_staff:
+            return True
+        token = getattr(settings, "METRICS_TOKEN", None)
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        return bool(
+            token
+            and scheme.lower() == "bearer"
+            and constant_time_compare(credentials.strip(), token)
+        )
+
+    def get(self, request):
+        """Return the metrics of all processes."""
+        if not self.has_permission(request):
+            return HttpResponseForbidden()
+        return HttpResponse(
+            REGISTRY.exposition(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
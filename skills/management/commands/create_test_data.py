@@ -1,113 +1,67 @@
 """A script to create test data for the project."""
 
-from django.core.management.base import BaseCommand
-from django.contrib.auth import get_user_model
-from django.utils import timezone
-from accounts.models import UserProfile
-from skills.models import Category, Skill, Review, SkillDeal
-import random
-
+import time
 
-class Command(BaseCommand):
-    """A class to create test data for the project."""
+from django.core.management.base import BaseCommand
 
-    help = "Create test users with profiles, skills, reviews, and skill deals"
+from skills.seeding import DEFAULT_PASSWORD, DatasetSize, seed_dataset
 
-    def handle(self, *args, **kwargs):
-        """Create test data for the project."""
-        User = get_user_model()
 
-        # Create test users
-        users = []
-        for i in range(1, 6):
-            user = User.objects.create_user(
-                username=f"testuser{i}", password="password123", age=20 + i
-            )
-            users.append(user)
-            # Create user profiles
-            UserProfile.objects.create(
-                user=user,
-                location=f"City {i}",
-                bio=f"Test bio for test user {i}",
-                credits=i * 100,
-            )
+class Command(BaseCommand):
+    """A class to create test data for the project.
 
-        # Create categories
-        categories = []
-        for i in range(1, 6):
-            category = Category.objects.create(name=f"Category {i}")
-            categories.append(category)
+    The dataset size is set with the command line arguments and the same
+    arguments (including --seed) always produce the same data. Every user
+    is called user<n> and has the password DEFAULT_PASSWORD. Large datasets
+    can be written by several worker processes with --workers.
+    """
 
-        # Create skills for each user
-        skills = []
-        skill_names = [
-            "Python Programming",
-            "Web Development",
-            "Data Science",
-            "Italian Cooking",
-            "French Cooking",
-            "Guitar Playing",
-            "Graphic Design",
-            "Digital Marketing",
-            "Public Speaking",
-            "Project Management",
-            "Yoga Instruction",
-            "Fitness Training",
-            "Photography",
-            "Video Editing",
-            "Content Writing",
-        ]
+    help = "Create test users with profiles, skills, skill deals, messages and reviews"
 
-        for user in users:
-            offered_skills = random.sample(skill_names, 3)
-            wanted_skills = random.sample(skill_names, 3)
-            for skill_name in offered_skills:
-                skill = Skill.objects.create(
-                    name=skill_name,
-                    category=random.choice(categories),
-                    level="Intermediate",
-                    description=f"{skill_name} skills offered.",
-                    owner=user,
-                    skill_type="offered",
-                )
-                skills.append(skill)
-            for skill_name in wanted_skills:
-                skill = Skill.objects.create(
-                    name=skill_name,
-                    category=random.choice(categories),
-                    level="Intermediate",
-                    description=f"{skill_name} skills wanted.",
-                    owner=user,
-                    skill_type="wanted",
-                )
-                skills.append(skill)
+    def add_arguments(self, parser):
+        """Add the size, seed and performance arguments."""
+        defaults = DatasetSize()
+        parser.add_argument("--users", type=int, default=defaults.users)
+        parser.add_argument(
+            "--skills-per-user", type=int, default=defaults.skills_per_user
+        )
+        parser.add_argument("--deals", type=int, default=defaults.deals)
+        parser.add_argument("--messages", type=int, default=defaults.messages)
+        parser.add_argument("--reviews", type=int, default=defaults.reviews)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per INSERT."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes writing the data.",
+        )
 
-        # Create reviews
-        for i in range(15):
-            Review.objects.create(
-                skill=skills[i],
-                owner=users[(i + 1) % 5],  # The next user reviews the skill
-                review=f"Great {skills[i].name} skills!",
-                rating=4.0 + i % 2,  # Alternate ratings between 4.0 and 5.0
-            )
+    def handle(self, *args, **options):
+        """Create test data for the project."""
+        size = DatasetSize(
+            users=options["users"],
+            skills_per_user=options["skills_per_user"],
+            deals=options["deals"],
+            messages=options["messages"],
+            reviews=options["reviews"],
+        )
 
-        # Create skill deals
-        start_date = timezone.now()
-        for i in range(15):
-            end_date = start_date + timezone.timedelta(
-                hours=2 * (i + 1)
-            )  # Different durations
-            deal = SkillDeal.objects.create(
-                skill=skills[i],
-                owner=users[(i + 1) % 5],  # The next user requests the skill
-                provider=users[i % 5],  # The user owns the skill
-                status=SkillDeal.COMPLETED,
-                start_date=start_date,
-                end_date=end_date,
-            )
-            # Update credits for skill deals
-            deal.save()
+        start = time.perf_counter()
+        counts = seed_dataset(
+            size,
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+        )
+        elapsed = time.perf_counter() - start
 
+        summary = ", ".join(f"{count} {model}" for model, count in counts.items())
         self.stdout.write(
-            self.style.SUCCESS("Successfully created test data with 5 users")
+            self.style.SUCCESS(
+                f"Successfully created test data in {elapsed:.1f}s: {summary} "
+                f"(password: {DEFAULT_PASSWORD})"
+            )
         )
@@ -0,0 +1,55 @@
+"""A worker that drains the notification outbox."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from skills.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    """A class to fan out pending outbox events into notifications.
+
+    Runs as a long-lived local worker by default, sleeping between polls
+    once the outbox is empty. Use --once to drain everything and exit.
+    """
+
+    help = "Drain pending outbox events into user notifications"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the worker."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Maximum number of events to fan out per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the outbox until it is empty, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        """Drain the outbox in batches until stopped."""
+        batch_size = options["batch_size"]
+        total = 0
+
+        try:
+            while True:
+                processed = drain_outbox(batch_size=batch_size)
+                total += processed
+                if processed < batch_size:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} outbox events"))
@@ -0,0 +1,50 @@
+"""A script to rebuild the rating aggregates of every skill."""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from skills.models import Skill
+from skills.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    """A class to recompute skill rating aggregates from the reviews.
+
+    Useful after changing SKILL_RATING_PRIOR, SKILL_RATING_PRIOR_WEIGHT or
+    SKILL_RANKING_Z, or to repair aggregates after reviews were deleted in bulk.
+    """
+
+    help = "Recompute the rating aggregates and ranking score of all skills"
+
+    def add_arguments(self, parser):
+        """Add the command line arguments for the command."""
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of skills to recompute per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        """Recompute the skills in primary key order, one batch at a time."""
+        batch_size = options["batch_size"]
+        fields = ["rating_sum", "rating_count", "rating", "score"]
+        last_pk = 0
+        total = 0
+
+        while True:
+            skills = list(
+                Skill.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .only("pk", *fields)[:batch_size]
+            )
+            if not skills:
+                break
+
+            with transaction.atomic():
+                Skill.objects.bulk_update(recompute_ratings(skills), fields)
+
+            last_pk = skills[-1].pk
+            total += len(skills)
+
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings for {total} skills"))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:53
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+# The smoothing prior as of this migration, frozen so that it always fills
+# the same values whatever the later settings or skills.ratings code
+RATING_PRIOR = 5.0
+RATING_PRIOR_WEIGHT = 2
+
+
+def smoothed_rating(rating_sum, rating_count):
+    """Return the smoothed rating of a skill, as of this migration."""
+    return (rating_sum + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (
+        rating_count + RATING_PRIOR_WEIGHT
+    )
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Fill the rating aggregates of existing skills from their reviews."""
+    Skill = apps.get_model("skills", "Skill")
+    Review = apps.get_model("skills", "Review")
+
+    totals = Review.objects.values("skill").annotate(
+        rating_sum=Sum("rating"), rating_count=Count("id")
+    )
+    for row in totals:
+        Skill.objects.filter(pk=row["skill"]).update(
+            rating_sum=row["rating_sum"],
+            rating_count=row["rating_count"],
+            rating=smoothed_rating(row["rating_sum"], row["rating_count"]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skills", "0006_outboxevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="skill",
+            name="rating_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="skill",
+            name="rating_sum",
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:55
+
+import math
+
+from django.db import migrations, models
+
+# The score parameters as of this migration, frozen so that it always fills
+# the same values whatever the later settings or skills.ratings code
+RANKING_Z = 1.96
+MIN_RATING = 1.0
+MAX_RATING = 5.0
+
+
+def wilson_score(rating_sum, rating_count):
+    """Return the ranking score of a reviewed skill, as of this migration."""
+    n = rating_count
+    share = (rating_sum - n * MIN_RATING) / ((MAX_RATING - MIN_RATING) * n)
+    z2 = RANKING_Z * RANKING_Z
+    centre = share + z2 / (2 * n)
+    margin = RANKING_Z * math.sqrt((share * (1 - share) + z2 / (4 * n)) / n)
+    return (centre - margin) / (1 + z2 / n)
+
+
+def backfill_scores(apps, schema_editor):
+    """Compute the ranking score of existing reviewed skills."""
+    Skill = apps.get_model("skills", "Skill")
+    for skill in Skill.objects.filter(rating_count__gt=0).only(
+        "rating_sum", "rating_count"
+    ):
+        Skill.objects.filter(pk=skill.pk).update(
+            score=wilson_score(skill.rating_sum, skill.rating_count)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skills", "0007_skill_rating_aggregates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="skill",
+            name="score",
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
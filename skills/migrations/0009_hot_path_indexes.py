@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skills", "0008_skill_score"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["receiver", "-timestamp"],
+                name="message_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["receiver", "-timestamp"], name="message_inbox_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="skill",
+            index=models.Index(
+                fields=["owner", "skill_type"], name="skill_owner_type_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="skill",
+            index=models.Index(
+                fields=["skill_type", "name"], name="skill_type_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="skilldeal",
+            index=models.Index(
+                fields=["provider", "status"], name="deal_provider_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="skilldeal",
+            index=models.Index(
+                fields=["owner", "status"], name="deal_owner_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="skilldeal",
+            index=models.Index(
+                fields=["skill", "owner", "status"], name="deal_skill_owner_status_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("skills", "0009_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="skill",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,9 +1,17 @@
+import logging
+
 from django.db import models
 from django.conf import settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import F
+
+from perf.metrics import DEAL_TRANSITIONS
+from skills.ratings import smoothed_rating, wilson_score
+
+logger = logging.getLogger(__name__)
 
 
 # Create your models here.
@@ -21,6 +29,20 @@ class Category(models.Model):
         return self.name
 
 
+class SkillQuerySet(models.QuerySet):
+    """A class to filter skills for the dashboard."""
+
+    def suggested_for(self, user):
+        """Return the skills offered by other users under the names of the
+        skills the user wants."""
+        wanted_names = list(
+            self.filter(owner=user, skill_type="wanted").values_list("name", flat=True)
+        )
+        return self.filter(name__in=wanted_names, skill_type="offered").exclude(
+            owner=user
+        )
+
+
 class Skill(models.Model):
     """A model to represent user's skills.
 
@@ -32,7 +54,12 @@ class Skill(models.Model):
         category: A CharField to represent the category of the skill for the user.
         date: A DateTimeField to represent the date the skill was created.
         skill_type: A CharField to represent the type of the skill (offered or wanted).
-        rating: A float to represent the rating of the skill.
+        rating: A float to represent the smoothed rating of the skill.
+        rating_sum: A float to represent the sum of all review ratings.
+        rating_count: An integer to represent the number of reviews.
+        score: A float to represent the precomputed ranking score of the skill.
+        updated_at: A DateTimeField to represent when the skill or its rating
+            last changed, used to key its cached template fragments.
     """
 
     name = models.CharField(max_length=100, blank=False)
@@ -43,12 +70,68 @@ class Skill(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     skill_type = models.CharField(max_length=20, blank=False)
     rating = models.FloatField(default=5.0)
-
-    def update_rating(self, current_rating: float) -> None:
-        """Update the rating of the skill based on average of all reviews."""
-        new_rating = (self.rating * 0.85) + (current_rating * 0.15)
-        self.rating = round(new_rating, 2)
-        self.save()
+    rating_sum = models.FloatField(default=0.0)
+    rating_count = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0.0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SkillQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The user's own offered/wanted skills
+            models.Index(fields=["owner", "skill_type"], name="skill_owner_type_idx"),
+            # Dashboard suggestions: offered skills matching wanted names
+            models.Index(fields=["skill_type", "name"], name="skill_type_name_idx"),
+        ]
+
+    @property
+    def average_rating(self):
+        """Return the true average of the review ratings, or None if
+        the skill has not been reviewed yet."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    def add_rating(self, rating: float) -> None:
+        """Add a review rating to the skill's rating aggregates.
+
+        Runs as a single UPDATE built from F() expressions, so concurrent
+        reviews cannot overwrite each other. The smoothed rating, the
+        ranking score and the updated marker are refreshed in the same
+        statement. The in-memory instance is not refreshed.
+        """
+        self.change_rating(rating, 1)
+
+    def remove_rating(self, rating: float) -> None:
+        """Remove the rating of a deleted review from the skill's rating
+        aggregates, like add_rating."""
+        self.change_rating(-rating, -1)
+
+    def change_rating(self, sum_delta: float, count_delta: int) -> None:
+        """Apply a change of the review ratings to the rating aggregates in
+        one UPDATE (see add_rating).
+
+        Args:
+            sum_delta: The change of the sum of the ratings.
+            count_delta: The change of the number of reviews.
+        """
+        rating_sum = F("rating_sum") + sum_delta
+        rating_count = F("rating_count") + count_delta
+        score = wilson_score(rating_sum, rating_count)
+        if count_delta < 0:
+            # The score of a skill left without reviews, never a division by 0
+            score = models.Case(
+                models.When(rating_count__lte=-count_delta, then=models.Value(0.0)),
+                default=score,
+            )
+        Skill.objects.filter(pk=self.pk).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=smoothed_rating(rating_sum, rating_count),
+            score=score,
+            updated_at=timezone.now(),
+        )
 
     def get_absolute_url(self):
         """Return the absolute URL of the skill."""
@@ -69,6 +152,23 @@ class Skill(models.Model):
         return self.name
 
 
+class SkillDealQuerySet(models.QuerySet):
+    """A class to filter skill deals by the users taking part in them."""
+
+    def involving(self, user):
+        """Return the deals the user requested or provides."""
+        return self.filter(models.Q(owner=user) | models.Q(provider=user))
+
+    def status_counts(self) -> dict:
+        """Return the number of deals of each status, in one query."""
+        return self.aggregate(
+            **{
+                status: models.Count("pk", filter=models.Q(status=status))
+                for status, _ in SkillDeal.STATUS_CHOICES
+            }
+        )
+
+
 class SkillDeal(models.Model):
     """A model to represent a skill deal.
 
@@ -109,36 +209,55 @@ class SkillDeal(models.Model):
     start_date = models.DateTimeField(null=True, blank=True)
     end_date = models.DateTimeField(null=True, blank=True)
 
+    objects = SkillDealQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Provided deals and the dashboard deal counters
+            models.Index(
+                fields=["provider", "status"], name="deal_provider_status_idx"
+            ),
+            # Requested deals
+            models.Index(fields=["owner", "status"], name="deal_owner_status_idx"),
+            # Skill.deal_exists_for_user
+            models.Index(
+                fields=["skill", "owner", "status"], name="deal_skill_owner_status_idx"
+            ),
+        ]
+
     def mark_complete(self) -> None:
         """Mark the skill deal as completed and set the end date."""
         self.status = self.COMPLETED
         self.end_date = timezone.now()
         self.save()
+        DEAL_TRANSITIONS.inc(status=self.COMPLETED)
 
     def accept_deal(self) -> None:
         """Accept the skill deal, set the start date, and set the status to active."""
         self.status = self.ACTIVE
         self.start_date = timezone.now()
         self.save()
+        DEAL_TRANSITIONS.inc(status=self.ACTIVE)
 
     def cancel_deal(self) -> None:
         """Cancel the skill deal and set the status to cancelled."""
         self.status = self.CANCELLED
         self.save()
+        DEAL_TRANSITIONS.inc(status=self.CANCELLED)
 
     def is_owner(self, user):
         """Check if the user is the owner of the skill deal."""
-        print("The code is checking if the logged in user owns the deal.")
+        logger.debug("Checking if user %s owns deal %s", user.pk, self.pk)
         return self.owner == user
 
     def is_provider(self, user):
         """Check if the user is the provider of the skill deal."""
-        print("The code is checking if the logged in user is the provider of the deal.")
+        logger.debug("Checking if user %s provides deal %s", user.pk, self.pk)
         return self.provider == user
 
     def is_completed(self):
         """Check if the skill deal is completed."""
-        print("The code is checking if the deal is completed.")
+        logger.debug("Checking if deal %s is completed", self.pk)
         return self.status == self.COMPLETED
 
     def send_message_on_request(self):
@@ -164,6 +283,14 @@ class SkillDeal(models.Model):
         return f"{self.skill} - Request by {self.owner} - Provided by {self.provider}"
 
 
+class MessageQuerySet(models.QuerySet):
+    """A class to filter messages by the users allowed to read them."""
+
+    def received_by(self, user):
+        """Return the messages in the user's inbox."""
+        return self.filter(receiver=user)
+
+
 class Message(models.Model):
     """A model to represent a message notification regarding a swap deal.
 
@@ -192,6 +319,21 @@ class Message(models.Model):
         "self", null=True, blank=True, on_delete=models.CASCADE
     )
 
+    objects = MessageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Unread messages, newest first. Partial, as is_read=False
+            # is rendered as NOT is_read and cannot be used as an equality
+            models.Index(
+                fields=["receiver", "-timestamp"],
+                condition=models.Q(is_read=False),
+                name="message_unread_idx",
+            ),
+            # The user's inbox, newest first
+            models.Index(fields=["receiver", "-timestamp"], name="message_inbox_idx"),
+        ]
+
     def __str__(self):
         """Return a string representation of the message."""
         return f"Message from {self.sender.username} to {self.receiver.username}"
@@ -217,9 +359,33 @@ class Review(models.Model):
     deal = models.OneToOneField(SkillDeal, on_delete=models.CASCADE)
 
     def save(self, *args, **kwargs):
-        """Save the rating of the skill which updates the rating for the skill"""
-        super().save(*args, **kwargs)
-        self.skill.update_rating(self.rating)
+        """Save the review and apply its rating to the skill's rating
+        aggregates in the same transaction: added for a new review, and the
+        difference for a changed rating. The deleted reviews are removed by
+        skills.signals."""
+        update_fields = kwargs.get("update_fields")
+        rated = update_fields is None or {"rating", "skill", "skill_id"} & set(
+            update_fields
+        )
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding and rated:
+                # Locked, so concurrent edits apply their differences in turn
+                previous = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("skill_id", "rating")
+                    .first()
+                )
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            if adding:
+                self.skill.add_rating(self.rating)
+            elif previous and previous["skill_id"] != self.skill_id:
+                Skill(pk=previous["skill_id"]).remove_rating(previous["rating"])
+                self.skill.add_rating(self.rating)
+            elif previous and previous["rating"] != self.rating:
+                self.skill.change_rating(self.rating - previous["rating"], 0)
 
     def __str__(self):
         """Return a string representation of the rating."""
@@ -245,3 +411,46 @@ class Notification(models.Model):
     def __str__(self):
         """Return a string representation of the notification."""
         return self.message
+
+
+class OutboxEvent(models.Model):
+    """A model to represent a domain event waiting to be fanned out as
+    notifications. Events are written in the same transaction as the change
+    that caused them and drained in batches by the process_outbox command.
+
+    Attributes:
+        event_type: A CharField to represent the kind of event that happened.
+        recipient: A ForeignKey to represent the user who should be notified.
+        payload: A JSONField holding the data needed to render the notification.
+        created_at: A DateTimeField to represent the date the event was recorded.
+        processed_at: A DateTimeField set once the event has been fanned out.
+    """
+
+    DEAL_REQUESTED = "deal_requested"
+    DEAL_ACCEPTED = "deal_accepted"
+    DEAL_COMPLETED = "deal_completed"
+    MESSAGE_RECEIVED = "message_received"
+
+    EVENT_CHOICES = [
+        (DEAL_REQUESTED, "Deal requested"),
+        (DEAL_ACCEPTED, "Deal accepted"),
+        (DEAL_COMPLETED, "Deal completed"),
+        (MESSAGE_RECEIVED, "Message received"),
+    ]
+
+    event_type = models.CharField(max_length=30, choices=EVENT_CHOICES)
+    recipient = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="outbox_events"
+    )
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["processed_at", "id"], name="outbox_pending_idx"),
+        ]
+
+    def __str__(self):
+        """Return a string representation of the outbox event."""
+        return f"{self.event_type} for {self.recipient_id}"
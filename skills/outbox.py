@@ -0,0 +1,186 @@
+"""This module contains the transactional outbox for user notifications.
+
+Views record domain events (deal requested, accepted, completed and message
+received) with record_event() inside the transaction that makes the change.
+The process_outbox command drains the pending events in batches and writes
+the matching Notification rows with a single bulk_create per batch, so the
+notification fan-out never runs on the request path.
+
+Event types listed in settings.NOTIFICATION_DIGESTS are held back for their
+configured window. Once the oldest pending event of a user's group is older
+than the window, the whole group is flushed: groups of at least `threshold`
+events become one summary notification, smaller groups are sent one by one."""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from skills.models import Notification, OutboxEvent
+
+NOTIFICATION_TEMPLATES = {
+    OutboxEvent.DEAL_REQUESTED: "{actor} has requested a deal for {skill}",
+    OutboxEvent.DEAL_ACCEPTED: "{actor} has accepted your deal for {skill}",
+    OutboxEvent.DEAL_COMPLETED: "Your deal with {actor} for {skill} has been completed",
+    OutboxEvent.MESSAGE_RECEIVED: "{actor} sent you a message about {skill}",
+}
+
+DIGEST_TEMPLATES = {
+    OutboxEvent.DEAL_REQUESTED: "You have {count} new deal requests",
+    OutboxEvent.DEAL_ACCEPTED: "{count} of your deal requests have been accepted",
+    OutboxEvent.DEAL_COMPLETED: "{count} of your deals have been completed",
+    OutboxEvent.MESSAGE_RECEIVED: "You have {count} new messages",
+}
+
+
+def record_event(event_type, recipient, skill_deal, actor) -> OutboxEvent:
+    """Record a domain event in the outbox.
+
+    Must be called inside the transaction that performs the change so the
+    event is only visible once the change itself is committed.
+
+    Args:
+        event_type: One of the OutboxEvent event type constants.
+        recipient: The user who should be notified.
+        skill_deal: The skill deal the event is about.
+        actor: The user who caused the event.
+
+    Returns:
+        The OutboxEvent that was recorded.
+    """
+    return OutboxEvent.objects.create(
+        event_type=event_type,
+        recipient=recipient,
+        payload={
+            "actor": actor.username,
+            "skill": skill_deal.skill.name,
+            "deal_id": skill_deal.pk,
+        },
+    )
+
+
+def render_notification(event: OutboxEvent) -> str:
+    """Render the notification text for an outbox event.
+
+    Args:
+        event: The outbox event to render.
+
+    Returns:
+        The notification message, trimmed to fit Notification.message.
+    """
+    message = NOTIFICATION_TEMPLATES[event.event_type].format(**event.payload)
+    return message[: Notification._meta.get_field("message").max_length]
+
+
+def render_digest(event_type: str, count: int) -> str:
+    """Render the summary notification text for a group of coalesced events.
+
+    Args:
+        event_type: The event type shared by the group.
+        count: The number of events in the group.
+
+    Returns:
+        The summary notification message.
+    """
+    return DIGEST_TEMPLATES[event_type].format(count=count)
+
+
+def get_digest_settings() -> dict:
+    """Return the per event type digest settings.
+
+    Returns:
+        A dictionary mapping event types to their `window` (seconds) and
+        `threshold` (minimum number of events to coalesce).
+    """
+    return getattr(settings, "NOTIFICATION_DIGESTS", {})
+
+
+def _due_events_filter(digests: dict, now) -> Q:
+    """Build the filter for events that are ready to be fanned out.
+
+    Events of non-digest types are always due, digest events only once
+    their window has elapsed.
+    """
+    due = ~Q(event_type__in=list(digests))
+    for event_type, digest in digests.items():
+        window_start = now - timedelta(seconds=digest["window"])
+        due |= Q(event_type=event_type, created_at__lte=window_start)
+    return due
+
+
+def _build_notifications(events: list, digests: dict) -> list:
+    """Turn a list of events into notifications, coalescing digest groups
+    that reach their threshold into a single summary notification."""
+    groups = {}
+    for event in events:
+        groups.setdefault((event.recipient_id, event.event_type), []).append(event)
+
+    notifications = []
+    for (recipient_id, event_type), group in groups.items():
+        digest = digests.get(event_type)
+        if digest and len(group) >= digest["threshold"]:
+            notifications.append(
+                Notification(
+                    user_id=recipient_id, message=render_digest(event_type, len(group))
+                )
+            )
+        else:
+            notifications.extend(
+                Notification(user_id=recipient_id, message=render_notification(event))
+                for event in group
+            )
+    return notifications
+
+
+def drain_outbox(batch_size: int = 500) -> int:
+    """Fan out one batch of due outbox events into notifications.
+
+    When a digest event is due, every pending event of the same user and
+    type is flushed with it so the group is coalesced into one summary.
+    The notifications are created and the events marked as processed in the
+    same transaction, so a batch is either fully delivered or retried.
+
+    Args:
+        batch_size: The maximum number of due events to pick up.
+
+    Returns:
+        The number of events processed.
+    """
+    digests = get_digest_settings()
+    now = timezone.now()
+
+    with transaction.atomic():
+        pending = OutboxEvent.objects.filter(processed_at__isnull=True)
+        events = list(
+            pending.filter(_due_events_filter(digests, now)).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        # Pull in the rest of each due digest group, including events that
+        # arrived after the group's window opened
+        groups = {
+            (event.recipient_id, event.event_type)
+            for event in events
+            if event.event_type in digests
+        }
+        if groups:
+            seen = {event.pk for event in events}
+            events += [
+                event
+                for event in pending.filter(
+                    recipient_id__in={recipient_id for recipient_id, _ in groups},
+                    event_type__in={event_type for _, event_type in groups},
+                ).order_by("id")
+                if event.pk not in seen
+                and (event.recipient_id, event.event_type) in groups
+            ]
+
+        Notification.objects.bulk_create(_build_notifications(events, digests))
+        OutboxEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+            processed_at=now
+        )
+
+    return len(events)
@@ -0,0 +1,111 @@
+"""This module contains the rating aggregates kept on each skill.
+
+Every skill stores the running sum and count of its review ratings. The
+true average, the smoothed rating shown to users and the ranking score used
+to order skill lists are all derived from those two columns, so adding a
+review is a single atomic UPDATE instead of a read-modify-write of the
+skill row."""
+
+import math
+
+from django.conf import settings
+from django.db.models import Count, Sum
+from django.db.models.functions import Sqrt
+
+# Review ratings go from MIN_RATING to MAX_RATING stars
+MIN_RATING = 1.0
+MAX_RATING = 5.0
+
+
+def get_rating_prior() -> tuple[float, float]:
+    """Return the prior used to smooth skill ratings.
+
+    Returns:
+        A tuple of the prior mean rating and the number of reviews the
+        prior is worth.
+    """
+    return (
+        getattr(settings, "SKILL_RATING_PRIOR", 5.0),
+        getattr(settings, "SKILL_RATING_PRIOR_WEIGHT", 2),
+    )
+
+
+def smoothed_rating(rating_sum, rating_count):
+    """Return the smoothed (Bayesian average) rating of a skill.
+
+    The prior mean counts as SKILL_RATING_PRIOR_WEIGHT extra reviews, so a
+    skill with no reviews gets the prior and a skill with a single review
+    is only pulled part of the way towards it. Works with plain numbers as
+    well as F() expressions, so it can be used inside an UPDATE.
+
+    Args:
+        rating_sum: The sum of all review ratings.
+        rating_count: The number of reviews.
+
+    Returns:
+        The smoothed rating, or an expression computing it.
+    """
+    prior, weight = get_rating_prior()
+    return (rating_sum + prior * weight) / (rating_count + weight)
+
+
+def wilson_score(rating_sum, rating_count):
+    """Return the ranking score of a skill.
+
+    The score is the lower bound of the Wilson confidence interval for the
+    share of stars a skill earns, with the confidence set by
+    SKILL_RANKING_Z. A single 5-star review ranks below a long run of
+    4-star reviews because the bound only tightens as reviews accumulate.
+    Works with plain numbers as well as F() expressions, so it can be used
+    inside an UPDATE; expressions must not have a zero count.
+
+    Args:
+        rating_sum: The sum of all review ratings.
+        rating_count: The number of reviews.
+
+    Returns:
+        The score between 0 and 1, or an expression computing it.
+    """
+    z = getattr(settings, "SKILL_RANKING_Z", 1.96)
+    n = rating_count
+    if isinstance(n, (int, float)):
+        if not n:
+            return 0.0
+        sqrt = math.sqrt
+    else:
+        sqrt = Sqrt
+
+    # Share of the possible stars above the minimum that the skill received
+    share = (rating_sum - n * MIN_RATING) / ((MAX_RATING - MIN_RATING) * n)
+    z2 = z * z
+    centre = share + z2 / (2 * n)
+    margin = z * sqrt((share * (1 - share) + z2 / (4 * n)) / n)
+    return (centre - margin) / (1 + z2 / n)
+
+
+def recompute_ratings(skills) -> list:
+    """Recompute the rating aggregates of the given skills from their reviews.
+
+    Args:
+        skills: A list of Skill objects to recompute.
+
+    Returns:
+        The list of skills with their rating fields updated in memory.
+    """
+    from skills.models import Review
+
+    totals = {
+        row["skill"]: row
+        for row in Review.objects.filter(skill__in=skills)
+        .values("skill")
+        .annotate(rating_sum=Sum("rating"), rating_count=Count("id"))
+    }
+
+    for skill in skills:
+        row = totals.get(skill.pk, {"rating_sum": 0.0, "rating_count": 0})
+        skill.rating_sum = row["rating_sum"]
+        skill.rating_count = row["rating_count"]
+        skill.rating = smoothed_rating(skill.rating_sum, skill.rating_count)
+        skill.score = wilson_score(skill.rating_sum, skill.rating_count)
+
+    return skills
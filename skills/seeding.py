@@ -0,0 +1,294 @@
+"""This module contains the deterministic dataset seeding used by tests,
+benchmarks and the create_test_data command.
+
+Rows are written with bulk_create in batches and users share one
+precomputed password hash. The dataset is built in fixed-size chunks (users
+with their profiles and skills first, then deals with their messages and
+reviews), each drawing from its own seeded random generator, so the same
+parameters always produce the same rows. Chunks can be spread over several
+worker processes; rows are then the same but their primary keys may be
+assigned in a different order, so rows are always picked by natural keys
+(usernames, skill descriptions, deal numbers), never by primary key order."""
+
+import multiprocessing
+import random
+from dataclasses import dataclass
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from skills.models import Category, Message, Review, Skill, SkillDeal
+from skills.ratings import smoothed_rating, wilson_score
+
+# Rows per unit of work; fixed so the dataset does not depend on the workers
+USER_CHUNK_SIZE = 2000
+DEAL_CHUNK_SIZE = 5000
+
+# Bump whenever the same parameters start seeding different rows, so the
+# dataset snapshots of perf.snapshots built before are detected as stale
+SEEDING_VERSION = 2
+
+DEFAULT_PASSWORD = "password123"
+USERNAME_PREFIX = "user"
+
+CATEGORY_NAMES = [f"Category {i}" for i in range(1, 9)]
+
+SKILL_NAMES = [
+    "Python Programming",
+    "Web Development",
+    "Data Science",
+    "Italian Cooking",
+    "French Cooking",
+    "Guitar Playing",
+    "Graphic Design",
+    "Digital Marketing",
+    "Public Speaking",
+    "Project Management",
+    "Yoga Instruction",
+    "Fitness Training",
+    "Photography",
+    "Video Editing",
+    "Content Writing",
+]
+
+
+@dataclass
+class DatasetSize:
+    """The size parameters of a seeded dataset.
+
+    Attributes:
+        users: The number of users (each gets a profile).
+        skills_per_user: The number of skills per user, alternating offered
+            and wanted.
+        deals: The number of skill deals.
+        messages: The number of messages, spread over the deals.
+        reviews: The number of reviews, one per completed deal at most.
+    """
+
+    users: int = 5
+    skills_per_user: int = 6
+    deals: int = 15
+    messages: int = 30
+    reviews: int = 10
+
+
+def seed_dataset(
+    size: DatasetSize, seed: int = 0, batch_size: int = 1000, workers: int = 1
+) -> dict:
+    """Seed the database with a deterministic dataset.
+
+    Args:
+        size: The size parameters of the dataset.
+        seed: The seed of the random generators.
+        batch_size: The number of rows per INSERT.
+        workers: The number of worker processes writing chunks in parallel.
+            Only use more than one with a file-based database.
+
+    Returns:
+        A dictionary with the number of rows created per model.
+    """
+    Category.objects.bulk_create(
+        [Category(name=name) for name in CATEGORY_NAMES], ignore_conflicts=True
+    )
+    password = make_password(DEFAULT_PASSWORD)
+
+    user_chunks = [
+        (
+            start,
+            min(start + USER_CHUNK_SIZE, size.users),
+            size,
+            seed,
+            password,
+            batch_size,
+        )
+        for start in range(0, size.users, USER_CHUNK_SIZE)
+    ]
+    deal_chunks = [
+        (start, min(start + DEAL_CHUNK_SIZE, size.deals), size, seed, batch_size)
+        for start in range(0, size.deals, DEAL_CHUNK_SIZE)
+    ]
+
+    if workers > 1:
+        # Workers open their own connections; never share the parent's
+        connections.close_all()
+        with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+            results = pool.starmap(_seed_users, user_chunks)
+            results += pool.starmap(_seed_deals, deal_chunks)
+    else:
+        results = [_seed_users(*chunk) for chunk in user_chunks]
+        results += [_seed_deals(*chunk) for chunk in deal_chunks]
+
+    _update_rating_aggregates()
+
+    totals = dict.fromkeys(["users", "skills", "deals", "messages", "reviews"], 0)
+    for result in results:
+        for model, count in result.items():
+            totals[model] += count
+    return totals
+
+
+def _init_worker() -> None:
+    """Set up Django in a seeding worker and let it wait for the write lock
+    held by the other workers."""
+    django.setup()
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout = 60000")
+
+
+def _seed_users(start, stop, size, seed, password, batch_size) -> dict:
+    """Create the users start to stop - 1 with their profiles and skills."""
+    rng = random.Random(f"{seed}:users:{start}")
+    User = get_user_model()
+    categories = list(Category.objects.filter(name__in=CATEGORY_NAMES).order_by("name"))
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"{USERNAME_PREFIX}{i}", password=password, age=18 + i % 60
+                )
+                for i in range(start, stop)
+            ],
+            batch_size=batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            [
+                UserProfile(
+                    user=user,
+                    location=f"City {i % 50}",
+                    bio=f"Bio of {user.username}",
+                    credits=100 * (i % 10),
+                )
+                for i, user in enumerate(users, start)
+            ],
+            batch_size=batch_size,
+        )
+        skills = Skill.objects.bulk_create(
+            [
+                Skill(
+                    name=rng.choice(SKILL_NAMES),
+                    level=rng.choice(["Beginner", "Intermediate", "Expert"]),
+                    description=f"Skill {j} of {user.username}",
+                    owner=user,
+                    category=rng.choice(categories),
+                    skill_type="offered" if j % 2 == 0 else "wanted",
+                )
+                for user in users
+                for j in range(size.skills_per_user)
+            ],
+            batch_size=batch_size,
+        )
+    return {"users": len(users), "skills": len(skills)}
+
+
+def _seed_deals(start, stop, size, seed, batch_size) -> dict:
+    """Create the deals start to stop - 1 with their share of the messages
+    and reviews."""
+    rng = random.Random(f"{seed}:deals:{start}")
+    now = timezone.now()
+    prefix = USERNAME_PREFIX
+    users = list(
+        get_user_model()
+        .objects.filter(username__startswith=prefix)
+        .order_by("username")
+        .values_list("pk", flat=True)
+    )
+    offered = list(
+        Skill.objects.filter(skill_type="offered", owner__username__startswith=prefix)
+        .order_by("owner__username", "description")
+        .values_list("pk", "owner_id")
+    )
+    if not offered or len(users) < 2:
+        return {}
+
+    statuses = [status for status, _ in SkillDeal.STATUS_CHOICES]
+    deals = []
+    for _ in range(start, stop):
+        skill_id, provider_id = rng.choice(offered)
+        owner_id = rng.choice(users)
+        while owner_id == provider_id:
+            owner_id = rng.choice(users)
+        status = rng.choice(statuses)
+        started = status in (SkillDeal.ACTIVE, SkillDeal.COMPLETED)
+        deals.append(
+            SkillDeal(
+                skill_id=skill_id,
+                owner_id=owner_id,
+                provider_id=provider_id,
+                status=status,
+                start_date=now if started else None,
+                end_date=(
+                    now + timezone.timedelta(hours=rng.randint(1, 4))
+                    if status == SkillDeal.COMPLETED
+                    else None
+                ),
+            )
+        )
+
+    # This chunk's share of the messages and reviews
+    first_message = size.messages * start // size.deals
+    messages_count = size.messages * stop // size.deals - first_message
+    reviews_count = (
+        size.reviews * stop // size.deals - size.reviews * start // size.deals
+    )
+
+    with transaction.atomic():
+        deals = SkillDeal.objects.bulk_create(deals, batch_size=batch_size)
+
+        messages = []
+        for i in range(first_message, first_message + messages_count):
+            position = rng.randrange(len(deals))
+            deal = deals[position]
+            sender, receiver = deal.owner_id, deal.provider_id
+            if i % 2:
+                sender, receiver = receiver, sender
+            messages.append(
+                Message(
+                    sender_id=sender,
+                    receiver_id=receiver,
+                    skill_deal=deal,
+                    content=f"Message {i} about deal {start + position}",
+                    is_read=rng.random() < 0.7,
+                )
+            )
+        Message.objects.bulk_create(messages, batch_size=batch_size)
+
+        completed = [
+            (number, deal)
+            for number, deal in enumerate(deals, start)
+            if deal.status == SkillDeal.COMPLETED
+        ]
+        reviews = [
+            Review(
+                skill_id=deal.skill_id,
+                owner_id=deal.owner_id,
+                deal=deal,
+                review=f"Review of deal {number}",
+                rating=float(rng.randint(1, 5)),
+            )
+            for number, deal in completed[:reviews_count]
+        ]
+        # bulk_create skips Review.save(); the aggregates are built at the end
+        Review.objects.bulk_create(reviews, batch_size=batch_size)
+
+    return {"deals": len(deals), "messages": len(messages), "reviews": len(reviews)}
+
+
+def _update_rating_aggregates() -> None:
+    """Recompute the rating aggregates of every reviewed skill in SQL."""
+    reviews = Review.objects.filter(skill=OuterRef("pk")).values("skill")
+    reviewed = Skill.objects.filter(Exists(reviews))
+    reviewed.update(
+        rating_sum=Subquery(reviews.annotate(total=Sum("rating")).values("total")),
+        rating_count=Subquery(reviews.annotate(count=Count("pk")).values("count")),
+    )
+    reviewed.update(
+        rating=smoothed_rating(F("rating_sum"), F("rating_count")),
+        score=wilson_score(F("rating_sum"), F("rating_count")),
+    )
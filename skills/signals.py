@@ -1,9 +1,19 @@
 """This module contains the signals for the skill deal app.
-It updates the skill provider's credits once they have completed a skill deal"""
+It updates the skill provider's credits once they have completed a skill deal,
+removes the ratings of deleted reviews from the skill rating aggregates,
+counts new deals and messages in the metrics registry and invalidates the
+cached responses and layout data showing the skills, reviews, deals,
+messages, categories and profiles written"""
 
-from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from skills.models import SkillDeal
+from django.utils import timezone
+from accounts.context_processors import invalidate_layout
+from accounts.models import UserProfile
+from perf.cache import bump_versions
+from perf.metrics import DEAL_TRANSITIONS, MESSAGES_SENT
+from skills.models import Category, Message, Review, Skill, SkillDeal
 
 
 @receiver(post_save, sender=SkillDeal)
@@ -30,3 +40,132 @@ def update_provider_credits(sender, instance, **kwargs) -> None:
 
         instance.owner.profile.credits -= credits_to_add
         instance.owner.profile.save()
+
+
+@receiver(post_save, sender=SkillDeal)
+def count_new_deals(sender, instance, created, **kwargs) -> None:
+    """Count a newly requested skill deal (status changes are counted by
+    the SkillDeal transition methods)."""
+    if created:
+        DEAL_TRANSITIONS.inc(status=instance.status)
+
+
+@receiver(post_save, sender=Message)
+def count_sent_messages(sender, instance, created, **kwargs) -> None:
+    """Count every new message."""
+    if created:
+        MESSAGES_SENT.inc()
+
+
+def category_versions(*category_ids) -> list[str]:
+    """Return the listing versions of the given categories."""
+    names = Category.objects.filter(pk__in=category_ids).values_list("name", flat=True)
+    return [f"category:{name.lower()}" for name in names]
+
+
+@receiver(pre_save, sender=Skill)
+def remember_skill_category(sender, instance, **kwargs) -> None:
+    """Remember the category of an existing skill before it is saved, so
+    the listing of a category the skill is moved out of is invalidated."""
+    if not instance._state.adding:
+        instance._previous_category_id = (
+            Skill.objects.filter(pk=instance.pk)
+            .values_list("category_id", flat=True)
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=Skill)
+def invalidate_skill(sender, instance, **kwargs) -> None:
+    """Invalidate the page of the skill and the listings of its categories."""
+    previous = getattr(instance, "_previous_category_id", None)
+    bump_versions(
+        f"skill:{instance.pk}", *category_versions(instance.category_id, previous)
+    )
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs) -> None:
+    """Remove the rating of a deleted review from the skill's aggregates,
+    also when deleted along with its deal. Nothing is updated when the
+    skill itself is being deleted."""
+    Skill(pk=instance.skill_id).remove_rating(instance.rating)
+
+
+@receiver(post_save, sender=Review)
+def touch_reviewed_skill(sender, instance, created, **kwargs) -> None:
+    """Mark the skill of an edited review as updated, which keys its cached
+    review list. New and deleted reviews mark it when changing its rating
+    aggregates."""
+    if not created:
+        Skill.objects.filter(pk=instance.skill_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_reviewed_skill(sender, instance, **kwargs) -> None:
+    """Invalidate the page of the reviewed skill and its category listing,
+    which show the reviews and the rating."""
+    category = Skill.objects.filter(pk=instance.skill_id).values("category_id")
+    bump_versions(f"skill:{instance.skill_id}", *category_versions(category))
+
+
+@receiver([post_save, post_delete], sender=SkillDeal)
+def invalidate_dealt_skill(sender, instance, **kwargs) -> None:
+    """Invalidate the page of the skill, which shows its pending deals."""
+    bump_versions(f"skill:{instance.skill_id}")
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs) -> None:
+    """Invalidate the listing of the category and every page showing a
+    category name."""
+    bump_versions("categories", f"category:{instance.name.lower()}")
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_username(sender, instance, update_fields=None, **kwargs) -> None:
+    """Remember the username of an existing user before it may change, so
+    the cached reviews showing it are refreshed."""
+    if not instance._state.adding and (
+        update_fields is None or "username" in update_fields
+    ):
+        instance._previous_username = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("username", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user(sender, instance, **kwargs) -> None:
+    """Invalidate the cached pages of a user, whose layout shows their
+    username, and the review lists of the skills they reviewed once they
+    are renamed."""
+    bump_versions(f"user:{instance.pk}")
+    previous = getattr(instance, "_previous_username", None)
+    if previous is not None and previous != instance.username:
+        reviewed = list(
+            Skill.objects.filter(review__owner=instance).values_list("pk", flat=True)
+        )
+        Skill.objects.filter(pk__in=reviewed).update(updated_at=timezone.now())
+        bump_versions(*(f"skill:{pk}" for pk in reviewed))
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_profile_layout(sender, instance, **kwargs) -> None:
+    """Invalidate the layout of a user, which shows their profile image."""
+    invalidate_layout(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Message)
+def invalidate_receiver_layout(sender, instance, **kwargs) -> None:
+    """Invalidate the layout of the receiver, which shows their unread
+    message count."""
+    invalidate_layout(instance.receiver_id)
+
+
+@receiver([post_save, post_delete], sender=SkillDeal)
+def invalidate_provider_layout(sender, instance, **kwargs) -> None:
+    """Invalidate the layout of the provider, which shows the number of
+    deal requests waiting for them."""
+    invalidate_layout(instance.provider_id)
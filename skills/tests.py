@@ -0,0 +1,478 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, transaction
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from .models import (
+    Category,
+    Skill,
+    SkillDeal,
+    Message,
+    Review,
+    Notification,
+    OutboxEvent,
+)
+from .outbox import drain_outbox, record_event
+from .ratings import recompute_ratings, wilson_score
+from .seeding import (
+    CATEGORY_NAMES,
+    DEFAULT_PASSWORD,
+    DatasetSize,
+    _seed_deals,
+    _seed_users,
+    seed_dataset,
+)
+
+
+@override_settings(NOTIFICATION_DIGESTS={})
+class OutboxTests(TestCase):
+    """Tests for the notification outbox."""
+
+    def setUp(self):
+        """Set up a skill owned by the provider and a logged in requester."""
+        User = get_user_model()
+        self.provider = User.objects.create_user(
+            username="provider", password="testpassword123"
+        )
+        self.requester = User.objects.create_user(
+            username="requester", password="testpassword123"
+        )
+        UserProfile.objects.create(user=self.provider)
+        UserProfile.objects.create(user=self.requester)
+        self.skill = Skill.objects.create(
+            name="Gardening",
+            level="Expert",
+            description="Garden help.",
+            owner=self.provider,
+            category=Category.objects.create(name="Outdoors"),
+            skill_type="offered",
+        )
+        self.client.login(username="requester", password="testpassword123")
+
+    def test_deal_request_records_event_without_notification(self):
+        """Test that requesting a deal writes an outbox event but leaves
+        the notification to the worker."""
+        self.client.get(reverse("skill_deal_new", args=[self.skill.pk]))
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event_type, OutboxEvent.DEAL_REQUESTED)
+        self.assertEqual(event.recipient, self.provider)
+        self.assertIsNone(event.processed_at)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_drain_outbox_creates_notifications(self):
+        """Test that draining the outbox creates one notification per event
+        and marks the events as processed."""
+        self.client.get(reverse("skill_deal_new", args=[self.skill.pk]))
+        deal = SkillDeal.objects.get()
+        self.client.login(username="provider", password="testpassword123")
+        self.client.get(reverse("skill_deal_accept", args=[deal.pk]))
+
+        self.assertEqual(drain_outbox(), 2)
+        self.assertEqual(
+            Notification.objects.get(user=self.provider).message,
+            "requester has requested a deal for Gardening",
+        )
+        self.assertEqual(
+            Notification.objects.get(user=self.requester).message,
+            "provider has accepted your deal for Gardening",
+        )
+        self.assertFalse(OutboxEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_drain_outbox_is_idempotent(self):
+        """Test that processed events are not fanned out a second time."""
+        self.client.get(reverse("skill_deal_new", args=[self.skill.pk]))
+        call_command("process_outbox", once=True, stdout=StringIO())
+
+        self.assertEqual(drain_outbox(), 0)
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+@override_settings(
+    NOTIFICATION_DIGESTS={"deal_requested": {"window": 300, "threshold": 3}}
+)
+class NotificationDigestTests(TestCase):
+    """Tests for coalescing outbox events into digest notifications."""
+
+    def setUp(self):
+        """Set up a provider with a skill and a few pending deal requests."""
+        User = get_user_model()
+        self.provider = User.objects.create_user(username="provider")
+        self.skill = Skill.objects.create(
+            name="Gardening",
+            level="Expert",
+            description="Garden help.",
+            owner=self.provider,
+            category=Category.objects.create(name="Outdoors"),
+            skill_type="offered",
+        )
+        self.requesters = [
+            User.objects.create_user(username=f"requester{i}") for i in range(4)
+        ]
+
+    def request_deals(self, requesters):
+        """Record a deal request event for each of the given requesters."""
+        for requester in requesters:
+            deal = SkillDeal.objects.create(
+                skill=self.skill, owner=requester, provider=self.provider
+            )
+            record_event(
+                OutboxEvent.DEAL_REQUESTED,
+                recipient=self.provider,
+                skill_deal=deal,
+                actor=requester,
+            )
+
+    def expire_window(self):
+        """Move all recorded events past the digest window."""
+        OutboxEvent.objects.update(created_at=timezone.now() - timedelta(seconds=301))
+
+    def test_events_are_held_until_window_elapses(self):
+        """Test that digest events are not fanned out inside their window."""
+        self.request_deals(self.requesters)
+        self.assertEqual(drain_outbox(), 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_group_over_threshold_is_coalesced(self):
+        """Test that a due group over the threshold becomes one summary,
+        including events that arrived after the window opened."""
+        self.request_deals(self.requesters[:3])
+        self.expire_window()
+        self.request_deals(self.requesters[3:])
+
+        self.assertEqual(drain_outbox(), 4)
+        self.assertEqual(
+            list(Notification.objects.values_list("message", flat=True)),
+            ["You have 4 new deal requests"],
+        )
+
+    def test_group_under_threshold_is_sent_individually(self):
+        """Test that small groups are delivered as individual notifications."""
+        self.request_deals(self.requesters[:2])
+        self.expire_window()
+
+        self.assertEqual(drain_outbox(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.provider).count(), 2)
+
+
+@override_settings(SKILL_RATING_PRIOR=3.0, SKILL_RATING_PRIOR_WEIGHT=2)
+class SkillRatingAggregateTests(TestCase):
+    """Tests for the incremental rating aggregates on Skill."""
+
+    def setUp(self):
+        """Set up a skill and a few completed deals that can be reviewed."""
+        User = get_user_model()
+        self.provider = User.objects.create_user(username="provider")
+        self.skill = Skill.objects.create(
+            name="Gardening",
+            level="Expert",
+            description="Garden help.",
+            owner=self.provider,
+            category=Category.objects.create(name="Outdoors"),
+            skill_type="offered",
+        )
+        self.reviewers = [
+            User.objects.create_user(username=f"reviewer{i}") for i in range(2)
+        ]
+
+    def review(self, reviewer, rating):
+        """Create a review of the skill by the given reviewer."""
+        deal = SkillDeal.objects.create(
+            skill=self.skill,
+            owner=reviewer,
+            provider=self.provider,
+            status=SkillDeal.COMPLETED,
+        )
+        return Review.objects.create(
+            skill=self.skill, owner=reviewer, review="Great", rating=rating, deal=deal
+        )
+
+    def test_reviews_update_aggregates(self):
+        """Test that each new review is added to the sum and count, and the
+        average and smoothed rating are derived from them."""
+        self.review(self.reviewers[0], 5.0)
+        self.review(self.reviewers[1], 4.0)
+
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_sum, 9.0)
+        self.assertEqual(self.skill.rating_count, 2)
+        self.assertEqual(self.skill.average_rating, 4.5)
+        self.assertAlmostEqual(self.skill.rating, (9.0 + 3.0 * 2) / 4)
+        self.assertAlmostEqual(self.skill.score, wilson_score(9.0, 2))
+
+    def test_resaving_review_does_not_count_twice(self):
+        """Test that saving an existing review leaves the aggregates alone."""
+        review = self.review(self.reviewers[0], 5.0)
+        review.review = "Still great"
+        review.save()
+
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_count, 1)
+
+    def test_changed_rating_updates_aggregates(self):
+        """Test that changing a review's rating applies the difference."""
+        review = self.review(self.reviewers[0], 5.0)
+        self.review(self.reviewers[1], 4.0)
+        review.rating = 2.0
+        review.save()
+
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_sum, 6.0)
+        self.assertEqual(self.skill.rating_count, 2)
+        self.assertAlmostEqual(self.skill.score, wilson_score(6.0, 2))
+
+    def test_deleted_reviews_leave_aggregates(self):
+        """Test that deleting a review, directly or along with its deal,
+        removes its rating from the aggregates."""
+        review = self.review(self.reviewers[0], 5.0)
+        other = self.review(self.reviewers[1], 4.0)
+        review.delete()
+
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_sum, 4.0)
+        self.assertEqual(self.skill.rating_count, 1)
+        self.assertAlmostEqual(self.skill.score, wilson_score(4.0, 1))
+
+        other.deal.delete()
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_sum, 0.0)
+        self.assertEqual(self.skill.rating_count, 0)
+        self.assertEqual(self.skill.rating, 3.0)
+        self.assertEqual(self.skill.score, 0.0)
+
+    def test_recompute_command_repairs_aggregates(self):
+        """Test that the recompute command rebuilds drifted aggregates."""
+        self.review(self.reviewers[0], 2.0)
+        Skill.objects.update(rating_sum=0, rating_count=0, rating=5.0)
+
+        call_command("recompute_skill_ratings", stdout=StringIO())
+
+        self.skill.refresh_from_db()
+        self.assertEqual(self.skill.rating_sum, 2.0)
+        self.assertEqual(self.skill.rating_count, 1)
+        self.assertAlmostEqual(self.skill.rating, (2.0 + 3.0 * 2) / 3)
+
+
+class SkillRankingTests(TestCase):
+    """Tests for ordering skill lists by the precomputed ranking score."""
+
+    def setUp(self):
+        """Set up a searching user and two offered skills from another user."""
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            username="searcher", password="testpassword123"
+        )
+        owner = User.objects.create_user(username="owner")
+        category = Category.objects.create(name="Music")
+        self.one_review = Skill.objects.create(
+            name="Guitar basics",
+            level="Beginner",
+            description="Guitar.",
+            owner=owner,
+            category=category,
+            skill_type="offered",
+            rating_sum=5.0,
+            rating_count=1,
+            score=wilson_score(5.0, 1),
+        )
+        self.many_reviews = Skill.objects.create(
+            name="Guitar advanced",
+            level="Expert",
+            description="Guitar.",
+            owner=owner,
+            category=category,
+            skill_type="offered",
+            rating_sum=45.0,
+            rating_count=10,
+            score=wilson_score(45.0, 10),
+        )
+        self.client.login(username="searcher", password="testpassword123")
+
+    def test_score_penalises_few_reviews(self):
+        """Test that a single 5-star review scores below many 4.5 reviews."""
+        self.assertLess(self.one_review.score, self.many_reviews.score)
+        self.assertEqual(wilson_score(0.0, 0), 0.0)
+
+    def test_search_results_are_ordered_by_score(self):
+        """Test that search results come back best ranked first."""
+        response = self.client.get(reverse("skill_search"), {"search_term": "guitar"})
+        self.assertEqual(
+            list(response.context["skills"]), [self.many_reviews, self.one_review]
+        )
+
+    def test_category_results_are_ordered_by_score(self):
+        """Test that category listings come back best ranked first."""
+        response = self.client.get(reverse("skill_by_category", args=["music"]))
+        self.assertEqual(
+            list(response.context["skills"]), [self.many_reviews, self.one_review]
+        )
+
+
+class HotPathIndexTests(TestCase):
+    """Check with EXPLAIN QUERY PLAN that the hot querysets use their
+    composite indexes."""
+
+    def setUp(self):
+        """Set up a user with a skill so the querysets have real arguments."""
+        self.user = get_user_model().objects.create_user(username="user")
+        self.skill = Skill.objects.create(
+            name="Gardening",
+            level="Expert",
+            description="Garden help.",
+            owner=self.user,
+            category=Category.objects.create(name="Outdoors"),
+            skill_type="offered",
+        )
+        deal = SkillDeal.objects.create(
+            skill=self.skill, owner=self.user, provider=self.user
+        )
+        Message.objects.bulk_create(
+            Message(
+                sender=self.user,
+                receiver=self.user,
+                skill_deal=deal,
+                content="Hello",
+                is_read=i % 10 != 0,
+            )
+            for i in range(50)
+        )
+
+        # The planner needs statistics to prefer the partial unread index over
+        # the inbox index, as it would on a live (optimized) database
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE skills_message")
+
+    def assertUsesIndex(self, queryset, index_name):
+        """Assert that the query plan of a queryset searches an index."""
+        plan = queryset.explain()
+        self.assertRegex(plan, rf"SEARCH \w+ USING (COVERING )?INDEX {index_name}\b")
+
+    def test_deal_querysets_use_indexes(self):
+        """Test the deal listing, counter and existence querysets."""
+        self.assertUsesIndex(
+            SkillDeal.objects.filter(provider=self.user, status=SkillDeal.PENDING),
+            "deal_provider_status_idx",
+        )
+        self.assertUsesIndex(
+            SkillDeal.objects.filter(owner=self.user, status=SkillDeal.ACTIVE),
+            "deal_owner_status_idx",
+        )
+        self.assertUsesIndex(
+            SkillDeal.objects.filter(
+                skill=self.skill, owner=self.user, status=SkillDeal.PENDING
+            ),
+            "deal_skill_owner_status_idx",
+        )
+
+    def test_message_querysets_use_indexes(self):
+        """Test the unread messages and inbox querysets."""
+        self.assertUsesIndex(
+            Message.objects.filter(receiver=self.user, is_read=False).order_by(
+                "-timestamp"
+            ),
+            "message_unread_idx",
+        )
+        self.assertUsesIndex(
+            Message.objects.filter(receiver=self.user).order_by("-timestamp"),
+            "message_inbox_idx",
+        )
+
+    def test_skill_querysets_use_indexes(self):
+        """Test the own skills and dashboard suggestion querysets."""
+        self.assertUsesIndex(
+            Skill.objects.filter(owner=self.user, skill_type="wanted"),
+            "skill_owner_type_idx",
+        )
+        self.assertUsesIndex(
+            Skill.objects.filter(name__in=["Gardening"], skill_type="offered"),
+            "skill_type_name_idx",
+        )
+
+
+class CreateTestDataTests(TestCase):
+    """Tests for the bulk dataset seeding behind create_test_data."""
+
+    def dataset(self):
+        """Return the seeded deals, messages and reviews without their keys."""
+        return (
+            list(
+                SkillDeal.objects.order_by("pk").values_list(
+                    "skill__name", "owner__username", "provider__username", "status"
+                )
+            ),
+            list(Message.objects.order_by("pk").values_list("content", "is_read")),
+            list(
+                Review.objects.order_by("pk").values_list("owner__username", "rating")
+            ),
+        )
+
+    def test_command_sizes(self):
+        """Test that the command creates the requested number of rows."""
+        out = StringIO()
+        call_command(
+            "create_test_data",
+            users=8,
+            skills_per_user=4,
+            deals=40,
+            messages=60,
+            reviews=5,
+            stdout=out,
+        )
+
+        self.assertEqual(get_user_model().objects.count(), 8)
+        self.assertEqual(UserProfile.objects.count(), 8)
+        self.assertEqual(Skill.objects.count(), 32)
+        self.assertEqual(SkillDeal.objects.count(), 40)
+        self.assertEqual(Message.objects.count(), 60)
+        self.assertLessEqual(Review.objects.count(), 5)
+        self.assertIn("8 users", out.getvalue())
+
+    def test_seeding_is_deterministic(self):
+        """Test that the same seed produces the same rows."""
+        size = DatasetSize(users=6, deals=30, messages=50, reviews=8)
+        with transaction.atomic():
+            seed_dataset(size, seed=3)
+            first = self.dataset()
+            transaction.set_rollback(True)
+
+        seed_dataset(size, seed=3)
+        self.assertEqual(self.dataset(), first)
+
+    def test_seeding_does_not_depend_on_insertion_order(self):
+        """Test that user chunks inserted in another order, as by parallel
+        workers, produce the same deals, messages and reviews."""
+        size = DatasetSize(users=6, deals=30, messages=50, reviews=8)
+        password = make_password(DEFAULT_PASSWORD)
+        Category.objects.bulk_create([Category(name=name) for name in CATEGORY_NAMES])
+
+        def seed(user_chunks):
+            for start, stop in user_chunks:
+                _seed_users(start, stop, size, 3, password, 100)
+            _seed_deals(0, size.deals, size, 3, 100)
+            return self.dataset()
+
+        with transaction.atomic():
+            first = seed([(0, 3), (3, 6)])
+            transaction.set_rollback(True)
+
+        self.assertEqual(seed([(3, 6), (0, 3)]), first)
+
+    def test_rating_aggregates(self):
+        """Test that the seeded skills carry the aggregates of their reviews."""
+        seed_dataset(DatasetSize(users=6, deals=60, reviews=20))
+        skills = list(Skill.objects.filter(rating_count__gt=0))
+        self.assertTrue(skills)
+
+        expected = recompute_ratings(list(Skill.objects.filter(rating_count__gt=0)))
+        for skill, recomputed in zip(skills, expected):
+            self.assertEqual(skill.rating_count, recomputed.rating_count)
+            self.assertAlmostEqual(skill.rating, recomputed.rating)
+            self.assertAlmostEqual(skill.score, recomputed.score)
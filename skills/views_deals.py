@@ -4,7 +4,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import HttpRequest
 from django.http.response import HttpResponse
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db import transaction
 from django.shortcuts import redirect, get_object_or_404
 from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
 from django.views.generic import (
@@ -13,8 +13,9 @@ from django.views.generic import (
     UpdateView,
 )
 
-from .models import Skill, SkillDeal, Review, Message
+from .models import Skill, SkillDeal, Review, Message, OutboxEvent
 from .forms import SkillDealForm
+from .outbox import record_event
 
 
 # Create your views here.
@@ -37,15 +38,22 @@ class SkillDealCreateView(LoginRequiredMixin, View):
         and status of the deal in a new SkillDeal object.
         """
         skill = get_object_or_404(Skill, pk=self.kwargs["skill_pk"])
-        skill_deal = SkillDeal.objects.create(
-            skill=skill,
-            owner=self.request.user,
-            provider=skill.owner,
-            status=SkillDeal.PENDING,
-        )
-        skill_deal.send_message_on_request()
-        # Optionally, send a notification to the provider here
-        # NotifyProvider(skill.owner, self.request.user, skill)
+        with transaction.atomic():
+            skill_deal = SkillDeal.objects.create(
+                skill=skill,
+                owner=self.request.user,
+                provider=skill.owner,
+                status=SkillDeal.PENDING,
+            )
+            skill_deal.send_message_on_request()
+
+            # The provider is notified by the outbox worker
+            record_event(
+                OutboxEvent.DEAL_REQUESTED,
+                recipient=skill.owner,
+                skill_deal=skill_deal,
+                actor=self.request.user,
+            )
         return redirect("skill_detail", pk=self.kwargs["skill_pk"])
 
 
@@ -61,10 +69,17 @@ class SkillDealAcceptView(LoginRequiredMixin, View):
         deal = get_object_or_404(SkillDeal, pk=self.kwargs["deal_pk"])
 
         if request.user == deal.provider:
-            deal.accept_deal()
-
-            # Notify the owner that the deal has been accepted
-            deal.send_message_on_accept()
+            with transaction.atomic():
+                deal.accept_deal()
+
+                # Notify the owner that the deal has been accepted
+                deal.send_message_on_accept()
+                record_event(
+                    OutboxEvent.DEAL_ACCEPTED,
+                    recipient=deal.owner,
+                    skill_deal=deal,
+                    actor=request.user,
+                )
 
             messages.success(request, "Deal accepted successfully!")
         else:
@@ -82,17 +97,34 @@ class SkillDealListView(LoginRequiredMixin, ListView):
     context_object_name = "my_deals"
     paginate_by = 4
 
+    def get_deals(self):
+        """Return the skill deals loaded with what the deal cards render:
+        the skill name and the usernames of both parties."""
+        return (
+            SkillDeal.objects.select_related("skill", "owner", "provider")
+            .only(
+                "status",
+                "created_at",
+                "start_date",
+                "end_date",
+                "skill__name",
+                "owner__username",
+                "provider__username",
+            )
+            .order_by("-created_at", "-pk")
+        )
+
     def get_queryset(self):
         """Return a list of skill deals for the current logged-in user."""
         user = self.request.user
         filter_type = self.kwargs.get("filter_type", "all")
 
         if filter_type == "provided":
-            queryset = SkillDeal.objects.filter(provider=user)
+            queryset = self.get_deals().filter(provider=user)
         elif filter_type == "requested":
-            queryset = SkillDeal.objects.filter(owner=user)
+            queryset = self.get_deals().filter(owner=user)
         else:
-            queryset = SkillDeal.objects.filter(Q(provider=user) | Q(owner=user))
+            queryset = self.get_deals().involving(user)
 
         return queryset
 
@@ -175,7 +207,7 @@ class ProvidedDealsView(SkillDealListView):
         """Return a list of skill deals where the user is the provider."""
         user = self.request.user
 
-        return SkillDeal.objects.filter(
+        return self.get_deals().filter(
             provider=user,
             status__in=[
                 SkillDeal.PENDING,
@@ -193,7 +225,7 @@ class RequestedDealsView(SkillDealListView):
         """Return a list of skill deals where the user is the owner."""
         user = self.request.user
 
-        queryset = SkillDeal.objects.filter(
+        queryset = self.get_deals().filter(
             owner=user,
             status__in=[
                 SkillDeal.PENDING,
@@ -282,7 +314,16 @@ class SkillDealCompleteView(LoginRequiredMixin, UpdateView):
         to COMPLETED and setting the end date to the current date.
         """
         deal = get_object_or_404(SkillDeal, pk=self.kwargs["deal_pk"])
-        deal.mark_complete()
+        with transaction.atomic():
+            deal.mark_complete()
+
+            # Notify the other party of the deal
+            record_event(
+                OutboxEvent.DEAL_COMPLETED,
+                recipient=deal.provider if request.user == deal.owner else deal.owner,
+                skill_deal=deal,
+                actor=request.user,
+            )
         return redirect("requested_deals")
 
 
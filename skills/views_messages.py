@@ -4,10 +4,12 @@ from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
 from django.urls import reverse
 from django.http import JsonResponse
+from django.db import transaction
 
 
 from .forms import MessageForm
-from .models import Message, SkillDeal
+from .models import Message, SkillDeal, OutboxEvent
+from .outbox import record_event
 
 
 class MessageListView(LoginRequiredMixin, ListView):
@@ -27,7 +29,12 @@ class MessageListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """Filter messages for the logged-in user."""
-        return Message.objects.filter(receiver=self.request.user).order_by("-timestamp")
+        return (
+            Message.objects.received_by(self.request.user)
+            .select_related("sender")
+            .only("content", "timestamp", "is_read", "sender__username")
+            .order_by("-timestamp")
+        )
 
 
 class MessageReadView(LoginRequiredMixin, View):
@@ -35,7 +42,7 @@ class MessageReadView(LoginRequiredMixin, View):
 
     def get(self, request, pk, *args, **kwargs):
         """Mark the message as read."""
-        message = get_object_or_404(Message, pk=pk, receiver=request.user)
+        message = get_object_or_404(Message.objects.received_by(request.user), pk=pk)
 
         # Mark the message as read
         if not message.is_read:
@@ -86,7 +93,14 @@ class MessageCreateView(LoginRequiredMixin, View):
             message.skill_deal = skill_deal
             if reply_to:
                 message.reply_to = get_object_or_404(Message, pk=reply_to)
-            message.save()
+            with transaction.atomic():
+                message.save()
+                record_event(
+                    OutboxEvent.MESSAGE_RECEIVED,
+                    recipient=message.receiver,
+                    skill_deal=skill_deal,
+                    actor=request.user,
+                )
 
             if request.headers.get("x-requested-with") == "XMLHttpRequest":
                 return JsonResponse(
@@ -1,3 +1,5 @@
+import logging
+
 from django.http import HttpResponseRedirect
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.http import HttpRequest
@@ -13,18 +15,23 @@ from django.views.generic import (
     CreateView,
 )
 
+from perf.cache import CachedResponseMixin
+
 from .models import Skill, SkillDeal, Review
 from .forms import SkillForm, SkillSearchForm, ReviewForm
 
+logger = logging.getLogger(__name__)
+
 
 # Create your views here.
-class SkillListView(LoginRequiredMixin, ListView):
+class SkillListView(LoginRequiredMixin, CachedResponseMixin, ListView):
     """Displays a list of skills based on the request path:
         - path 1: through search bar.
         - path 2: based on a category.
         - path 3: based on the logged in user.
 
     LoginRequiredMixin: A mixin to require the user to be logged in.
+    CachedResponseMixin: Caches the category listings per user.
 
     Attributes:
         model: A model to represent the skills.
@@ -51,6 +58,13 @@ class SkillListView(LoginRequiredMixin, ListView):
         self.category = kwargs.get("category", None)
         return super().dispatch(request, *args, **kwargs)
 
+    def get_cache_versions(self) -> list[str] | None:
+        """Cache the category listings, which change with the skills of
+        their category, and render the other lists on every request."""
+        if self.request_path.startswith("/skills/categories/") and self.category:
+            return [f"category:{self.category.lower()}", "categories"]
+        return None
+
     def get_queryset(self) -> Skill:
         """Return the list of skills based on a searched named, otherwise
         the skills of the logged in user by default.
@@ -72,7 +86,7 @@ class SkillListView(LoginRequiredMixin, ListView):
                 skillset = skillset_all_other_users.filter(
                     Q(name__icontains=search_term)
                     | Q(description__icontains=search_term)
-                )
+                ).order_by("-score", "-pk")
             else:
                 skillset = Skill.objects.none()
 
@@ -80,7 +94,7 @@ class SkillListView(LoginRequiredMixin, ListView):
         elif self.request_path.startswith("/skills/categories/") and self.category:
             skillset = skillset_all_other_users.filter(
                 category__name__iexact=self.category
-            )
+            ).order_by("-score", "-pk")
 
         elif self.request_path == "/skills/wanted":
             skillset = skillset_user.filter(skill_type="wanted")
@@ -94,7 +108,17 @@ class SkillListView(LoginRequiredMixin, ListView):
         else:
             pass
 
-        return skillset
+        # Only load what the skill cards render and key their cached
+        # fragments on, with their category and owner
+        return skillset.select_related("category", "owner").only(
+            "name",
+            "date",
+            "skill_type",
+            "rating",
+            "updated_at",
+            "category__name",
+            "owner__username",
+        )
 
     def get_context_data(self, **kwargs: str) -> dict[str, str]:
         """A method to add a search form to the default context data
@@ -106,7 +130,7 @@ class SkillListView(LoginRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         context["form"] = SkillSearchForm(self.request.GET or None)
         search_term = self.request.GET.get("search_term")
-        print(f"search term in get_context_data: {search_term}")
+        logger.debug("Skill list search term: %r", search_term)
 
         if (
             self.request_path == "/skills/search/"
@@ -118,10 +142,12 @@ class SkillListView(LoginRequiredMixin, ListView):
         return context
 
 
-class SkillDetailView(LoginRequiredMixin, DetailView):
+class SkillDetailView(LoginRequiredMixin, CachedResponseMixin, DetailView):
     """A view to display the detail of a skill.
 
     LoginRequiredMixin: A mixin to require the user to be logged in.
+    CachedResponseMixin: Caches the page per user until the skill, its
+                        reviews or deals, or a category change.
 
     Attributes:
         model: A model to represent the skills.
@@ -130,9 +156,14 @@ class SkillDetailView(LoginRequiredMixin, DetailView):
     """
 
     model = Skill
+    queryset = Skill.objects.select_related("owner")
     template_name = "skills/skill_detail.html"
     context_object_name = "skill"
 
+    def get_cache_versions(self) -> list[str]:
+        """Return the versions of the skill and the category names."""
+        return [f"skill:{self.kwargs['pk']}", "categories"]
+
     def get_context_data(self, **kwargs: str) -> dict[str, str]:
         """Tracks the context of the current skill whose details page
         is active. It gets the skill object and the current user and uses
@@ -144,16 +175,18 @@ class SkillDetailView(LoginRequiredMixin, DetailView):
             A dictionary of the context data.
         """
         context = super().get_context_data(**kwargs)
-        skill = self.get_object()
+        skill = self.object
         user = self.request.user
 
         # Get pending deal requests for this skill
-        pending_deals = SkillDeal.objects.filter(skill=skill, status=SkillDeal.PENDING)
+        pending_deals = SkillDeal.objects.filter(
+            skill=skill, status=SkillDeal.PENDING
+        ).select_related("owner")
         context["pending_deals"] = pending_deals
         context["deal_exists"] = skill.deal_exists_for_user(user)
 
         # Get reviews for this skill
-        reviews = Review.objects.filter(skill=skill)
+        reviews = Review.objects.filter(skill=skill).select_related("owner")
         reviews_count = reviews.count()
         context["reviews"] = reviews
         context["reviews_count"] = reviews_count
@@ -207,10 +240,7 @@ class SkillReviewCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView)
         skill_deal = get_object_or_404(SkillDeal, pk=self.kwargs["deal_pk"])
         form.instance.deal = skill_deal
 
-        response = super().form_valid(form)
-
-        form.instance.skill.update_rating(form.instance.rating)
-        return response
+        return super().form_valid(form)
 
     def get_context_data(self, **kwargs):
         """A method to add the skill object to the context data so that